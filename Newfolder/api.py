@@ -1,10 +1,48 @@
-from fastapi import FastAPI
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from notebooks.recommend import recommend_for_candidate
+from typing import List, Optional
+try:
+    import orjson  # optional: several times faster response encoding
+except ImportError:
+    orjson = None
+# Lightweight: pandas / scikit-learn and the catalog load are deferred until
+# the engine is first used or warmed up below.
+from notebooks import metrics, service
+from notebooks.cache import CursorExpired
+from notebooks.pool import BoundedPool, DeadlineExceeded, Saturated
 
-app = FastAPI(title="Internship Recommendation API", version="1.0")
+# Scoring runs on a bounded pool so the event loop stays free and bursts are
+# shed with 503 instead of queueing without limit.
+POOL_KIND = os.environ.get("RECOMMENDER_POOL", "thread")  # "thread" or "process"
+POOL = BoundedPool(
+    max_workers=int(os.environ.get("RECOMMENDER_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.environ.get("RECOMMENDER_QUEUE", "32")),
+    kind=POOL_KIND,
+    initializer=service.init_worker if POOL_KIND == "process" else None,
+)
+REQUEST_TIMEOUT = float(os.environ.get("RECOMMENDER_REQUEST_TIMEOUT", "30"))  # seconds; 0 = no deadline
+RETRY_AFTER = os.environ.get("RECOMMENDER_RETRY_AFTER", "1")
+STREAM_CHUNK = 256  # candidates per pool task when streaming a batch
+
+@asynccontextmanager
+async def lifespan(app):
+    # Build the engine in the background so / and /health answer immediately
+    if os.environ.get("RECOMMENDER_WARMUP", "1") != "0":
+        service.warm_up()
+    # Periodic full refit after admin changes (seconds; 0 disables)
+    service.get_registry().start_refit_scheduler(float(os.environ.get("RECOMMENDER_REFIT_INTERVAL", "600")))
+    yield
+    POOL.shutdown(wait=False)
+
+app = FastAPI(title="Internship Recommendation API", version="1.0", lifespan=lifespan)
 
 # Add CORS middleware after app creation
 app.add_middleware(
@@ -27,16 +65,356 @@ class CandidateRequest(BaseModel):
     education_level: Optional[str] = None
     max_stipend: Optional[float] = None
     top_n: int = 5
+    # Only these fields of each recommendation (e.g. ["title", "organization", "score"]); default: all
+    fields: Optional[List[str]] = None
+    catalog: Optional[str] = None  # catalog id (see GET /admin/catalogs); default: the default catalog
 
 @app.get("/")
 def root():
     return {"message": "Internship Recommendation API is running"}
 
+@app.get("/health")
+def health():
+    """Liveness plus engine readiness; never waits for the engine to load."""
+    return {"status": "ok", "ready": service.is_ready(), "engine": service.engine_status(), "pool": POOL.stats()}
+
+def _catalog(catalog):
+    """The request's catalog id; 404 when it is not configured."""
+    if not service.has_catalog(catalog):
+        raise HTTPException(status_code=404, detail=f"unknown catalog {catalog!r}")
+    return catalog
+
+def _deadline(timeout_header):
+    """Absolute deadline from the X-Request-Timeout header (seconds), else the default."""
+    try:
+        timeout = float(timeout_header) if timeout_header else REQUEST_TIMEOUT
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
+    return time.time() + timeout if timeout > 0 else None
+
+async def _score(fn, *args, deadline=None):
+    """Run fn on the pool: 503 + Retry-After when saturated, 504 once the deadline passes."""
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            raise HTTPException(status_code=504, detail="request deadline exceeded")
+    try:
+        return await POOL.run(fn, *args, timeout=timeout)
+    except Saturated:
+        raise HTTPException(status_code=503, detail="server busy, retry later", headers={"Retry-After": RETRY_AFTER})
+    except DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="request deadline exceeded")
+
+def _wants_profile(x_profile, x_admin_token):
+    # X-Profile: 1 forces the sampling profiler; admin-only when an admin token is configured
+    expected = os.environ.get("RECOMMENDER_ADMIN_TOKEN")
+    return bool(x_profile and x_profile != "0" and (not expected or x_admin_token == expected))
+
+def _dumps(content):
+    """JSON bytes of a response body: orjson when installed, else the stdlib encoder as JSONResponse uses it."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _traced_response(content, trace, endpoint, started):
+    """JSON response with a Server-Timing header; records the request's trace in /metrics."""
+    serialize_start = time.perf_counter()
+    response = Response(_dumps(content), media_type="application/json")
+    if trace is not None:
+        stages = trace["stages"]
+        stages["serialize"] = time.perf_counter() - serialize_start
+        # Waiting in the pool queue plus the hand-off to and from the worker
+        stages["queue"] = max(0.0, serialize_start - started - trace["total"])
+        trace["total"] = time.perf_counter() - started
+        metrics.observe_trace(trace, endpoint)
+        response.headers["Server-Timing"] = metrics.server_timing(trace)
+    return response
+
 @app.post("/recommend")
-def recommend(candidate: CandidateRequest):
+async def recommend(candidate: CandidateRequest, x_request_timeout: Optional[str] = Header(None),
+                    x_profile: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    started = time.perf_counter()
     cand = candidate.dict()
+    fields = cand.pop("fields")
+    catalog = _catalog(cand.pop("catalog"))
+    deadline = _deadline(x_request_timeout)
+    profile = _wants_profile(x_profile, x_admin_token)
     try:
-        recs = recommend_for_candidate(cand, top_n=cand.get("top_n", 5))
-        return {"recommendations": recs}
+        recs, trace = await _score(service.recommend_task, cand, cand.get("top_n", 5), profile, fields, catalog,
+                                   deadline=deadline)
+        return _traced_response({"recommendations": recs}, trace, "/recommend", started)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+class BatchRequest(BaseModel):
+    candidates: List[CandidateRequest]
+    fields: Optional[List[str]] = None  # projection for candidates that do not set their own
+    catalog: Optional[str] = None  # one catalog for the whole batch
+
+@app.post("/recommend/batch")
+async def recommend_many(batch: BatchRequest, stream: bool = False, x_request_timeout: Optional[str] = Header(None),
+                         x_profile: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """
+    Score many candidates in one request; results come back in input order.
+    With ?stream=true the response is NDJSON, one {"index", "recommendations"} line per candidate.
+    The deadline covers the whole batch; a stream that runs out of time ends with an error line.
+    """
+    started = time.perf_counter()
+    cands = [c.dict() for c in batch.candidates]
+    top_ns = [c.get("top_n", 5) for c in cands]
+    fields = [c.pop("fields") or batch.fields for c in cands]
+    for c in cands:
+        c.pop("catalog")
+    catalog = _catalog(batch.catalog)
+    deadline = _deadline(x_request_timeout)
+    profile = _wants_profile(x_profile, x_admin_token)
+    if stream:
+        # Score the first chunk before answering so a saturated pool still gets a 503
+        try:
+            first = await _score(service.batch_task, cands[:STREAM_CHUNK], top_ns[:STREAM_CHUNK], profile,
+                                 fields[:STREAM_CHUNK], catalog, deadline=deadline)
+        except HTTPException:
+            raise
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            first = e
+
+        async def lines():
+            # Chunk traces are merged and recorded once the stream ends (no Server-Timing header)
+            traces = []
+            try:
+                if isinstance(first, Exception):
+                    raise first
+                start, (chunk, trace) = 0, first
+                while True:
+                    traces.append(trace)
+                    for i, recs in enumerate(chunk, start):
+                        yield _dumps({"index": i, "recommendations": recs}) + b"\n"
+                    start += STREAM_CHUNK
+                    if start >= len(cands):
+                        break
+                    stop = start + STREAM_CHUNK
+                    chunk, trace = await _score(service.batch_task, cands[start:stop], top_ns[start:stop], profile,
+                                                fields[start:stop], catalog, deadline=deadline)
+            except HTTPException as e:
+                yield _dumps({"error": e.detail}) + b"\n"
+            except Exception as e:
+                yield _dumps({"error": str(e)}) + b"\n"
+            if any(traces):
+                merged = metrics.merge(traces)
+                merged["total"] = time.perf_counter() - started
+                metrics.observe_trace(merged, "/recommend/batch")
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    try:
+        results, trace = await _score(service.batch_task, cands, top_ns, profile, fields, catalog, deadline=deadline)
+        return _traced_response({"results": [{"recommendations": recs} for recs in results]}, trace,
+                                "/recommend/batch", started)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return {"error": str(e)}
+
+class PageRequest(CandidateRequest):
+    cursor: Optional[str] = None  # next_cursor of the previous page; the candidate fields are then ignored
+
+@app.post("/recommend/page")
+async def recommend_page(page: PageRequest, x_request_timeout: Optional[str] = Header(None),
+                         x_profile: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """
+    Recommendations a page of top_n at a time. The first call ranks the candidate once and
+    returns a next_cursor; sending it back returns the next page without scoring again.
+    An expired cursor gets 410: start again from the first page.
+    """
+    started = time.perf_counter()
+    cand = page.dict()
+    cursor = cand.pop("cursor")
+    fields = cand.pop("fields")
+    catalog = _catalog(cand.pop("catalog"))
+    deadline = _deadline(x_request_timeout)
+    profile = _wants_profile(x_profile, x_admin_token)
+    try:
+        result, trace = await _score(service.page_task, cand, cand.get("top_n", 5), cursor, profile, fields, catalog,
+                                     deadline=deadline)
+        return _traced_response(result, trace, "/recommend/page", started)
+    except HTTPException:
+        raise
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/recommend/facets")
+async def recommend_facets(candidate: CandidateRequest, x_request_timeout: Optional[str] = Header(None),
+                           x_profile: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """Internships matching the candidate's filters: total, per mode and per city (nothing is scored)."""
+    started = time.perf_counter()
+    cand = candidate.dict()
+    catalog = _catalog(cand.pop("catalog"))
+    deadline = _deadline(x_request_timeout)
+    profile = _wants_profile(x_profile, x_admin_token)
+    try:
+        counts, trace = await _score(service.facets_task, cand, profile, catalog, deadline=deadline)
+        return _traced_response(counts, trace, "/recommend/facets", started)
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Per-stage and end-to-end latency histograms, branch / filter counters, pool and cache gauges."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@metrics.register_collector
+def _pool_metrics():
+    stats = POOL.stats()
+    return [
+        ("recommender_pool_in_flight", "gauge", "Scoring tasks running or queued", [({}, stats["in_flight"])]),
+        ("recommender_pool_rejected_total", "counter", "Requests rejected with 503 (pool saturated)", [({}, stats["rejected"])]),
+        ("recommender_pool_expired_total", "counter", "Requests that missed their deadline", [({}, stats["expired"])]),
+    ]
+
+@metrics.register_collector
+def _catalog_metrics():
+    stats = service.catalog_stats()["catalogs"]
+    families = []
+    for field, kind, help_text in (("loads", "counter", "Catalog engine loads"),
+                                   ("hits", "counter", "Requests served by an already loaded catalog engine"),
+                                   ("evictions", "counter", "Catalog engines unloaded to stay within the memory budget"),
+                                   ("bytes", "gauge", "Bytes held by the loaded catalog engine")):
+        name = f"recommender_catalog_{field}" + ("_total" if kind == "counter" else "")
+        families.append((name, kind, help_text, [({"catalog": cid}, c[field]) for cid, c in stats.items()]))
+    return families
+
+@metrics.register_collector
+def _cache_metrics():
+    # Only once the recommender is loaded; /metrics must not pull in pandas / scikit-learn
+    if "notebooks.recommend" not in sys.modules:
+        return []
+    stats = sys.modules["notebooks.recommend"].cache_stats()
+    families = []
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge"), ("bytes", "gauge")):
+        name = f"recommender_cache_{field}" + ("_total" if kind == "counter" else "")
+        families.append((name, kind, f"Cache {field}", [({"cache": cache}, s[field]) for cache, s in stats.items()]))
+    return families
+
+# --- Catalog administration -------------------------------------------------
+# Changes are applied to a copy of the engine and published with an atomic
+# swap; /recommend calls already running finish on the engine they started with.
+# When RECOMMENDER_ADMIN_TOKEN is set, admin calls must send it as X-Admin-Token.
+# Catalog calls take ?catalog=<id> (default: the default catalog).
+
+class InternshipIn(BaseModel):
+    title: Optional[str] = None
+    organization: Optional[str] = None
+    location: Optional[str] = None
+    mode: Optional[str] = None
+    duration_weeks: Optional[int] = None
+    stipend_per_month: Optional[float] = None
+    description: Optional[str] = None
+    requirements: Optional[str] = None
+    req_1: Optional[str] = None
+    req_2: Optional[str] = None
+    req_3: Optional[str] = None
+    req_4: Optional[str] = None
+    req_5: Optional[str] = None
+    req_6: Optional[str] = None
+
+class InternshipBatch(BaseModel):
+    internships: List[InternshipIn]
+
+def _check_admin(token):
+    expected = os.environ.get("RECOMMENDER_ADMIN_TOKEN")
+    if expected and token != expected:
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+def _fields(item: InternshipIn):
+    return {k: v for k, v in item.dict().items() if v is not None}
+
+@app.get("/admin/catalog")
+def catalog_status(catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    return service.engine_status(_catalog(catalog))
+
+@app.get("/admin/catalogs")
+def catalogs_status(x_admin_token: Optional[str] = Header(None)):
+    """Configured catalogs: memory budget, bytes loaded and per-catalog load / hit / eviction counts."""
+    _check_admin(x_admin_token)
+    return service.catalog_stats()
+
+@app.get("/admin/internships/{internship_id}")
+def get_internship(internship_id: int, catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    record = service.get_engine(_catalog(catalog)).get_internship(internship_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"internship {internship_id} not found")
+    return record
+
+@app.post("/admin/internships")
+def add_internships(batch: InternshipBatch, catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    engine, ids = service.get_handle(_catalog(catalog)).apply_changes(upserts=[(None, _fields(i)) for i in batch.internships])
+    return {"ids": ids, "version": engine.version}
+
+@app.put("/admin/internships/{internship_id}")
+def update_internship(internship_id: int, item: InternshipIn, catalog: Optional[str] = None,
+                      x_admin_token: Optional[str] = Header(None)):
+    """Update the given fields of an internship; fields left out keep their current value."""
+    _check_admin(x_admin_token)
+    try:
+        engine, _ = service.get_handle(_catalog(catalog)).apply_changes(updates=[(internship_id, _fields(item))])
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"internship {internship_id} not found")
+    return {"id": internship_id, "version": engine.version}
+
+@app.delete("/admin/internships/{internship_id}")
+def delete_internship(internship_id: int, catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    try:
+        engine, _ = service.get_handle(_catalog(catalog)).apply_changes(deletes=[internship_id])
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"internship {internship_id} not found")
+    return {"id": internship_id, "version": engine.version}
+
+@app.get("/admin/cache")
+def cache_status(x_admin_token: Optional[str] = Header(None)):
+    """Result / score cache sizes and hit, miss and eviction counters."""
+    _check_admin(x_admin_token)
+    from notebooks.recommend import cache_stats
+    return cache_stats()
+
+@app.get("/admin/memory")
+def memory_status(catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Bytes held by the current engine, per component and column."""
+    _check_admin(x_admin_token)
+    return service.get_engine(_catalog(catalog)).memory_report()
+
+@app.get("/admin/profiles")
+def slow_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Recent slow requests captured by the sampling profiler, with collapsed stacks."""
+    _check_admin(x_admin_token)
+    return {"profiles": list(metrics.SLOW_PROFILES)}
+
+@app.post("/admin/refit")
+def refit_catalog(catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Refit the vocabulary over the live catalog in the background."""
+    _check_admin(x_admin_token)
+    threading.Thread(target=service.get_handle(_catalog(catalog)).refit, name="engine-refit-now", daemon=True).start()
+    return {"scheduled": True}
+
+@app.post("/admin/reload")
+def reload_catalog(catalog: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Reload the catalog from its source file (discards admin changes not in the file)."""
+    _check_admin(x_admin_token)
+    engine = service.get_handle(_catalog(catalog)).reload()
+    return {"version": engine.version, "rows": engine.n_live}
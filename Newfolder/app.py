@@ -1,51 +1,231 @@
 # app.py (Streamlit UI)
+"""
+Streamlit dashboard for the recommender.
+
+Every session of a Streamlit server process shares one scoring backend
+(st.cache_resource): the process-wide engine of notebooks.service or, when
+RECOMMENDER_API_URL is set, the running FastAPI service, so the dashboard
+node does not load a copy of the catalog at all. The bulk tab scores an
+uploaded candidates file in batches of RECOMMENDER_APP_BULK_CHUNK, with a
+progress bar, and renders the comparison table as each batch comes back.
+
+Run with:  streamlit run app.py
+"""
+import hashlib
+import os
+import time
+
+import pandas as pd
 import streamlit as st
-from notebooks.recommend import recommend_for_candidate
+
+from score_candidates import CANDIDATE_FIELDS, RESULT_COLUMNS
+
+# Base URL of the FastAPI service (e.g. http://localhost:8000); unset: score in this process
+API_URL = os.environ.get("RECOMMENDER_API_URL", "").rstrip("/")
+API_TIMEOUT = float(os.environ.get("RECOMMENDER_APP_API_TIMEOUT", "30"))
+# Attempts per call when the service sheds load with 503 + Retry-After
+API_RETRIES = 3
+# Candidates per scoring call in bulk mode, and the most one upload may hold
+BULK_CHUNK = int(os.environ.get("RECOMMENDER_APP_BULK_CHUNK", "100"))
+BULK_MAX_ROWS = int(os.environ.get("RECOMMENDER_APP_BULK_MAX_ROWS", "5000"))
+
+
+class LocalBackend:
+    """Scores with the process-wide engine (notebooks.recommend / notebooks.service)."""
+
+    name = "in-process engine"
+
+    def __init__(self):
+        from notebooks import recommend
+        self._recommend = recommend
+        # Load the catalog now, once per server process, rather than on the first submit
+        recommend.get_engine()
+
+    def recommend(self, candidate, top_n):
+        return self._recommend.recommend_for_candidate(candidate, top_n=top_n)
+
+    def recommend_batch(self, candidates, top_n):
+        return self._recommend.recommend_batch(candidates, top_n=top_n)
+
+
+class ApiBackend:
+    """Scores through the FastAPI service at `url`, over one pooled HTTP session."""
+
+    def __init__(self, url):
+        import requests
+        self.url = url
+        self.name = f"API at {url}"
+        self._session = requests.Session()
+
+    def _post(self, path, payload):
+        for attempt in range(API_RETRIES):
+            resp = self._session.post(f"{self.url}{path}", json=payload, timeout=API_TIMEOUT)
+            if resp.status_code == 503 and attempt + 1 < API_RETRIES:
+                time.sleep(float(resp.headers.get("Retry-After", "1")))
+                continue
+            if resp.status_code >= 400:
+                try:
+                    detail = resp.json().get("detail")
+                except ValueError:
+                    detail = resp.text
+                raise RuntimeError(f"{path} returned {resp.status_code}: {detail}")
+            body = resp.json()
+            if "error" in body:
+                raise RuntimeError(body["error"])
+            return body
+
+    def recommend(self, candidate, top_n):
+        return self._post("/recommend", {**candidate, "top_n": top_n})["recommendations"]
+
+    def recommend_batch(self, candidates, top_n):
+        body = self._post("/recommend/batch", {"candidates": [{**c, "top_n": top_n} for c in candidates]})
+        return [result["recommendations"] for result in body["results"]]
+
+
+@st.cache_resource(show_spinner="Loading the recommender...")
+def get_backend():
+    """The scoring backend shared by every session of this Streamlit process."""
+    return ApiBackend(API_URL) if API_URL else LocalBackend()
+
+
+def _read_candidates(upload):
+    # Separator sniffed, every field kept as text (empty cells stay "")
+    df = pd.read_csv(upload, sep=None, engine="python", dtype=str, keep_default_na=False)
+    return df.head(BULK_MAX_ROWS).to_dict("records"), len(df)
+
+
+def _candidate(record):
+    return {k: record[k] for k in CANDIDATE_FIELDS if record.get(k) not in (None, "")}
+
+
+def _compare_rows(records, results, top_n):
+    """One row per candidate with its matches side by side."""
+    rows = []
+    for record, recs in zip(records, results):
+        row = {"candidate_id": record.get("id"), "candidate_name": record.get("name")}
+        for i in range(top_n):
+            rec = recs[i] if i < len(recs) else None
+            row[f"#{i + 1}"] = f"{rec['title']} — {rec['organization']} ({rec['score']})" if rec else ""
+        rows.append(row)
+    return rows
+
+
+def _result_rows(records, results):
+    """Flat rows in the layout of data/results.csv (see score_candidates.py)."""
+    return [{"candidate_id": record.get("id"), "candidate_name": record.get("name"), "title": rec["title"],
+             "organization": rec["organization"], "location": rec["location"], "score": rec["score"]}
+            for record, recs in zip(records, results) for rec in recs]
+
+
+def render_recommendations(name, recs):
+    st.subheader(f"Top {len(recs)} recommendations for {name or 'Candidate'}")
+    for i, r in enumerate(recs, 1):
+        st.markdown(f"### {i}. {r['title']} — {r['organization']}")
+        st.write(f"📍 **Location:** {r.get('location', '')}  |  **Mode:** {r.get('mode', '')}")
+        if r.get("duration_weeks") is not None:
+            st.write(f"⏳ **Duration (weeks):** {r.get('duration_weeks')}")
+        if r.get("stipend_per_month") is not None:
+            st.write(f"💰 **Stipend (per month):** ₹{r.get('stipend_per_month')}")
+        if r.get("requirements"):
+            st.write(f"🔧 **Requirements:** {r.get('requirements')}")
+        if r.get("description"):
+            st.write(f"📝 {r.get('description')}")
+        st.write(f"⭐ **Match score:** {r.get('score')}")
+        st.write("---")
+
+
+def single_candidate(backend):
+    with st.form("candidate_form"):
+        name = st.text_input("Name")
+        education = st.text_input("Education")
+        skills = st.text_input("Skills (comma or semicolon separated)")
+        interests = st.text_input("Interests")
+        preferred_location = st.text_input("Preferred Location")
+        mode = st.selectbox("Preferred Mode", options=["", "Onsite", "Remote", "Hybrid"])
+        min_stipend = st.number_input("Minimum stipend per month (leave 0 for no filter)", min_value=0, value=0)
+        max_duration = st.number_input("Maximum duration (weeks) (leave 0 for no filter)", min_value=0, value=0)
+        top_n = st.slider("Number of recommendations", min_value=1, max_value=20, value=5)
+        submitted = st.form_submit_button("Get Recommendations")
+
+    if submitted:
+        candidate = {
+            "education": education,
+            "skills": skills,
+            "interests": interests,
+            "preferred_location": preferred_location,
+            "mode": mode,
+            "min_stipend": int(min_stipend) if min_stipend and min_stipend > 0 else None,
+            "max_duration_weeks": int(max_duration) if max_duration and max_duration > 0 else None
+        }
+
+        try:
+            recs = backend.recommend(candidate, top_n)
+            if recs:
+                render_recommendations(name, recs)
+            else:
+                st.warning("No recommendations found. Try different skills or remove strict filters.")
+        except Exception as e:
+            st.error(f"Error while getting recommendations: {e}")
+
+
+def bulk_compare(backend):
+    st.write("Upload a candidates file (same columns as `data/candidates.csv`) to score every candidate and "
+             "compare their matches side by side.")
+    upload = st.file_uploader("Candidates file", type=["csv", "tsv", "txt"])
+    top_n = st.slider("Matches per candidate", min_value=1, max_value=10, value=3, key="bulk_top_n")
+    if upload is None:
+        return
+
+    # Results are kept per session, so widget reruns redraw them instead of rescoring
+    run_key = (hashlib.sha256(upload.getvalue()).hexdigest(), top_n, backend.name)
+    done = st.session_state.get("bulk")
+    if done is not None and done["key"] != run_key:
+        done = None
+    if done is None and not st.button("Score candidates"):
+        return
+
+    if done is None:
+        try:
+            records, total = _read_candidates(upload)
+        except Exception as e:
+            st.error(f"Could not read the candidates file: {e}")
+            return
+        if total > len(records):
+            st.warning(f"Only the first {len(records)} of {total} candidates are scored.")
+
+        progress = st.progress(0.0, text="Scoring candidates...")
+        table = st.empty()
+        compare, flat = [], []
+        started = time.perf_counter()
+        try:
+            for start in range(0, len(records), BULK_CHUNK):
+                chunk = records[start:start + BULK_CHUNK]
+                results = backend.recommend_batch([_candidate(r) for r in chunk], top_n)
+                compare.extend(_compare_rows(chunk, results, top_n))
+                flat.extend(_result_rows(chunk, results))
+                scored = start + len(chunk)
+                progress.progress(scored / len(records), text=f"{scored} / {len(records)} candidates scored")
+                table.dataframe(pd.DataFrame(compare), use_container_width=True, hide_index=True)
+        except Exception as e:
+            st.error(f"Error while scoring candidates: {e}")
+            return
+        progress.progress(1.0, text=f"{len(records)} candidates scored in {time.perf_counter() - started:.1f}s")
+        done = st.session_state["bulk"] = {"key": run_key, "compare": compare, "flat": flat}
+    else:
+        st.dataframe(pd.DataFrame(done["compare"]), use_container_width=True, hide_index=True)
+
+    csv = pd.DataFrame(done["flat"], columns=RESULT_COLUMNS).to_csv(index=False).encode("utf-8")
+    st.download_button("Download results (CSV)", csv, file_name="results.csv", mime="text/csv")
+
 
 st.set_page_config(page_title="Internship Recommendation System", layout="wide")
 st.title("💼 Internship Recommendation System (Streamlit)")
 
-with st.form("candidate_form"):
-    name = st.text_input("Name")
-    education = st.text_input("Education")
-    skills = st.text_input("Skills (comma or semicolon separated)")
-    interests = st.text_input("Interests")
-    preferred_location = st.text_input("Preferred Location")
-    mode = st.selectbox("Preferred Mode", options=["", "Onsite", "Remote", "Hybrid"])
-    min_stipend = st.number_input("Minimum stipend per month (leave 0 for no filter)", min_value=0, value=0)
-    max_duration = st.number_input("Maximum duration (weeks) (leave 0 for no filter)", min_value=0, value=0)
-    top_n = st.slider("Number of recommendations", min_value=1, max_value=20, value=5)
-    submitted = st.form_submit_button("Get Recommendations")
-
-if submitted:
-    candidate = {
-        "education": education,
-        "skills": skills,
-        "interests": interests,
-        "preferred_location": preferred_location,
-        "mode": mode,
-        "min_stipend": int(min_stipend) if min_stipend and min_stipend > 0 else None,
-        "max_duration_weeks": int(max_duration) if max_duration and max_duration > 0 else None
-    }
-
-    try:
-        recs = recommend_for_candidate(candidate, top_n=top_n)
-        if recs:
-            st.subheader(f"Top {len(recs)} recommendations for {name or 'Candidate'}")
-            for i, r in enumerate(recs, 1):
-                st.markdown(f"### {i}. {r['title']} — {r['organization']}")
-                st.write(f"📍 **Location:** {r.get('location', '')}  |  **Mode:** {r.get('mode', '')}")
-                if r.get("duration_weeks") is not None:
-                    st.write(f"⏳ **Duration (weeks):** {r.get('duration_weeks')}")
-                if r.get("stipend_per_month") is not None:
-                    st.write(f"💰 **Stipend (per month):** ₹{r.get('stipend_per_month')}")
-                if r.get("requirements"):
-                    st.write(f"🔧 **Requirements:** {r.get('requirements')}")
-                if r.get("description"):
-                    st.write(f"📝 {r.get('description')}")
-                st.write(f"⭐ **Match score:** {r.get('score')}")
-                st.write("---")
-        else:
-            st.warning("No recommendations found. Try different skills or remove strict filters.")
-    except Exception as e:
-        st.error(f"Error while getting recommendations: {e}")
+backend = get_backend()
+st.caption(f"Scoring with the {backend.name}")
+
+single_tab, bulk_tab = st.tabs(["Single candidate", "Bulk compare"])
+with single_tab:
+    single_candidate(backend)
+with bulk_tab:
+    bulk_compare(backend)
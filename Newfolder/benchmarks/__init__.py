@@ -0,0 +1 @@
+"""Benchmarks for the recommender: synthetic catalogs (synthetic.py) and the scaling suite (suite.py)."""
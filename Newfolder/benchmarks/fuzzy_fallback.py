@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the fuzzy skills fallback.
+Compares the original per-row difflib loop against notebooks.fuzzy.SkillMatcher
+on the internship catalog, for a set of vague skill queries.
+
+Usage: python benchmarks/fuzzy_fallback.py [--repeat 5]
+"""
+
+import argparse
+import difflib
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notebooks.fuzzy import split_skills  # noqa: E402
+from notebooks.recommend import _normalize_internships, get_engine  # noqa: E402
+
+QUERIES = [
+    "Python, SQL",
+    "pythn, sqll",
+    "Communcation; Reporting",
+    "Legal Research, Documentation",
+    "Arduino, IoT, Sensors",
+    "excel",
+]
+
+
+def _job_texts():
+    # all_requirements is derived, not stored: rebuild it from the catalog's req_N columns
+    df = _normalize_internships(get_engine().catalog.to_frame())
+    return [(str(r) + " " + str(a)).lower() for r, a in zip(df["requirements"], df["all_requirements"])]
+
+
+def legacy_scores(tokens):
+    """The original loop: every row, every token, difflib against the whole requirements text."""
+    out = np.zeros(get_engine().n_rows, dtype=float)
+    for i, job_text in enumerate(_job_texts()):
+        match_score = 0.0
+        for t in tokens:
+            if t in job_text:
+                match_score += 1.0
+            elif difflib.SequenceMatcher(None, t, job_text).ratio() >= 0.45:
+                match_score += 0.5
+        out[i] = match_score
+    return out
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (best time is reported)")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    print(f"Catalog rows: {engine.n_rows}")
+    print(f"{'query':<34}{'legacy ms':>12}{'index ms':>12}{'speedup':>10}{'matched':>12}{'same scores':>13}")
+    for query in QUERIES:
+        tokens = split_skills(query)
+        legacy_s, legacy = _time(lambda: legacy_scores(tokens), args.repeat)
+        index_s, new = _time(lambda: engine.skills.score(tokens), args.repeat)
+        print(
+            f"{query:<34}{legacy_s * 1e3:>12.2f}{index_s * 1e3:>12.2f}{legacy_s / index_s:>9.0f}x"
+            f"{int((new > 0).sum()):>12}{str(np.array_equal(legacy, new)):>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
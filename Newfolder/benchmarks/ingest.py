@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark for catalog ingestion (notebooks/ingest.py).
+
+Writes a synthetic catalog of the requested size (tab-separated like
+data/internships.csv, or Parquet with --format parquet), then, each in a
+fresh process, times reading + normalizing it chunk by chunk, the full
+in-memory fit (TF-IDF, catalog store and indexes) and the artifact build
+(same fit, with the n-gram indexes spilled to disk per chunk and merged into
+the artifact files), with the peak RSS of each.
+
+Usage: python benchmarks/ingest.py [--rows 1000000] [--chunk-rows 50000] [--format tsv|parquet] [--file PATH]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.suite import peak_rss_mb  # noqa: E402
+from benchmarks.synthetic import load_source, make_catalog  # noqa: E402
+
+# Rows generated per step while writing the synthetic file
+WRITE_CHUNK = 100_000
+
+
+def write_source(path, n_rows, fmt, seed=0):
+    source = load_source()
+    chunks = (make_catalog(min(WRITE_CHUNK, n_rows - start), seed + i, source=source)
+              for i, start in enumerate(range(0, n_rows, WRITE_CHUNK)))
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for df in chunks:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+        return
+    for i, df in enumerate(chunks):
+        df.to_csv(path, sep="\t", index=False, header=i == 0, mode="w" if i == 0 else "a")
+
+
+def _measure(stage, path, chunk_rows):
+    # Runs in a fresh process, so the peak RSS is this stage's alone
+    from notebooks import ingest, recommend
+
+    started = time.perf_counter()
+    if stage == "read":
+        rows = sum(len(recommend._normalize_internships(df)) for df in ingest.iter_frames(path, chunk_rows))
+    elif stage == "artifact":
+        from notebooks.artifact import build_artifact
+
+        ingest.CHUNK_ROWS = chunk_rows
+        with tempfile.TemporaryDirectory() as out:
+            rows = build_artifact(path, os.path.join(out, "model"), force=True)["n_rows"]
+    else:
+        catalog, _, matrix, _ = recommend._fit_catalog(path, chunk_rows=chunk_rows)
+        rows = catalog.n_rows
+    return {"stage": stage, "rows": rows, "seconds": time.perf_counter() - started, "peak_rss_mb": peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="synthetic catalog size")
+    parser.add_argument("--chunk-rows", type=int, default=50_000, help="rows per ingestion chunk")
+    parser.add_argument("--format", choices=["tsv", "parquet"], default="tsv")
+    parser.add_argument("--file", help="use (or write once and keep) this source file")
+    args = parser.parse_args()
+
+    path = args.file or os.path.join(tempfile.gettempdir(), f"catalog-{args.rows}.{args.format}")
+    if not os.path.exists(path):
+        print(f"⏳ Writing a {args.rows:,}-row catalog to {path}...", flush=True)
+        write_source(path, args.rows, args.format)
+    print(f"Source: {path} ({os.path.getsize(path) / 1e6:.0f} MB), chunks of {args.chunk_rows:,} rows\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'stage':<8}{'rows':>12}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>14}")
+    for stage in ("read", "fit", "artifact"):
+        with ctx.Pool(1) as pool:
+            result = pool.apply(_measure, (stage, path, args.chunk_rows))
+        print(f"{stage:<8}{result['rows']:>12,}{result['seconds']:>10.1f}"
+              f"{result['rows'] / result['seconds']:>12,.0f}{result['peak_rss_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark for response size and serialization (fields projection, JSON encoders).
+
+Fits the engine on a synthetic catalog, ranks a set of candidates once, then
+for each projection times building the recommendation dicts (materialize)
+and encoding the /recommend response body with each encoder: FastAPI's
+default path for a returned dict (jsonable_encoder + JSONResponse), the
+stdlib encoder the API falls back to, and orjson when it is installed.
+
+Usage: python benchmarks/serialize.py [--rows 10000] [--requests 200] [--top-n 20]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import load_source, make_catalog, make_candidates  # noqa: E402
+
+# Projection name -> fields (None: every field)
+PROJECTIONS = {
+    "full": None,
+    "card": ["title", "organization", "location", "mode", "stipend_per_month", "score"],
+    "list": ["title", "organization", "score"],
+}
+
+
+def encoders():
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    found = {
+        "fastapi_default": lambda body: JSONResponse(jsonable_encoder(body)).body,
+        "json": lambda body: json.dumps(body, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8"),
+    }
+    try:
+        import orjson
+    except ImportError:
+        return found
+    found["orjson"] = lambda body: orjson.dumps(body, option=orjson.OPT_SERIALIZE_NUMPY)
+    return found
+
+
+def _per_call_us(fn, args_list):
+    started = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="synthetic catalog size")
+    parser.add_argument("--requests", type=int, default=200, help="candidates per measurement")
+    parser.add_argument("--top-n", type=int, default=20, help="recommendations per response")
+    args = parser.parse_args()
+
+    from notebooks import recommend
+
+    source = load_source()
+    engine = recommend.RecommendationEngine(
+        *recommend._fit_frame(recommend._normalize_internships(make_catalog(args.rows, 0, source=source))))
+    cands = make_candidates(args.requests, seed=1, source=source)
+    ranked = [engine._ranked_for(c, args.top_n) for c in cands]
+    encode = encoders()
+
+    print(f"{args.rows:,} rows, {args.requests} responses of top {args.top_n}; times are µs per response\n")
+    print(f"{'fields':<8}{'bytes':>10}{'materialize':>13}" + "".join(f"{name:>17}" for name in encode))
+    for name, fields in PROJECTIONS.items():
+        projection = recommend.project_fields(fields)
+        materialize = _per_call_us(lambda rows, scores: engine._materialize(rows, scores, projection), ranked)
+        bodies = [({"recommendations": engine._materialize(rows, scores, projection)},) for rows, scores in ranked]
+        size = np.mean([len(encode["json"](*body)) for body in bodies])
+        timings = [_per_call_us(fn, bodies) for fn in encode.values()]
+        print(f"{name:<8}{size:>10,.0f}{materialize:>13.1f}" + "".join(f"{t:>17.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
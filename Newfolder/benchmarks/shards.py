@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the sharded (scatter-gather) catalog.
+
+Builds one synthetic catalog, then for each shard count measures per-request
+latency (one request at a time) and throughput with several request threads,
+and checks that every ranking is identical to the single-process ranking.
+Shard count 1 is the in-process baseline.
+
+Usage: python benchmarks/shards.py [--rows 200000] [--shards 1,2,4,8] [--threads 8] [--requests 200]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the project directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.suite import peak_rss_mb, summarize  # noqa: E402
+from benchmarks.synthetic import load_source, make_catalog, make_candidates  # noqa: E402
+from notebooks import recommend  # noqa: E402
+
+
+def _latencies(engine, cands, top_n):
+    out = []
+    for c in cands:
+        start = time.perf_counter()
+        engine.recommend(c, top_n=top_n)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def _throughput(engine, cands, top_n, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda c: engine.recommend(c, top_n=top_n), cands))
+        return len(cands) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="synthetic catalog size")
+    parser.add_argument("--shards", default="1,2,4,8", help="comma-separated shard counts (1 = in-process)")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent request threads for throughput")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--retrieval", choices=["auto", "dense", "sparse"], default="dense",
+                        help="ranking inside each shard")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Measure ranking, not the caches
+    recommend.RESULT_CACHE.max_entries = recommend.SCORE_CACHE.max_entries = 0
+    recommend.RETRIEVAL = args.retrieval
+    source = load_source()
+    print(f"⏳ Building a {args.rows:,}-row catalog...", flush=True)
+    fitted = recommend._fit_frame(recommend._normalize_internships(make_catalog(args.rows, args.seed, source=source)))
+    cands = make_candidates(args.requests, seed=args.seed + 1, source=source, mode=True, location=True)
+
+    expected = None
+    print(f"\n{'shards':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s x' + str(args.threads):>14}"
+          f"{'start s':>10}{'identical':>11}")
+    for n_shards in [int(s) for s in args.shards.split(",") if s.strip()]:
+        recommend.SHARDS = n_shards
+        engine = recommend.RecommendationEngine(*fitted)
+        started = time.perf_counter()
+        engine.recommend(cands[0], top_n=args.top_n)  # starts the shard processes
+        start_s = time.perf_counter() - started
+        results = [engine.recommend(c, top_n=args.top_n) for c in cands]
+        if expected is None:
+            expected = results
+        stats = summarize(_latencies(engine, cands, args.top_n))
+        rate = _throughput(engine, cands, args.top_n, args.threads)
+        print(f"{n_shards:>6}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{rate:>14.1f}{start_s:>10.2f}{str(results == expected):>11}")
+        if engine.n_shards:
+            engine.retriever.close()
+    print(f"\nPeak RSS (coordinator): {peak_rss_mb()} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the recommender on synthetic catalogs.
+
+For each catalog size, a fresh process builds a synthetic catalog
+(benchmarks/synthetic.py), fits the engine and times its scenarios: plain
+TF-IDF, every filter, the location boost, the fuzzy fallback, the batch path
+and a warm result cache. It reports p50/p95/p99 latency, throughput and peak
+RSS per size, writes everything as JSON and can compare it against a stored
+baseline (exit status 1 on a regression).
+
+Usage:
+    python benchmarks/suite.py [--sizes 2500,10000,100000] [--requests 200] [--out FILE]
+    python benchmarks/suite.py --sizes 2500,10000,100000,1000000      # full range
+    python benchmarks/suite.py --baseline benchmarks/baseline.json    # compare
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --retrieval dense                     # force brute-force scoring
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Add the project directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import load_source, make_catalog, make_candidates  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_SIZES = [2_500, 10_000, 100_000]
+DEFAULT_OUT = BENCH_DIR / "results" / "latest.json"
+
+# Scenario name -> make_candidates() filters
+SCENARIOS = {
+    "tfidf": {},
+    "filter_mode": {"mode": True},
+    "filter_min_stipend": {"min_stipend": True},
+    "filter_max_stipend": {"max_stipend": True},
+    "filter_max_duration": {"max_duration_weeks": True},
+    "filter_domain": {"domain": True},
+    "filter_education_level": {"education_level": True},
+    "location_boost": {"location": True},
+    "all_filters": {
+        "mode": True, "location": True, "min_stipend": True, "max_stipend": True,
+        "max_duration_weeks": True, "domain": True, "education_level": True,
+    },
+    "fuzzy_fallback": {"typos": True},
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies, items=None):
+    """Latency percentiles (ms) and throughput for a list of per-call durations (seconds)."""
+    lat = np.asarray(latencies) * 1e3
+    total = float(np.sum(latencies))
+    return {
+        "calls": len(lat),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        "mean_ms": round(float(lat.mean()), 3),
+        "throughput_per_s": round((items or len(lat)) / total, 1) if total else None,
+    }
+
+
+def _timed(fn, args_list, warmup):
+    for args in args_list[:warmup]:
+        fn(*args)
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_size(size, seed, n_requests, batch_size, top_n, warmup):
+    """Build a catalog of `size` rows and time every scenario against it (runs in its own process)."""
+    from notebooks import recommend
+
+    source = load_source()
+    started = time.perf_counter()
+    raw = make_catalog(size, seed, source=source)
+    generate_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    engine = recommend.RecommendationEngine(*recommend._fit_frame(recommend._normalize_internships(raw)))
+    build_s = time.perf_counter() - started
+    rss_after_build = peak_rss_mb()
+
+    # Measure the uncached path; the cache gets its own scenario
+    saved = recommend.RESULT_CACHE.max_entries, recommend.SCORE_CACHE.max_entries
+    recommend.RESULT_CACHE.max_entries = recommend.SCORE_CACHE.max_entries = 0
+    recommend.clear_caches()
+
+    scenarios = {}
+    for i, (name, filters) in enumerate(SCENARIOS.items()):
+        cands = make_candidates(n_requests, seed=seed + 1 + i, source=source, **filters)
+        latencies = _timed(lambda c: engine.recommend(c, top_n=top_n), [(c,) for c in cands], warmup)
+        scenarios[name] = summarize(latencies)
+
+    # Batch path: latency per batch, throughput in candidates per second
+    cands = make_candidates(n_requests, seed=seed + 100, source=source)
+    batches = [(cands[i:i + batch_size],) for i in range(0, len(cands), batch_size)]
+    latencies = _timed(lambda b: list(engine.iter_recommendations(b, top_n=top_n)), batches, min(warmup, 1))
+    scenarios["batch"] = dict(summarize(latencies, items=len(cands)), batch_size=batch_size)
+
+    # Warm result cache: a small working set requested over and over
+    recommend.RESULT_CACHE.max_entries, recommend.SCORE_CACHE.max_entries = saved
+    hot = make_candidates(20, seed=seed + 200, source=source)
+    for c in hot:
+        engine.recommend(c, top_n=top_n)
+    repeats = [(hot[i % len(hot)],) for i in range(n_requests)]
+    scenarios["cache_hit"] = summarize(_timed(lambda c: engine.recommend(c, top_n=top_n), repeats, 0))
+    recommend.clear_caches()
+
+    return {
+        "rows": size,
+        "generate_s": round(generate_s, 3),
+        "build_s": round(build_s, 3),
+        "vocabulary": len(engine.vectorizer.vocabulary_),
+        "rss_after_build_mb": rss_after_build,
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenarios,
+    }
+
+
+def environment():
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=BENCH_DIR, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "commit": commit,
+    }
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Regressions of p50/p95 against the baseline, as (size, scenario, metric, old, new) tuples."""
+    regressions = []
+    old_sizes = {str(r["rows"]): r for r in baseline["results"]}
+    for result in current["results"]:
+        old = old_sizes.get(str(result["rows"]))
+        if old is None:
+            continue
+        for name, stats in result["scenarios"].items():
+            old_stats = old["scenarios"].get(name)
+            if old_stats is None:
+                continue
+            for metric in ("p50_ms", "p95_ms"):
+                before, after = old_stats[metric], stats[metric]
+                if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                    regressions.append((result["rows"], name, metric, before, after))
+    return regressions
+
+
+def print_report(report):
+    for result in report["results"]:
+        print(f"\n📊 {result['rows']:,} rows  (build {result['build_s']:.2f}s, "
+              f"vocabulary {result['vocabulary']:,}, peak RSS {result['peak_rss_mb']} MB)")
+        print(f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>12}")
+        for name, stats in result["scenarios"].items():
+            print(f"{name:<24}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                  f"{stats['throughput_per_s'] or 0:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated catalog sizes")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--batch-size", type=int, default=64, help="candidates per batch in the batch scenario")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--retrieval", choices=["auto", "dense", "sparse"], default="auto",
+                        help="ranking path (RECOMMENDER_RETRIEVAL)")
+    parser.add_argument("--out", default=str(DEFAULT_OUT), help="where to write the JSON results")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown vs the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    parser.add_argument("--save-baseline", help="also write the results to this baseline file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    # Read by notebooks.recommend when each size's process imports it
+    os.environ["RECOMMENDER_RETRIEVAL"] = args.retrieval
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: v for k, v in vars(args).items() if k in ("requests", "batch_size", "top_n", "warmup", "seed", "retrieval")},
+        "environment": environment(),
+        "results": [],
+    }
+    # One fresh process per size, so peak RSS and import state don't leak between sizes
+    ctx = multiprocessing.get_context("spawn")
+    for size in sizes:
+        print(f"⏳ Benchmarking {size:,} rows...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            result = pool.submit(run_size, size, args.seed, args.requests, args.batch_size,
+                                 args.top_n, args.warmup).result()
+        report["results"].append(result)
+    print_report(report)
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\n✅ Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.baseline}:")
+            for rows, name, metric, before, after in regressions:
+                print(f"   {rows:>9,} rows  {name:<24}{metric}: {before:.2f} -> {after:.2f} ms")
+            return 1
+        print(f"\n✅ No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Synthetic internship catalogs and candidates for the benchmark suite.
+
+Catalogs follow the data/internships.csv schema (title ... requirements,
+req_1..req_6) and draw their values from the real catalog, so text lengths,
+vocabulary, mode mix, stipends and durations match it at any size. Rows are
+recombined rather than copied: requirement terms and description clauses are
+mixed across rows. Everything is driven by a seed, so the same (size, seed)
+always gives the same frame.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOURCE_CSV = Path(__file__).resolve().parent.parent / "data" / "internships.csv"
+REQ_COLS = [f"req_{i}" for i in range(1, 7)]
+
+EDUCATION = [
+    "B.Tech Computer Science", "B.Sc Mathematics", "BBA", "MBA Marketing", "B.Com Finance",
+    "M.Tech Electronics", "BA Journalism", "LLB", "B.Sc Biology", "B.Des",
+]
+EDUCATION_LEVELS = ["b.tech", "mba", "bachelor", "degree", "students"]
+DOMAINS = ["data", "marketing", "research", "finance", "design", "legal", "security", "content"]
+# Misspelled skills: no TF-IDF hit, so these exercise the fuzzy fallback
+TYPO_SKILLS = ["pythn, sqll", "Communcation; Reportng", "Legl Research, Documentaton", "Arduno, IoT, Sensrs", "excell"]
+
+
+def load_source(path=SOURCE_CSV):
+    df = pd.read_csv(path, sep=None, engine="python", encoding="utf-8")
+    df.columns = df.columns.str.strip()
+    return df
+
+
+class Pools:
+    """Value pools taken from the real catalog."""
+
+    def __init__(self, source):
+        self.titles = source["title"].astype(str).to_numpy()
+        self.organizations = source["organization"].astype(str).to_numpy()
+        self.locations = source["location"].astype(str).to_numpy()
+        self.modes = source["mode"].astype(str).to_numpy()
+        self.durations = source["duration_weeks"].to_numpy()
+        self.stipends = source["stipend_per_month"].to_numpy()
+        # Description clauses ("Work with faculty on AI research projects" / "implement models, ...")
+        self.clauses = np.array(sorted({
+            part.strip(" .")
+            for text in source["description"].dropna().astype(str)
+            for part in re.split(r"[:;.]", text)
+            if part.strip(" .")
+        }), dtype=object)
+        self.row_terms = [
+            [str(t) for t in row if isinstance(t, str) and t.strip()]
+            for row in source[[c for c in REQ_COLS if c in source.columns]].to_numpy()
+        ]
+        self.terms = np.array(sorted({t for terms in self.row_terms for t in terms}), dtype=object)
+
+
+def make_catalog(n_rows, seed=0, source=None):
+    """A raw catalog frame of `n_rows` internships in the internships.csv schema."""
+    pools = Pools(load_source() if source is None else source)
+    rng = np.random.default_rng(seed)
+    template = rng.integers(0, len(pools.titles), n_rows)
+    n_extra = rng.integers(0, 3, n_rows)
+    extra_terms = rng.integers(0, len(pools.terms), (n_rows, 2))
+    clauses = rng.integers(0, len(pools.clauses), (n_rows, 2))
+
+    requirements, req_cols, descriptions = [], [[] for _ in REQ_COLS], []
+    for i in range(n_rows):
+        # The template row's requirements plus up to two random extra terms, at most six
+        terms = list(pools.row_terms[template[i]])
+        for t in pools.terms[extra_terms[i, :n_extra[i]]]:
+            if t not in terms:
+                terms.append(t)
+        terms = terms[:len(REQ_COLS)]
+        requirements.append("; ".join(terms))
+        for j, col in enumerate(req_cols):
+            col.append(terms[j] if j < len(terms) else "")
+        a, b = pools.clauses[clauses[i]]
+        descriptions.append(f"{a}: {b}.")
+
+    frame = {
+        "title": pools.titles[template],
+        "organization": pools.organizations[rng.integers(0, len(pools.organizations), n_rows)],
+        "location": pools.locations[rng.integers(0, len(pools.locations), n_rows)],
+        "mode": pools.modes[rng.integers(0, len(pools.modes), n_rows)],
+        "duration_weeks": pools.durations[rng.integers(0, len(pools.durations), n_rows)],
+        "stipend_per_month": pools.stipends[rng.integers(0, len(pools.stipends), n_rows)],
+        "description": descriptions,
+        "requirements": requirements,
+    }
+    for col, values in zip(REQ_COLS, req_cols):
+        frame[col] = values
+    return pd.DataFrame(frame)
+
+
+def make_candidates(n, seed=0, source=None, **filters):
+    """
+    `n` candidate dicts with education / skills / interests drawn from the
+    catalog's vocabulary. Keyword arguments select filters to set on each
+    candidate: mode, location, min_stipend, max_stipend, max_duration_weeks,
+    domain, education_level (True picks a random value per candidate), and
+    typos=True for misspelled skills that miss TF-IDF and hit the fuzzy fallback.
+    """
+    pools = Pools(load_source() if source is None else source)
+    rng = np.random.default_rng(seed)
+    stipends = pools.stipends[~pd.isna(pools.stipends)].astype(float)
+    durations = pools.durations[~pd.isna(pools.durations)].astype(float)
+    candidates = []
+    for _ in range(n):
+        k = int(rng.integers(1, 5))
+        if filters.get("typos"):
+            skills = TYPO_SKILLS[int(rng.integers(0, len(TYPO_SKILLS)))]
+        else:
+            skills = ", ".join(pools.terms[rng.choice(len(pools.terms), k, replace=False)])
+        cand = {
+            "education": EDUCATION[int(rng.integers(0, len(EDUCATION)))],
+            "skills": skills,
+            "interests": "" if filters.get("typos") else str(pools.titles[int(rng.integers(0, len(pools.titles)))]),
+        }
+        if filters.get("mode"):
+            cand["mode"] = str(pools.modes[int(rng.integers(0, len(pools.modes)))])
+        if filters.get("location"):
+            cand["preferred_location"] = str(pools.locations[int(rng.integers(0, len(pools.locations)))])
+        if filters.get("min_stipend"):
+            cand["min_stipend"] = float(np.quantile(stipends, rng.uniform(0.2, 0.8)))
+        if filters.get("max_stipend"):
+            cand["max_stipend"] = float(np.quantile(stipends, rng.uniform(0.3, 0.9)))
+        if filters.get("max_duration_weeks"):
+            cand["max_duration_weeks"] = int(np.quantile(durations, rng.uniform(0.3, 0.9)))
+        if filters.get("domain"):
+            cand["domain"] = DOMAINS[int(rng.integers(0, len(DOMAINS)))]
+        if filters.get("education_level"):
+            cand["education_level"] = EDUCATION_LEVELS[int(rng.integers(0, len(EDUCATION_LEVELS)))]
+        candidates.append(cand)
+    return candidates
+
+
+def write_catalog(path, n_rows, seed=0):
+    """Write a synthetic catalog as a tab-separated file like data/internships.csv."""
+    make_catalog(n_rows, seed).to_csv(path, sep="\t", index=False)
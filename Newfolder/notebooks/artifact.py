@@ -0,0 +1,298 @@
+# notebooks/artifact.py
+"""
+Persisted model artifact for the recommender.
+
+A build step writes the compact catalog columns (notebooks.catalog), the
+fitted TF-IDF vocabulary/idf, the float32 CSR matrix and the filter indexes
+as plain .npy buffers plus a manifest. At startup the recommender memory-maps them instead of parsing
+the CSV and refitting; the artifact is ignored when it is missing or when
+the CSV hash / format version no longer matches (stale).
+
+Build it with:  python -m notebooks.artifact [--csv data/internships.csv] [--out data/model]
+           or:  python -m notebooks.artifact --catalog <id>   (a catalog of RECOMMENDER_CATALOGS)
+Add --if-stale to keep an artifact that is still fresh (what the startup
+scripts run before serving, via build_artifact()). The build spills each
+chunk's indexes to disk and merges them into the artifact one chunk at a
+time, so the n-gram indexes are never all in memory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from notebooks.catalog import CatalogStore
+from notebooks.facets import FacetIndex, RangeIndex
+from notebooks.fuzzy import SkillMatcher
+from notebooks.text_index import SubstringIndex
+
+ARTIFACT_VERSION = 6
+MANIFEST = "manifest.json"
+_INDEX_TYPES = {
+    "SubstringIndex": SubstringIndex,
+    "SkillMatcher": SkillMatcher,
+    "RangeIndex": RangeIndex,
+    "FacetIndex": FacetIndex,
+}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def vectorizer_config(vectorizer):
+    """The options of a TfidfVectorizer that differ from the defaults, as JSON-ready values."""
+    defaults = TfidfVectorizer().get_params()
+    return {k: list(v) if isinstance(v, tuple) else v for k, v in vectorizer.get_params().items() if v != defaults[k]}
+
+
+def _vectorizer(config):
+    # JSON turns the ngram_range tuple into a list
+    return TfidfVectorizer(**{k: tuple(v) if k == "ngram_range" else v for k, v in config.items()})
+
+
+def _save_arrays(out_dir, prefix, arrays):
+    for key, value in arrays.items():
+        np.save(os.path.join(out_dir, f"{prefix}.{key}.npy"), np.asarray(value), allow_pickle=False)
+    return sorted(arrays)
+
+
+def _load_arrays(art_dir, prefix, keys, mmap):
+    mode = "r" if mmap else None
+    return {k: np.load(os.path.join(art_dir, f"{prefix}.{k}.npy"), mmap_mode=mode, allow_pickle=False) for k in keys}
+
+
+class _NpyWriter:
+    """A 1-D .npy file of known length, filled in place at item positions (never memory-mapped)."""
+
+    def __init__(self, path, dtype, length):
+        self.dtype = np.dtype(dtype)
+        self._fh = open(path, "wb")
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": (int(length),)}
+        np.lib.format.write_array_header_1_0(self._fh, header)
+        self._start = self._fh.tell()
+        self._fh.truncate(self._start + self.dtype.itemsize * int(length))
+
+    def write(self, values, at):
+        data = memoryview(np.ascontiguousarray(values, dtype=self.dtype)).cast("B")
+        offset = self._start + int(at) * self.dtype.itemsize
+        while data:
+            written = os.pwrite(self._fh.fileno(), data, offset)
+            data, offset = data[written:], offset + written
+
+    def close(self):
+        self._fh.close()
+
+
+class _IndexParts:
+    """
+    Per-chunk indexes spilled to `parts_dir` during a fit, merged straight into
+    the artifact by save_artifact. Index types with a concat_states() (the
+    n-gram indexes) are merged one part at a time; the others are small and
+    are concatenated in memory.
+    """
+
+    def __init__(self, parts_dir):
+        self.parts_dir = parts_dir
+        self.parts = []  # per chunk: {name: (type name, state keys)}
+
+    def add(self, indexes):
+        prefix = f"part{len(self.parts)}"
+        self.parts.append({name: (type(index).__name__, _save_arrays(self.parts_dir, f"{prefix}.{name}", index.state()))
+                           for name, index in indexes.items()})
+
+    def _loaders(self, name):
+        return [lambda i=i, keys=part[name][1]: _load_arrays(self.parts_dir, f"part{i}.{name}", keys, mmap=True)
+                for i, part in enumerate(self.parts)]
+
+    def write(self, out_dir):
+        """Write each merged index as index.<name>.* into `out_dir`; returns the manifest's index entries."""
+        meta = {}
+        for name, (type_name, _) in self.parts[0].items():
+            cls, prefix = _INDEX_TYPES[type_name], f"index.{name}"
+            loaders = self._loaders(name)
+            if hasattr(cls, "concat_states"):
+                keys = cls.concat_states(
+                    loaders,
+                    lambda key, arr: _save_arrays(out_dir, prefix, {key: arr}),
+                    lambda key, dtype, length: _NpyWriter(os.path.join(out_dir, f"{prefix}.{key}.npy"), dtype, length),
+                )
+            else:
+                keys = _save_arrays(out_dir, prefix, cls.concat([cls.from_state(load()) for load in loaders]).state())
+            meta[name] = {"type": type_name, "keys": keys}
+        return meta
+
+
+def save_artifact(out_dir, source_path, catalog, vectorizer, matrix, indexes):
+    """
+    Write the artifact for `source_path` into `out_dir`. `catalog` is a
+    CatalogStore (or a normalized DataFrame); `indexes` a dict of indexes, or
+    the _IndexParts of a spilled fit. The directory is written next to the
+    target and swapped in, so readers never see a partial artifact.
+    """
+    out_dir = os.path.abspath(out_dir)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    if not isinstance(catalog, CatalogStore):
+        catalog = CatalogStore.from_frame(catalog)
+    columns, column_arrays = catalog.state()
+    for name, arr in column_arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(arr), allow_pickle=False)
+
+    matrix = sp.csr_matrix(matrix)
+    vocab = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    with open(os.path.join(tmp_dir, "vocabulary.json"), "w", encoding="utf-8") as fh:
+        json.dump(vocab, fh, ensure_ascii=False)
+    _save_arrays(tmp_dir, "tfidf", {"idf": vectorizer.idf_, "data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr})
+
+    if isinstance(indexes, _IndexParts):
+        index_meta = indexes.write(tmp_dir)
+    else:
+        index_meta = {}
+        for name, index in indexes.items():
+            index_meta[name] = {"type": type(index).__name__, "keys": _save_arrays(tmp_dir, f"index.{name}", index.state())}
+
+    manifest = {
+        "format_version": ARTIFACT_VERSION,
+        "source_sha256": file_sha256(source_path),
+        "source_name": os.path.basename(source_path),
+        "sklearn_version": sklearn.__version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "n_rows": int(catalog.n_rows),
+        "vectorizer": vectorizer_config(vectorizer),
+        "tfidf_shape": list(matrix.shape),
+        "columns": columns,
+        "indexes": index_meta,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    old_dir = f"{out_dir}.old-{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(art_dir):
+    path = os.path.join(art_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def is_fresh(manifest, source_path, vectorizer=None):
+    """
+    True when the artifact was built by this format/sklearn version from this
+    exact CSV (and, when given, with these vectorizer_config() options).
+    """
+    return (
+        manifest is not None
+        and manifest.get("format_version") == ARTIFACT_VERSION
+        and manifest.get("sklearn_version") == sklearn.__version__
+        and (vectorizer is None or manifest.get("vectorizer") == vectorizer)
+        and os.path.exists(source_path)
+        and manifest.get("source_sha256") == file_sha256(source_path)
+    )
+
+
+def load_artifact(art_dir, source_path, mmap=True, vectorizer=None):
+    """
+    Load (catalog, vectorizer, matrix, indexes) from `art_dir`, memory-mapping
+    the buffers. Returns None if the artifact is missing or stale.
+    """
+    manifest = read_manifest(art_dir)
+    if not is_fresh(manifest, source_path, vectorizer):
+        return None
+
+    catalog = CatalogStore.from_state(manifest["columns"], lambda prefix, keys: _load_arrays(art_dir, prefix, keys, mmap))
+
+    with open(os.path.join(art_dir, "vocabulary.json"), encoding="utf-8") as fh:
+        vocab = json.load(fh)
+    tfidf = _load_arrays(art_dir, "tfidf", ["idf", "data", "indices", "indptr"], mmap)
+    vectorizer = _vectorizer(manifest["vectorizer"])
+    vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocab)}
+    vectorizer.idf_ = np.asarray(tfidf["idf"])
+    matrix = sp.csr_matrix((tfidf["data"], tfidf["indices"], tfidf["indptr"]), shape=tuple(manifest["tfidf_shape"]), copy=False)
+
+    indexes = {}
+    for name, meta in manifest["indexes"].items():
+        state = _load_arrays(art_dir, f"index.{name}", meta["keys"], mmap)
+        indexes[name] = _INDEX_TYPES[meta["type"]].from_state(state)
+    return catalog, vectorizer, matrix, indexes
+
+
+def build_artifact(csv_path=None, out_dir=None, vectorizer=None, force=False):
+    """
+    Fit the catalog at `csv_path` and write its artifact to `out_dir` (defaults:
+    the recommender's CSV_PATH / ARTIFACT_DIR), with `vectorizer` overriding the
+    VECTORIZER options. Unless `force`, a fresh artifact is kept as it is and
+    None is returned; otherwise returns the new manifest.
+    """
+    from notebooks import recommend
+
+    csv_path = csv_path or recommend.CSV_PATH
+    out_dir = out_dir or recommend.ARTIFACT_DIR
+    if not force:
+        expected = vectorizer_config(TfidfVectorizer(**{**recommend.VECTORIZER, **(vectorizer or {})}))
+        if is_fresh(read_manifest(out_dir), csv_path, expected):
+            return None
+    # Each chunk's indexes go to disk as soon as they are built and are merged
+    # into the artifact file by file, so they are never all in memory at once
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix=".index-parts-", dir=parent) as parts_dir:
+        parts = _IndexParts(parts_dir)
+        catalog, fitted, matrix, _ = recommend._fit_catalog(csv_path, vectorizer=vectorizer, index_parts=parts.add)
+        return save_artifact(out_dir, csv_path, catalog, fitted, matrix, parts)
+
+
+def main():
+    from notebooks import recommend
+
+    parser = argparse.ArgumentParser(description="Build the recommender model artifact")
+    parser.add_argument("--csv", help=f"internships CSV to build from (default: {recommend.CSV_PATH})")
+    parser.add_argument("--out", help=f"artifact directory (default: {recommend.ARTIFACT_DIR})")
+    parser.add_argument("--catalog", help="build for this catalog id of RECOMMENDER_CATALOGS (its path, "
+                                          "artifact_dir and vectorizer options)")
+    parser.add_argument("--if-stale", action="store_true", help="keep the artifact if it is still fresh")
+    args = parser.parse_args()
+
+    spec = {}
+    if args.catalog:
+        from notebooks.service import load_catalog_specs
+        spec = load_catalog_specs().get(args.catalog)
+        if spec is None:
+            parser.error(f"unknown catalog {args.catalog!r}")
+        if not (args.out or spec.get("artifact_dir")):
+            parser.error(f"catalog {args.catalog!r} has no artifact_dir; pass --out")
+    csv_path = args.csv or spec.get("path") or recommend.CSV_PATH
+    out_dir = args.out or spec.get("artifact_dir") or recommend.ARTIFACT_DIR
+
+    started = time.perf_counter()
+    manifest = build_artifact(csv_path, out_dir, vectorizer=spec.get("vectorizer"), force=not args.if_stale)
+    if manifest is None:
+        print(f"✅ Artifact in {out_dir} is up to date")
+        return
+    print(f"✅ Wrote artifact v{manifest['format_version']} for {manifest['n_rows']} internships "
+          f"to {out_dir} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# notebooks/cache.py
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class CursorExpired(LookupError):
+    """A pagination cursor whose ranked list was evicted, timed out or belongs to a replaced catalog."""
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by entry count and (estimated) bytes, with a TTL.
+
+    `sizeof(value)` estimates the size of a value in bytes. Entries older than
+    `ttl` seconds are treated as misses and dropped on access. A cache with
+    max_entries=0 stores nothing.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300.0, sizeof=sys.getsizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (value, size, stored_at)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size, time.monotonic())
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def _text(value):
+    # Profile text: TF-IDF tokens ignore case and runs of whitespace
+    return " ".join(str(value or "").lower().split())
+
+
+def _skills(value):
+    # Skills feed the TF-IDF profile (whitespace-insensitive) and the fuzzy
+    # fallback's tokens, where whitespace inside a skill is significant
+    from notebooks.fuzzy import split_skills
+    return _text(value), tuple(split_skills(value))
+
+
+def _filter(value):
+    # Filter text: matched as a lowercased, stripped substring
+    return str(value or "").strip().lower()
+
+
+def _mode(value):
+    # The mode filter matches the normalized mode ("on-site" and "Onsite" are one filter)
+    from notebooks.facets import normalize_mode
+    return normalize_mode(value)
+
+
+def _number(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def canonical_request(candidate):
+    """Hashable, normalized form of a candidate dict: equal for requests that rank identically."""
+    education_level = _filter(candidate.get("education_level"))
+    return (
+        _text(candidate.get("education")),
+        _skills(candidate.get("skills")),
+        _text(candidate.get("interests")),
+        _filter(candidate.get("preferred_location")),
+        _mode(candidate.get("mode")),
+        _number(candidate.get("min_stipend")),
+        _number(candidate.get("max_duration_weeks")),
+        _number(candidate.get("max_stipend")),
+        _filter(candidate.get("domain")),
+        "" if education_level == "any" else education_level,
+    )
+
+
+def sizeof_recommendations(recs):
+    """Rough size in bytes of a list of recommendation dicts."""
+    size = sys.getsizeof(recs)
+    for rec in recs:
+        size += sys.getsizeof(rec)
+        for value in rec.values():
+            size += sys.getsizeof(value)
+    return size
+
+
+def sizeof_array(arr):
+    return int(arr.nbytes) + 112
+
+
+def sizeof_ranking(entry):
+    """Size of a (cache token, rows, scores) ranked list."""
+    return 64 + sum(sizeof_array(arr) for arr in entry[1:])
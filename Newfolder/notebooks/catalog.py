@@ -0,0 +1,273 @@
+# notebooks/catalog.py
+"""
+Compact column store for the internship catalog.
+
+The engine used to hold the parsed catalog as a pandas DataFrame: one
+Python string object per cell, repeated values (cities, modes,
+organizations, skill terms) stored again on every row, and a derived
+all_requirements column duplicating the req_N columns. CatalogStore keeps:
+
+- low-cardinality text (location, mode, organization, req_N) dictionary
+  encoded: one small integer code per row plus each distinct value once;
+- free text (title, description, requirements, ...) as one UTF-8 buffer
+  with row offsets (notebooks.columns.StringColumn), decoded only for the
+  rows that are returned;
+- numeric columns as float64 arrays (NaN for missing).
+
+Every buffer can be memory-mapped from the model artifact. memory() reports
+the bytes held per column.
+"""
+import numpy as np
+import pandas as pd
+
+from notebooks.columns import StringColumn, decode_strings, encode_strings
+
+# Dictionary encoded; req_N columns are added to this set automatically
+CATEGORICAL = ("location", "mode", "organization")
+# Derived from other columns, so never stored
+DERIVED = ("all_requirements",)
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class CategoricalColumn:
+    """Dictionary-encoded strings: int codes per row into a list of distinct values (-1 = missing)."""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = np.asarray(categories, dtype=object)
+        self._lookup = None
+
+    @staticmethod
+    def _code_dtype(n_categories):
+        return np.int8 if n_categories < 127 else np.int16 if n_categories < 32767 else np.int32
+
+    @classmethod
+    def from_values(cls, values):
+        codes, uniques = pd.factorize(pd.Series(list(values), dtype=object), use_na_sentinel=True)
+        uniques = [str(u) for u in uniques]
+        return cls(codes.astype(cls._code_dtype(len(uniques))), uniques)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return None if code < 0 else self.categories[code]
+
+    def take(self, rows):
+        codes = np.asarray(self.codes)[np.asarray(rows, dtype=np.int64)]
+        if self.categories.size == 0:
+            return [None] * codes.size
+        out = self.categories[np.maximum(codes, 0)]
+        out[codes < 0] = None
+        return out.tolist()
+
+    def values(self):
+        """Every row as an object array (NaN for missing, as pandas would read it)."""
+        out = np.empty(len(self.codes), dtype=object)
+        codes = np.asarray(self.codes)
+        present = codes >= 0
+        out[present] = self.categories[codes[present]]
+        out[~present] = np.nan
+        return out
+
+    def extended(self, values):
+        """A new column with `values` appended; new distinct values are added to the dictionary."""
+        if self._lookup is None:
+            self._lookup = {c: i for i, c in enumerate(self.categories.tolist())}
+        lookup = dict(self._lookup)
+        categories = self.categories.tolist()
+        new_codes = []
+        for value in values:
+            if _missing(value):
+                new_codes.append(-1)
+                continue
+            value = str(value)
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(categories)
+                categories.append(value)
+            new_codes.append(code)
+        dtype = np.promote_types(self._code_dtype(len(categories)), np.asarray(self.codes).dtype)
+        codes = np.concatenate([np.asarray(self.codes, dtype=dtype), np.array(new_codes, dtype=dtype)])
+        column = CategoricalColumn(codes, categories)
+        column._lookup = lookup
+        return column
+
+    @classmethod
+    def concat(cls, columns):
+        """One column holding the rows of `columns` in order, with their dictionaries merged."""
+        lookup, categories, parts = {}, [], []
+        for column in columns:
+            remap = np.array([lookup.setdefault(c, len(lookup)) for c in column.categories.tolist()] + [-1], dtype=np.int64)
+            # Code -1 (missing) indexes the trailing -1
+            parts.append(remap[np.asarray(column.codes, dtype=np.int64)])
+        categories = list(lookup)
+        codes = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        column = cls(codes.astype(cls._code_dtype(len(categories))), categories)
+        column._lookup = lookup
+        return column
+
+    @property
+    def nbytes(self):
+        return int(np.asarray(self.codes).nbytes + sum(len(c.encode("utf-8")) for c in self.categories))
+
+    def state(self):
+        offsets, data = encode_strings(self.categories)
+        return {"codes": self.codes, "categories_offsets": offsets, "categories_data": data}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["codes"], decode_strings(state["categories_offsets"], state["categories_data"]))
+
+
+class NumericColumn:
+    """A float64 column (NaN for missing)."""
+
+    def __init__(self, values):
+        self.array = values
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(pd.to_numeric(pd.Series(list(values), dtype=object), errors="coerce").to_numpy(dtype=float))
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, i):
+        value = float(self.array[i])
+        return None if value != value else value
+
+    def take(self, rows):
+        return [self[i] for i in rows]
+
+    def values(self):
+        return np.asarray(self.array, dtype=float)
+
+    def extended(self, values):
+        return NumericColumn(np.concatenate([np.asarray(self.array, dtype=float), NumericColumn.from_values(values).array]))
+
+    @classmethod
+    def concat(cls, columns):
+        return cls(np.concatenate([np.asarray(column.array, dtype=float) for column in columns]))
+
+    @property
+    def nbytes(self):
+        return int(self.array.nbytes)
+
+    def state(self):
+        return {"values": self.array}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["values"])
+
+
+_KINDS = {"categorical": CategoricalColumn, "string": StringColumn, "numeric": NumericColumn}
+_KIND_OF = {cls: kind for kind, cls in _KINDS.items()}
+
+
+def _is_categorical(name):
+    return name in CATEGORICAL or name.startswith("req_")
+
+
+class CatalogStore:
+    """The catalog's columns in compact form, addressed by row number."""
+
+    def __init__(self, columns, n_rows):
+        self.columns = columns  # name -> column, in catalog order
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, df):
+        """Encode a normalized internships frame (derived columns are dropped)."""
+        columns = {}
+        for name in df.columns:
+            if name in DERIVED:
+                continue
+            series = df[name]
+            if pd.api.types.is_numeric_dtype(series):
+                columns[name] = NumericColumn(series.to_numpy(dtype=float))
+            elif _is_categorical(name):
+                columns[name] = CategoricalColumn.from_values(series.tolist())
+            else:
+                columns[name] = StringColumn.from_values(series.tolist())
+        return cls(columns, int(df.shape[0]))
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def row(self, i):
+        """All stored fields of row i as a dict (None for missing values)."""
+        return {name: column[i] for name, column in self.columns.items()}
+
+    def to_frame(self, rows=None):
+        """A DataFrame of the stored columns (all rows, or the given row ids), as read from the CSV."""
+        data = {}
+        for name, column in self.columns.items():
+            values = column.values()
+            data[name] = values if rows is None else values[rows]
+        return pd.DataFrame(data, columns=list(self.columns))
+
+    def extended(self, df):
+        """A new store with the rows of the normalized frame `df` appended."""
+        columns = {}
+        n_new = int(df.shape[0])
+        for name, column in self.columns.items():
+            values = df[name].tolist() if name in df.columns else [None] * n_new
+            columns[name] = column.extended(values)
+        for name in df.columns:
+            if name in columns or name in DERIVED:
+                continue
+            # A column the catalog didn't have yet: missing for the existing rows
+            values = [None] * self.n_rows + df[name].tolist()
+            if pd.api.types.is_numeric_dtype(df[name]):
+                columns[name] = NumericColumn.from_values(values)
+            elif _is_categorical(name):
+                columns[name] = CategoricalColumn.from_values(values)
+            else:
+                columns[name] = StringColumn.from_values(values)
+        return CatalogStore(columns, self.n_rows + n_new)
+
+    @classmethod
+    def concat(cls, stores):
+        """One store holding the rows of `stores` in order (e.g. the chunks of a streamed source)."""
+        names = list(dict.fromkeys(name for store in stores for name in store.columns))
+        columns = {}
+        for name in names:
+            kind = next(type(store[name]) for store in stores if name in store)
+            # A column some chunks lack is missing for their rows
+            parts = [store[name] if name in store else kind.from_values([None] * store.n_rows) for store in stores]
+            columns[name] = kind.concat(parts)
+        return cls(columns, sum(store.n_rows for store in stores))
+
+    def memory(self):
+        """Bytes held per column."""
+        return {name: column.nbytes for name, column in self.columns.items()}
+
+    def state(self):
+        """({name: {"kind", "keys"}}, {prefix.key: array}) for notebooks.artifact."""
+        meta, arrays = {}, {}
+        for i, (name, column) in enumerate(self.columns.items()):
+            state = column.state()
+            meta[name] = {"kind": _KIND_OF[type(column)], "prefix": f"col.{i}", "keys": sorted(state)}
+            arrays.update({f"col.{i}.{k}": v for k, v in state.items()})
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, load):
+        """Rebuild from state(); `load(prefix, keys)` returns the stored arrays (memory-mapped)."""
+        columns = {}
+        for name, info in meta.items():
+            columns[name] = _KINDS[info["kind"]].from_state(load(info["prefix"], info["keys"]))
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        return cls(columns, n_rows)
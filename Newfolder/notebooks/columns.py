@@ -0,0 +1,108 @@
+# notebooks/columns.py
+import numpy as np
+
+
+def encode_strings(values):
+    """
+    Pack strings into (offsets, data): UTF-8 bytes laid end to end in one
+    uint8 buffer, with row i at data[offsets[i]:offsets[i + 1]].
+    Missing values (None / NaN) are stored as empty strings.
+    """
+    encoded = [b"" if v is None or v != v else str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, data
+
+
+def decode_strings(offsets, data):
+    """Inverse of encode_strings: an object array of Python strings."""
+    raw = memoryview(np.ascontiguousarray(data)).tobytes()
+    bounds = np.asarray(offsets).tolist()
+    return np.array([raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)], dtype=object)
+
+
+def pack_postings(lists):
+    """Pack a list of int id arrays into (offsets, ids), CSR style."""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    if lists:
+        np.cumsum([len(ids) for ids in lists], out=offsets[1:])
+    ids = np.concatenate(lists).astype(np.int32) if lists else np.empty(0, dtype=np.int32)
+    return offsets, ids
+
+
+def unpack_postings(offsets, ids):
+    """Views into `ids`, one per posting list (no copies)."""
+    bounds = np.asarray(offsets).tolist()
+    return [ids[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+
+class StringColumn:
+    """
+    Strings stored once as (offsets, data) from encode_strings and decoded
+    one row at a time, so a column costs its UTF-8 bytes plus 8 bytes per row
+    instead of one Python object per row. The buffers may be memory-mapped.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(*encode_strings(values))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def contains(self, pattern, rows):
+        """Boolean array: whether each of `rows` holds the UTF-8 bytes `pattern`."""
+        rows = np.asarray(rows, dtype=np.int64)
+        offsets, buf = np.asarray(self.offsets), memoryview(self.data)
+        # Only the given rows' bytes are copied out, so a memory-mapped buffer stays on disk
+        return np.fromiter((pattern in bytes(buf[a:b]) for a, b in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())),
+                           dtype=bool, count=rows.size)
+
+    def __getitem__(self, i):
+        # Only this row's bytes are read, so a memory-mapped buffer stays on disk
+        return self.data[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes().decode("utf-8")
+
+    def take(self, rows):
+        # Offsets are gathered in one step; each row still reads only its own bytes
+        rows = np.asarray(rows, dtype=np.int64)
+        offsets, data = np.asarray(self.offsets), self.data
+        return [data[a:b].tobytes().decode("utf-8") for a, b in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())]
+
+    def values(self):
+        """Every row as an object array of Python strings."""
+        return decode_strings(self.offsets, self.data)
+
+    def extended(self, values):
+        """A new column with `values` appended; this column is left unchanged."""
+        offsets, data = encode_strings(values)
+        return StringColumn(
+            np.concatenate([self.offsets, offsets[1:] + self.offsets[-1]]),
+            np.concatenate([np.asarray(self.data), data]),
+        )
+
+    @classmethod
+    def concat(cls, columns):
+        """One column holding the rows of `columns` in order."""
+        offsets, shift = [np.zeros(1, dtype=np.int64)], 0
+        for column in columns:
+            offsets.append(np.asarray(column.offsets[1:], dtype=np.int64) + shift)
+            shift += int(column.offsets[-1])
+        data = np.concatenate([np.asarray(column.data) for column in columns]) if columns else np.empty(0, dtype=np.uint8)
+        return cls(np.concatenate(offsets), data)
+
+    @property
+    def nbytes(self):
+        return int(self.offsets.nbytes + self.data.nbytes)
+
+    def state(self):
+        return {"offsets": self.offsets, "data": self.data}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["offsets"], state["data"])
@@ -0,0 +1,227 @@
+# notebooks/facets.py
+"""
+Range and facet indexes for the structured filters.
+
+RangeIndex keeps a numeric column's row ids sorted by value, so a
+min / max filter is two binary searches plus one write per selected row
+(or per rejected row, whichever is fewer) instead of a fresh comparison
+over every row.
+
+FacetIndex dictionary-encodes a categorical column after normalizing it
+("on-site", "Onsite " -> "Onsite"; "Bengaluru" -> "Bangalore"), so the
+number of rows per value under any filter bitmap is a single bincount,
+without scoring anything. The /recommend mode filter selects rows through
+the same normalization (FacetIndex.mask), so each mode's count is exactly the
+number of rows that picking it leaves.
+"""
+import numpy as np
+import pandas as pd
+
+from notebooks.catalog import CategoricalColumn
+
+# Checked in order: "Hybrid (remote + on-site)" is a hybrid role
+_MODE_KEYWORDS = (
+    ("Hybrid", ("hybrid",)),
+    ("Remote", ("remote", "work from home", "wfh", "virtual")),
+    ("Onsite", ("onsite", "on-site", "on site", "in-office", "in office", "office")),
+)
+_CITY_ALIASES = {
+    "bengaluru": "Bangalore",
+    "bombay": "Mumbai",
+    "calcutta": "Kolkata",
+    "gurugram": "Gurgaon",
+    "madras": "Chennai",
+    "new delhi": "Delhi",
+    "trivandrum": "Thiruvananthapuram",
+}
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def normalize_mode(value):
+    """Canonical work mode ("Onsite", "Remote", "Hybrid"; other values title-cased), or None."""
+    if _missing(value):
+        return None
+    text = " ".join(str(value).lower().split())
+    if not text:
+        return None
+    for label, keywords in _MODE_KEYWORDS:
+        if any(k in text for k in keywords):
+            return label
+    return text.title()
+
+
+def normalize_city(value):
+    """Canonical city name: first comma-separated part, title-cased, common aliases folded; or None."""
+    if _missing(value):
+        return None
+    text = " ".join(str(value).split(",")[0].lower().split())
+    if not text:
+        return None
+    return _CITY_ALIASES.get(text, text.title())
+
+
+_NORMALIZERS = {"mode": normalize_mode, "city": normalize_city}
+
+
+def _normalize_all(normalize, values):
+    """normalize() over `values`, called once per distinct value."""
+    codes, uniques = pd.factorize(pd.Series(list(values), dtype=object))
+    labels = np.array([normalize(v) for v in uniques] + [None], dtype=object)
+    return labels[codes].tolist()
+
+
+class RangeIndex:
+    """Row ids of a numeric column sorted by value (missing values last), for range filters."""
+
+    def __init__(self, order, sorted_values):
+        self.order = order  # row ids, by value asc then row asc
+        self.sorted_values = sorted_values  # finite-or-inf values in that order, missing ones excluded
+        self.n_rows = len(order)
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype=float)
+        # A stable sort keeps equal values in row order and puts NaN last
+        order = np.argsort(values, kind="stable").astype(np.int32)
+        n_valid = int((~np.isnan(values)).sum())
+        return cls(order, values[order[:n_valid]])
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def n_missing(self):
+        return self.n_rows - len(self.sorted_values)
+
+    def _span(self, lo, hi):
+        a = 0 if lo is None else int(np.searchsorted(self.sorted_values, lo, side="left"))
+        b = len(self.sorted_values) if hi is None else int(np.searchsorted(self.sorted_values, hi, side="right"))
+        return a, max(a, b)
+
+    def count(self, lo=None, hi=None):
+        """Rows with a value in [lo, hi] (either bound optional); missing values are not counted."""
+        a, b = self._span(lo, hi)
+        return b - a
+
+    def mask(self, lo=None, hi=None, missing=None):
+        """
+        Boolean bitmap of the rows whose value is in [lo, hi]. Rows without a
+        value are treated as `missing` (None: never selected), which is how the
+        filters read them (no stipend counts as 0, no duration as unbounded).
+        """
+        if (lo is not None and lo != lo) or (hi is not None and hi != hi):
+            return np.zeros(self.n_rows, dtype=bool)
+        a, b = self._span(lo, hi)
+        n_valid = len(self.sorted_values)
+        with_missing = missing is not None and (lo is None or missing >= lo) and (hi is None or missing <= hi)
+        selected = b - a + (self.n_missing if with_missing else 0)
+        # Write whichever side is smaller: the selected rows or the rejected ones
+        if 2 * selected <= self.n_rows:
+            out = np.zeros(self.n_rows, dtype=bool)
+            out[self.order[a:b]] = True
+            if with_missing:
+                out[self.order[n_valid:]] = True
+        else:
+            out = np.ones(self.n_rows, dtype=bool)
+            out[self.order[:a]] = False
+            out[self.order[b:n_valid]] = False
+            if not with_missing:
+                out[self.order[n_valid:]] = False
+        return out
+
+    def extended(self, values):
+        """A new index with `values` appended as rows len(self), len(self) + 1, ... (merged, not re-sorted)."""
+        values = np.asarray(values, dtype=float)
+        rows = np.arange(self.n_rows, self.n_rows + values.size, dtype=np.int32)
+        valid = ~np.isnan(values)
+        new = np.argsort(values[valid], kind="stable")
+        new_values, new_rows = values[valid][new], rows[valid][new]
+        # side="right": new rows come after existing rows of equal value, keeping row order within ties
+        at = np.searchsorted(self.sorted_values, new_values, side="right")
+        n_valid = len(self.sorted_values)
+        order = np.concatenate([
+            np.insert(np.asarray(self.order[:n_valid]), at, new_rows),
+            np.asarray(self.order[n_valid:]),
+            rows[~valid],
+        ]).astype(np.int32)
+        return RangeIndex(order, np.insert(np.asarray(self.sorted_values), at, new_values))
+
+    def values(self):
+        """The column in row order (NaN for missing)."""
+        values = np.full(self.n_rows, np.nan)
+        values[np.asarray(self.order[:len(self.sorted_values)])] = self.sorted_values
+        return values
+
+    @classmethod
+    def concat(cls, indexes):
+        """One index over the rows of `indexes`, in order."""
+        return cls.from_values(np.concatenate([index.values() for index in indexes]))
+
+    @property
+    def nbytes(self):
+        return int(self.order.nbytes + self.sorted_values.nbytes)
+
+    def state(self):
+        return {"order": self.order, "sorted_values": self.sorted_values}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["order"], state["sorted_values"])
+
+
+class FacetIndex:
+    """A categorical column normalized into facet values, one small code per row."""
+
+    def __init__(self, kind, column):
+        self.kind = kind  # "mode" or "city": which normalizer applies
+        self.normalize = _NORMALIZERS[kind]
+        self.column = column  # CategoricalColumn of normalized values
+        self._codes = {label: i for i, label in enumerate(column.categories.tolist())}
+
+    @classmethod
+    def from_values(cls, kind, values):
+        return cls(kind, CategoricalColumn.from_values(_normalize_all(_NORMALIZERS[kind], values)))
+
+    def __len__(self):
+        return len(self.column)
+
+    @property
+    def labels(self):
+        return self.column.categories.tolist()
+
+    def counts(self, keep):
+        """{label: number of rows set in `keep`} for every facet value, most frequent first."""
+        codes = np.asarray(self.column.codes)[keep]
+        counts = np.bincount(codes[codes >= 0].astype(np.intp), minlength=len(self._codes))
+        labels = self.labels
+        order = sorted(range(len(labels)), key=lambda i: (-counts[i], labels[i]))
+        return {labels[i]: int(counts[i]) for i in order}
+
+    def mask(self, value):
+        """Boolean bitmap of the rows whose normalized value equals that of `value`."""
+        code = self._codes.get(self.normalize(value))
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return np.asarray(self.column.codes) == code
+
+    def extended(self, values):
+        return FacetIndex(self.kind, self.column.extended(_normalize_all(self.normalize, values)))
+
+    @classmethod
+    def concat(cls, indexes):
+        """One index over the rows of `indexes`, in order."""
+        return cls(indexes[0].kind, CategoricalColumn.concat([index.column for index in indexes]))
+
+    @property
+    def nbytes(self):
+        return self.column.nbytes
+
+    def state(self):
+        return {"kind": np.array(self.kind), **self.column.state()}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(str(state["kind"]), CategoricalColumn.from_state(state))
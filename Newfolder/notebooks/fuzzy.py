@@ -0,0 +1,149 @@
+# notebooks/fuzzy.py
+import difflib
+import math
+import re
+
+import numpy as np
+
+from notebooks.text_index import SubstringIndex
+
+# A skill token that is not part of a row's requirement text still scores a
+# close match when difflib's ratio between the token and that whole text reaches this.
+CLOSE_MATCH_RATIO = 0.45
+
+_TERM_SPLIT = re.compile(r"[;,]")
+
+
+def split_skills(text):
+    """Split a "Python, SQL; Excel" style string into lowercased, stripped skill tokens."""
+    return [t for t in (p.strip() for p in _TERM_SPLIT.split(str(text or "").lower())) if t]
+
+
+class SkillMatcher:
+    """
+    Skills fallback scorer over the rows' requirement texts.
+
+    Per row, each candidate token scores 1.0 when it appears verbatim in the
+    row's requirement text, else 0.5 when difflib's ratio between the token
+    and the whole text reaches `ratio`. Exact hits come from a substring
+    index. A ratio is at most 2 * min(len) / (sum of lens), so only texts of
+    a length close to the token's can reach the cutoff: those rows are found
+    by binary search over the rows sorted by text length, and the ratio is
+    computed once per distinct text among them, not once per catalog row.
+    """
+
+    def __init__(self, job_texts, n=3, ratio=CLOSE_MATCH_RATIO):
+        self.ratio = ratio
+        self._exact = SubstringIndex(job_texts, n=n)
+        self._set_lengths(np.fromiter((len(str(t).lower()) for t in job_texts), dtype=np.int32, count=len(job_texts)))
+
+    def _set_lengths(self, lengths):
+        # Character lengths of the lowercased texts, and the rows ordered by length
+        self.lengths = lengths
+        self._by_length = np.argsort(lengths, kind="stable").astype(np.int32)
+        self._sorted_lengths = lengths[self._by_length]
+
+    @property
+    def n_rows(self):
+        return len(self._exact)
+
+    @staticmethod
+    def frame_texts(df):
+        """The requirement text of each row of a normalized internships frame."""
+        return (df["requirements"].astype(str) + " " + df["all_requirements"].astype(str)).tolist()
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build from the `requirements` / `all_requirements` columns."""
+        return cls(cls.frame_texts(df), **kwargs)
+
+    def extended(self, job_texts):
+        """A new matcher with rows appended after the existing ones; this matcher is left unchanged."""
+        matcher = SkillMatcher.__new__(SkillMatcher)
+        matcher.ratio = self.ratio
+        matcher._exact = self._exact.extended(job_texts)
+        added = np.fromiter((len(str(t).lower()) for t in job_texts), dtype=np.int32, count=len(job_texts))
+        matcher._set_lengths(np.concatenate([np.asarray(self.lengths), added]))
+        return matcher
+
+    @classmethod
+    def concat(cls, matchers):
+        """One matcher over the rows of `matchers`, in order (the rows of each follow those of the previous one)."""
+        merged = cls.__new__(cls)
+        merged.ratio = matchers[0].ratio
+        merged._exact = SubstringIndex.concat([m._exact for m in matchers])
+        merged._set_lengths(np.concatenate([np.asarray(m.lengths) for m in matchers]))
+        return merged
+
+    @staticmethod
+    def concat_states(parts, save, open_array):
+        """Write the state() of concat() over saved matcher states (see notebooks.text_index.concat_states)."""
+        save("ratio", np.asarray(parts[0]()["ratio"]))
+        save("lengths", np.concatenate([np.asarray(load()["lengths"]) for load in parts]))
+
+        def exact(load):
+            return lambda: {k[6:]: v for k, v in load().items() if k.startswith("exact_")}
+
+        keys = SubstringIndex.concat_states([exact(load) for load in parts],
+                                            lambda key, arr: save("exact_" + key, arr),
+                                            lambda key, dtype, length: open_array("exact_" + key, dtype, length))
+        return sorted(["ratio", "lengths"] + ["exact_" + k for k in keys])
+
+    def state(self):
+        """Flat dict of arrays describing the matcher (see notebooks.artifact)."""
+        state = {"ratio": np.array(self.ratio), "lengths": self.lengths}
+        state.update({"exact_" + k: v for k, v in self._exact.state().items()})
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a matcher from state()."""
+        matcher = cls.__new__(cls)
+        matcher.ratio = float(state["ratio"])
+        matcher._exact = SubstringIndex.from_state({k[6:]: v for k, v in state.items() if k.startswith("exact_")})
+        matcher._set_lengths(np.asarray(state["lengths"]))
+        return matcher
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held: the exact-match index and the length arrays."""
+        return int(self._exact.nbytes + self.lengths.nbytes + self._by_length.nbytes + self._sorted_lengths.nbytes)
+
+    def close_rows(self, token):
+        """Rows whose requirement text has a difflib ratio of at least `ratio` with `token`."""
+        m, r = len(token), self.ratio
+        # 2 * min(m, L) / (m + L) >= r  <=>  m * r / (2 - r) <= L <= m * (2 - r) / r (widened to whole lengths)
+        lo = np.searchsorted(self._sorted_lengths, math.floor(m * r / (2 - r)), side="left")
+        hi = np.searchsorted(self._sorted_lengths, math.ceil(m * (2 - r) / r), side="right")
+        rows = np.sort(self._by_length[lo:hi])
+        if rows.size == 0:
+            return rows
+        matcher = difflib.SequenceMatcher(None, token)
+        close = {}
+        keep = np.zeros(rows.size, dtype=bool)
+        for i, text in enumerate(self._exact.texts.take(rows)):
+            hit = close.get(text)
+            if hit is None:
+                # Same test as SequenceMatcher(None, token, text).ratio() >= r, cheapest bounds first
+                matcher.set_seq2(text)
+                hit = close[text] = (matcher.real_quick_ratio() >= r and matcher.quick_ratio() >= r
+                                     and matcher.ratio() >= r)
+            keep[i] = hit
+        return rows[keep]
+
+    def exact_rows(self, token):
+        """Row ids whose requirement text contains `token` verbatim."""
+        return self._exact.lookup(token)
+
+    def score(self, tokens):
+        """Match score for every row: sum over tokens of 1.0 (exact) or 0.5 (close)."""
+        total = np.zeros(self.n_rows, dtype=float)
+        for token in tokens:
+            token = str(token).lower()
+            if not token:
+                continue
+            per_token = np.zeros(self.n_rows, dtype=float)
+            per_token[self.close_rows(token)] = 0.5
+            per_token[self.exact_rows(token)] = 1.0
+            total += per_token
+        return total
@@ -0,0 +1,195 @@
+# notebooks/ingest.py
+"""
+Streaming catalog ingestion.
+
+iter_frames() reads a catalog source in chunks of CHUNK_ROWS rows:
+
+- CSV / TSV: the separator is sniffed once from a sample of the file, then
+  the file is parsed a single time with pandas' C engine;
+- Parquet and Arrow IPC / Feather files are read batch by batch with
+  pyarrow (optional: only needed for those formats).
+
+StreamingTfidf fits TF-IDF over documents that arrive chunk by chunk. Only
+the per-document term counts are kept until the vocabulary is complete, and
+the vocabulary, idf and weight matrix come out identical to
+TfidfVectorizer.fit_transform over all documents at once.
+"""
+import csv
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+
+CHUNK_ROWS = int(os.environ.get("RECOMMENDER_INGEST_CHUNK_ROWS", "50000"))
+PARQUET_SUFFIXES = (".parquet", ".pq")
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+# Separators tried when sniffing a delimited text file, from this much of its start
+_SEPARATORS = ",\t;|"
+_SNIFF_BYTES = 64 * 1024
+# Documents tokenized at a time by StreamingTfidf.add
+_ADD_BATCH = 8192
+# TfidfVectorizer options that need the whole term-count matrix at once
+_UNSTREAMABLE = ("max_features", "vocabulary", "use_idf", "dtype", "input", "preprocessor", "tokenizer")
+
+
+def sniff_separator(path):
+    """The field separator of a delimited text file, guessed from its first lines."""
+    with open(path, encoding="utf-8", errors="replace", newline="") as fh:
+        sample = fh.read(_SNIFF_BYTES)
+    # Only whole lines: a cut-off last line would skew the field counts
+    if len(sample) == _SNIFF_BYTES and "\n" in sample:
+        sample = sample[:sample.rindex("\n")]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=_SEPARATORS).delimiter
+    except csv.Error:
+        # Fall back to the separator that splits the header into the most fields
+        header = sample.split("\n", 1)[0]
+        counts = {sep: header.count(sep) for sep in _SEPARATORS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ","
+
+
+def _csv_frames(path, chunk_rows):
+    # Every field is read as text; _normalize_internships parses the numeric ones
+    reader = pd.read_csv(path, sep=sniff_separator(path), encoding="utf-8", engine="c", dtype=str,
+                         chunksize=chunk_rows)
+    with reader:
+        yield from reader
+
+
+def _import_pyarrow(path):
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(f"reading {os.path.basename(path)} needs pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _arrow_frames(path, chunk_rows):
+    pa = _import_pyarrow(path)
+    if path.lower().endswith(PARQUET_SUFFIXES):
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows)
+    else:
+        import pyarrow.ipc as ipc
+        try:
+            reader = ipc.open_file(path)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            batches = iter(ipc.open_stream(path))
+    for batch in batches:
+        # IPC batches can be any size; re-slice them to chunk_rows
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows).to_pandas()
+
+
+def iter_frames(path, chunk_rows=CHUNK_ROWS):
+    """Raw DataFrames of up to `chunk_rows` rows each, in file order."""
+    if path.lower().endswith(PARQUET_SUFFIXES + ARROW_SUFFIXES):
+        return _arrow_frames(path, chunk_rows)
+    return _csv_frames(path, chunk_rows)
+
+
+class StreamingTfidf:
+    """
+    TfidfVectorizer fitting over documents added in chunks.
+
+    add() analyzes a chunk with the vectorizer's own analyzer and keeps its
+    term counts. Term ids are assigned in order of first appearance and each
+    document's counts are ordered by id, exactly as CountVectorizer lays them
+    out before relabelling terms alphabetically. finish() then drops the terms
+    outside min_df / max_df, computes idf from the document frequencies and
+    weights the counts chunk by chunk with the same transformer, so the result
+    matches fit_transform bit for bit. Options that cannot be applied that way
+    (max_features, a fixed vocabulary, use_idf=False, custom callables) raise ValueError.
+    """
+
+    def __init__(self, **params):
+        defaults = TfidfVectorizer().get_params()
+        unsupported = sorted(k for k in _UNSTREAMABLE if k in params and params[k] != defaults[k])
+        if unsupported:
+            raise ValueError(f"vectorizer option(s) not supported for streaming fits: {', '.join(unsupported)}")
+        self.vectorizer = TfidfVectorizer(**params)
+        self._analyze = self.vectorizer.build_analyzer()
+        self._ids = {}  # term -> id, in order of first appearance
+        self._chunks = []  # (counts, term ids, indptr) per added chunk
+        self.n_docs = 0
+
+    def add(self, docs):
+        """Count the terms of `docs`, the next documents in order."""
+        docs = list(docs)
+        # Sub-batches bound the Python token lists held at once
+        for start in range(0, len(docs), _ADD_BATCH):
+            self._add_batch(docs[start:start + _ADD_BATCH])
+
+    def _add_batch(self, docs):
+        token_lists = [self._analyze(doc) for doc in docs]
+        n = len(token_lists)
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n)
+        flat = list(itertools.chain.from_iterable(token_lists))
+        if flat:
+            codes, uniques = pd.factorize(pd.Series(flat, dtype=object), sort=False)
+            ids = self._ids
+            remap = np.fromiter((ids.setdefault(t, len(ids)) for t in uniques), dtype=np.int64, count=len(uniques))
+            terms = remap[codes]
+        else:
+            terms = np.empty(0, dtype=np.int64)
+        width = max(len(self._ids), 1)
+        pairs, counts = np.unique(np.repeat(np.arange(n, dtype=np.int64), lengths) * width + terms, return_counts=True)
+        rows, cols = np.divmod(pairs, width)
+        indptr = np.searchsorted(rows, np.arange(n + 1))
+        if self.vectorizer.binary:
+            counts = np.ones_like(counts)
+        self._chunks.append((counts.astype(np.int32), cols.astype(np.int32), indptr))
+        self.n_docs += n
+
+    def finish(self, dtype=np.float64):
+        """Set the vectorizer's vocabulary_ / idf_ and return the (n_docs, n_terms) TF-IDF matrix."""
+        if not self._ids:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+        terms = list(self._ids)
+        doc_freq = np.zeros(len(terms), dtype=np.int64)
+        for _, cols, _ in self._chunks:
+            doc_freq += np.bincount(cols, minlength=len(terms))
+
+        # Document-frequency limits, as CountVectorizer._limit_features applies them
+        min_df, max_df = self.vectorizer.min_df, self.vectorizer.max_df
+        max_count = max_df if isinstance(max_df, int) else max_df * self.n_docs
+        min_count = min_df if isinstance(min_df, int) else min_df * self.n_docs
+        if max_count < min_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+        kept = np.flatnonzero((doc_freq >= min_count) & (doc_freq <= max_count))
+        if kept.size == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+        # The fitted vocabulary numbers the kept terms alphabetically; dropped terms map to -1
+        alphabetical = sorted(kept.tolist(), key=terms.__getitem__)
+        n_terms = len(alphabetical)
+        relabel = np.full(len(terms), -1, dtype=np.int32)
+        relabel[alphabetical] = np.arange(n_terms, dtype=np.int32)
+        doc_freq = doc_freq[alphabetical]
+
+        # idf as TfidfTransformer.fit computes it
+        smooth = int(self.vectorizer.smooth_idf)
+        idf = np.log((self.n_docs + smooth) / (doc_freq.astype(np.float64) + smooth)) + 1
+        self.vectorizer.vocabulary_ = {terms[old]: new for new, old in enumerate(alphabetical)}
+        self.vectorizer.idf_ = idf
+        transformer = TfidfTransformer(norm=self.vectorizer.norm, use_idf=True, smooth_idf=self.vectorizer.smooth_idf,
+                                       sublinear_tf=self.vectorizer.sublinear_tf)
+        transformer.idf_ = idf
+
+        parts = []
+        while self._chunks:
+            counts, cols, indptr = self._chunks.pop(0)
+            cols = relabel[cols]
+            if kept.size < len(terms):
+                # Drop the pruned terms' entries and shift the row pointers to match
+                present = cols >= 0
+                indptr = np.concatenate([[0], np.cumsum(present)])[indptr]
+                counts, cols = counts[present], cols[present]
+            chunk = sp.csr_matrix((counts.astype(np.float64), cols, indptr), shape=(indptr.size - 1, n_terms))
+            parts.append(transformer.transform(chunk, copy=False).astype(dtype))
+        return sp.vstack(parts, format="csr") if len(parts) != 1 else parts[0].tocsr()
@@ -0,0 +1,336 @@
+# notebooks/metrics.py
+"""
+Hot-path instrumentation for the recommender.
+
+A request runs inside traced(); code on the hot path wraps its stages in
+`with stage("vectorize"):` and reports which branch ran (set_branch) and
+which filters applied or were skipped for matching nothing (note_filter).
+Outside a trace, or with RECOMMENDER_METRICS=0, stage() returns a shared
+no-op context manager, so the cost is one context-variable lookup.
+
+Finished traces are plain dicts (they can come back from a worker process)
+and are folded into Prometheus-style histograms and counters by
+observe_trace(); render() produces the text exposition format for /metrics.
+
+A sampled fraction of traced requests (RECOMMENDER_PROFILE_SAMPLE) runs
+under a small stack-sampling profiler; when such a request takes longer
+than RECOMMENDER_PROFILE_SLOW_MS its collapsed stacks are attached to the
+trace and passed to the profile hook (by default kept in SLOW_PROFILES).
+Stdlib only, so importing this module stays cheap.
+"""
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("RECOMMENDER_METRICS", "1") != "0"
+PROFILE_SAMPLE = float(os.environ.get("RECOMMENDER_PROFILE_SAMPLE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("RECOMMENDER_PROFILE_SLOW_MS", "250"))
+PROFILE_INTERVAL = float(os.environ.get("RECOMMENDER_PROFILE_INTERVAL_MS", "1")) / 1000
+
+# Seconds; from a cache hit (~10us) up to a very slow batch
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("recommender_trace", default=None)
+
+
+# -- Prometheus-style collectors ---------------------------------------------
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (repr(bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("recommender_stage_seconds", "Time spent per recommendation stage", ["stage"])
+REQUEST_SECONDS = Histogram("recommender_request_seconds", "End-to-end recommendation time", ["endpoint", "branch"])
+BRANCHES = Counter("recommender_branch_total", "Candidates ranked per branch (tfidf, fuzzy, cache_hit, page, empty)", ["branch"])
+FILTERS = Counter("recommender_filter_total", "Filters applied, or skipped because they matched no rows", ["filter", "outcome"])
+_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, BRANCHES, FILTERS]
+# Callables returning [(name, type, help, [(labels dict, value), ...]), ...], read at render time
+_COLLECTORS = []
+
+
+def register_collector(fn):
+    _COLLECTORS.append(fn)
+    return fn
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collect in _COLLECTORS:
+        try:
+            families = collect()
+        except Exception:
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# -- tracing -----------------------------------------------------------------
+
+class Trace:
+    """Stage timings, branches and filter outcomes for one request (or one batch)."""
+
+    __slots__ = ("stages", "branches", "filters", "started", "total", "profile")
+
+    def __init__(self):
+        self.stages = {}
+        self.branches = {}
+        self.filters = {}
+        self.started = time.perf_counter()
+        self.total = None
+        self.profile = None
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            "stages": dict(self.stages),
+            "branches": dict(self.branches),
+            "filters": {f"{name}:{outcome}": n for (name, outcome), n in self.filters.items()},
+            "total": self.total,
+            "profile": self.profile,
+        }
+
+
+class _Stage:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Context manager timing one stage of the current trace (no-op outside a trace)."""
+    trace = _current.get()
+    return _NULL_STAGE if trace is None else _Stage(trace, name)
+
+
+def set_branch(name):
+    trace = _current.get()
+    if trace is not None:
+        trace.branches[name] = trace.branches.get(name, 0) + 1
+
+
+def note_filter(name, applied):
+    trace = _current.get()
+    if trace is not None:
+        key = (name, "applied" if applied else "skipped")
+        trace.filters[key] = trace.filters.get(key, 0) + 1
+
+
+@contextmanager
+def traced(endpoint="python", observe=True, profile=False):
+    """
+    Trace the enclosed request; yields the Trace (None when metrics are disabled
+    or a trace is already active). With observe=True the finished trace is
+    recorded here; otherwise the caller passes trace.as_dict() to observe_trace(),
+    e.g. after returning it from a worker process.
+    """
+    if not ENABLED or _current.get() is not None:
+        yield None
+        return
+    trace = Trace()
+    sampler = None
+    if profile or (PROFILE_SAMPLE and random.random() < PROFILE_SAMPLE):
+        sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL)
+        sampler.start()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        trace.total = time.perf_counter() - trace.started
+        if sampler is not None:
+            stacks = sampler.stop()
+            if profile or trace.total * 1000 >= PROFILE_SLOW_MS:
+                trace.profile = stacks
+        if observe:
+            observe_trace(trace.as_dict(), endpoint)
+
+
+def merge(traces):
+    """Combine trace dicts (e.g. the chunks of one streamed batch) into one."""
+    out = {"stages": {}, "branches": {}, "filters": {}, "total": 0.0, "profile": None}
+    for trace in filter(None, traces):
+        for key in ("stages", "branches", "filters"):
+            for name, value in trace[key].items():
+                out[key][name] = out[key].get(name, 0) + value
+        out["total"] += trace["total"] or 0.0
+    return out
+
+
+def observe_trace(trace, endpoint="python"):
+    """Fold a finished trace dict into the histograms and counters."""
+    if not ENABLED or trace is None:
+        return
+    for name, seconds in trace["stages"].items():
+        STAGE_SECONDS.observe(seconds, name)
+    branches = trace["branches"]
+    for name, n in branches.items():
+        BRANCHES.inc(n, name)
+    for key, n in trace["filters"].items():
+        FILTERS.inc(n, *key.split(":", 1))
+    branch = next(iter(branches)) if len(branches) == 1 else ("mixed" if branches else "none")
+    REQUEST_SECONDS.observe(trace["total"] or 0.0, endpoint, branch)
+    if trace.get("profile"):
+        _profile_hook(dict(trace, endpoint=endpoint))
+
+
+def server_timing(trace):
+    """A Server-Timing header value: one entry per stage, plus the branch and total."""
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in trace["stages"].items()]
+    if trace["branches"]:
+        parts.append(f'branch;desc="{",".join(sorted(trace["branches"]))}"')
+    if trace["total"] is not None:
+        parts.append(f"total;dur={trace['total'] * 1000:.3f}")
+    return ", ".join(parts)
+
+
+# -- sampling profiler -------------------------------------------------------
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds on a helper
+    thread and counts collapsed stacks ("file:func;file:func" root first),
+    the input format of flame graph tools.
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return {collapsed stack: samples}."""
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+
+SLOW_PROFILES = deque(maxlen=int(os.environ.get("RECOMMENDER_PROFILE_KEEP", "20")))
+
+
+def _keep_profile(trace):
+    SLOW_PROFILES.append({
+        "time": time.time(),
+        "endpoint": trace["endpoint"],
+        "total_ms": round((trace["total"] or 0.0) * 1000, 3),
+        "branches": trace["branches"],
+        "stages_ms": {k: round(v * 1000, 3) for k, v in trace["stages"].items()},
+        "stacks": trace["profile"],
+    })
+
+
+_profile_hook = _keep_profile
+
+
+def set_profile_hook(fn):
+    """Call fn(trace_dict) for every slow profiled request instead of keeping it in SLOW_PROFILES."""
+    global _profile_hook
+    _profile_hook = fn or _keep_profile
@@ -0,0 +1,105 @@
+# notebooks/pool.py
+"""
+Bounded worker pool for CPU-bound scoring.
+
+Work runs on a thread or process pool that admits at most
+max_workers + max_queue tasks at once; anything beyond that is rejected
+immediately (Saturated) so callers can shed load instead of queueing
+without bound. Each task may carry a deadline: queued tasks whose deadline
+passes are cancelled, and a task that only starts after its deadline is skipped.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Saturated(Exception):
+    """The pool is at capacity (all workers busy and the queue full)."""
+
+
+class DeadlineExceeded(Exception):
+    """The task did not finish before its deadline."""
+
+
+def _run_with_deadline(deadline, fn, *args):
+    # Runs in the worker: skip work whose caller has already given up
+    if deadline is not None and time.time() > deadline:
+        raise DeadlineExceeded("deadline passed while queued")
+    return fn(*args)
+
+
+class BoundedPool:
+    def __init__(self, max_workers=4, max_queue=32, kind="thread", initializer=None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unknown pool kind: {kind!r}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.capacity = max_workers + max_queue
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring",
+                                                initializer=initializer)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, deadline=None):
+        """
+        Submit fn(*args) and return its concurrent.futures.Future.
+        `deadline` is an absolute time.time(). Raises Saturated when the pool is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Saturated(f"{self.capacity} tasks already running or queued")
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        try:
+            future = self._executor.submit(_run_with_deadline, deadline, fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, timeout=None):
+        """
+        Await fn(*args) on the pool. With `timeout` (seconds) the task is
+        cancelled if still queued when it expires, and DeadlineExceeded is raised.
+        """
+        deadline = time.time() + timeout if timeout else None
+        future = self.submit(fn, *args, deadline=deadline)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            future.cancel()
+            with self._lock:
+                self.expired += 1
+            raise DeadlineExceeded(f"no result within {timeout}s")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.max_workers,
+                "queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,30 +1,126 @@
 # notebooks/recommend.py
+import hashlib
+import itertools
 import os
+import secrets
+import sys
+import threading
+import weakref
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import difflib
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import linear_kernel
 import re
 
+from notebooks import artifact, ingest, metrics
+from notebooks.cache import CursorExpired, LRUCache, canonical_request, sizeof_array, sizeof_ranking, sizeof_recommendations
+from notebooks.catalog import CatalogStore
+from notebooks.facets import FacetIndex, RangeIndex
+from notebooks.fuzzy import SkillMatcher, split_skills
+from notebooks.ingest import StreamingTfidf
+from notebooks.retrieval import ImpactIndex, _top_k
+from notebooks.shards import ShardPool
+from notebooks.text_index import SubstringIndex, UnionIndex
+
 # Resolve path to data (assumes this file is in notebooks/)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CSV_PATH = os.path.join(BASE_DIR, "data", "internships.csv")
+# Prebuilt model artifact (python -m notebooks.artifact); refit from the CSV when missing or stale
+ARTIFACT_DIR = os.environ.get("RECOMMENDER_ARTIFACT_DIR", os.path.join(BASE_DIR, "data", "model"))
+
+# Batch scoring: cap on the dense score block per chunk (bytes) and on chunk length
+BATCH_SCORE_BYTES = 64 * 1024 * 1024
+BATCH_MAX_CHUNK = 1024
+
+# Ranking: "dense" scores every row, "sparse" walks impact-ordered posting lists
+# (notebooks.retrieval) and "auto" picks sparse from SPARSE_MIN_ROWS rows up.
+RETRIEVAL = os.environ.get("RECOMMENDER_RETRIEVAL", "auto")
+SPARSE_MIN_ROWS = int(os.environ.get("RECOMMENDER_SPARSE_MIN_ROWS", "50000"))
+# Scatter-gather over this many worker processes (notebooks.shards); 0 or 1 ranks in-process
+SHARDS = int(os.environ.get("RECOMMENDER_SHARDS", "0"))
+# Added to rows whose location contains the preferred location
+LOCATION_BOOST = 0.1
+# TF-IDF weights are stored (and candidate vectors scored) in single precision
+MATRIX_DTYPE = np.float32
+# TfidfVectorizer options; a catalog can override them (see notebooks.service)
+VECTORIZER = {"stop_words": "english"}
+# Fields searched by the domain and education filters; each field is indexed once
+# (description serves both) and a filter matches a row when any of its fields does
+TEXT_FILTER_FIELDS = {
+    "domain": ("title", "organization", "description"),
+    "education": ("requirements", "description", "all_requirements"),
+}
+_TEXT_FIELDS = tuple(dict.fromkeys(f for fields in TEXT_FILTER_FIELDS.values() for f in fields))
+
+# Result cache (candidate request -> recommendations) and score cache (candidate
+# profile -> catalog score vector, reused when only filters or top_n differ).
+# Keys include the engine's cache token, so catalog changes never serve stale entries.
+RESULT_CACHE = LRUCache(
+    max_entries=int(os.environ.get("RECOMMENDER_CACHE_ENTRIES", "2048")),
+    max_bytes=int(os.environ.get("RECOMMENDER_CACHE_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.environ.get("RECOMMENDER_CACHE_TTL", "300")),
+    sizeof=sizeof_recommendations,
+)
+SCORE_CACHE = LRUCache(
+    max_entries=int(os.environ.get("RECOMMENDER_SCORE_CACHE_ENTRIES", "256")),
+    max_bytes=int(os.environ.get("RECOMMENDER_SCORE_CACHE_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.environ.get("RECOMMENDER_CACHE_TTL", "300")),
+    sizeof=sizeof_array,
+)
+_ENGINE_TOKENS = itertools.count(1)
+
+# Fields of a recommendation dict, in output order; requests may project a subset
+RECORD_FIELDS = ("title", "organization", "location", "mode", "duration_weeks", "stipend_per_month",
+                 "description", "requirements", "score")
+
+# Pagination: the first page ranks the top PAGE_DEPTH rows once and keeps them
+# in RANKINGS; a cursor names that list and an offset, so later pages are slices.
+PAGE_DEPTH = int(os.environ.get("RECOMMENDER_PAGE_DEPTH", "1000"))
+RANKINGS = LRUCache(
+    max_entries=int(os.environ.get("RECOMMENDER_CURSOR_ENTRIES", "1024")),
+    max_bytes=int(os.environ.get("RECOMMENDER_CURSOR_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.environ.get("RECOMMENDER_CURSOR_TTL", "600")),
+    sizeof=sizeof_ranking,
+)
+# Per-process salt: a ranking id never names another process's (or run's) list
+_RANKING_SALT = secrets.token_bytes(8)
+
+
+def _ranking_id(cache_token, candidate):
+    key = repr((cache_token, canonical_request(candidate))).encode("utf-8")
+    return hashlib.blake2b(key, digest_size=12, key=_RANKING_SALT).hexdigest()
+
+
+def project_fields(fields):
+    """
+    The RECORD_FIELDS named in `fields`, in output order (all of them for
+    None or an empty list); ValueError naming any unknown field.
+    """
+    if not fields:
+        return RECORD_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    wanted = {str(f).strip() for f in fields}
+    unknown = sorted(wanted.difference(RECORD_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}; expected some of {', '.join(RECORD_FIELDS)}")
+    return tuple(f for f in RECORD_FIELDS if f in wanted)
+
+
+def _parse_cursor(cursor):
+    """(ranking id, offset) of a cursor; ValueError when it is malformed."""
+    ranking_id, sep, offset = str(cursor).rpartition(".")
+    if not sep or not ranking_id or not offset.isdigit():
+        raise ValueError("invalid cursor")
+    return ranking_id, int(offset)
 
 def _read_internships(path=CSV_PATH):
-    # Try common separators and encodings
-    for sep in [",", "\t"]:
-        try:
-            df = pd.read_csv(path, sep=sep, encoding="utf-8", engine="python")
-            # If read looks wrong (single column), continue trying
-            if df.shape[1] > 1:
-                break
-        except Exception:
-            continue
-    else:
-        # final attempt without specifying sep
-        df = pd.read_csv(path, encoding="utf-8", engine="python")
+    """The whole catalog source as one normalized DataFrame (CSV/TSV, Parquet or Arrow; see notebooks.ingest)."""
+    return pd.concat([_normalize_internships(df) for df in ingest.iter_frames(path)], ignore_index=True)
 
+
+def _normalize_internships(df):
+    """Clean raw internship rows (CSV or admin input) into the catalog schema."""
     # Normalize column names and strip whitespace
     df.columns = df.columns.str.strip()
 
@@ -43,21 +139,15 @@ def _read_internships(path=CSV_PATH):
 
     # Collect req_ columns if present
     req_cols = [c for c in df.columns if re.match(r"req_\d+", c)]
-    # Create 'all_requirements' from req_ columns
+    # Create 'all_requirements' from req_ columns (joined column-wise, not row by row)
     if req_cols:
-        df["all_requirements"] = df[req_cols].fillna("").astype(str).agg(" ".join, axis=1).str.replace(r"\s+", " ", regex=True).str.strip()
+        joined = df[req_cols[0]].fillna("").astype(str)
+        for c in req_cols[1:]:
+            joined = joined + " " + df[c].fillna("").astype(str)
+        df["all_requirements"] = joined.str.replace(r"\s+", " ", regex=True).str.strip()
     else:
         df["all_requirements"] = ""
 
-    # Combined profile used for TF-IDF
-    df["profile"] = (
-        df["title"].fillna("") + " " +
-        df["organization"].fillna("") + " " +
-        df["requirements"].fillna("") + " " +
-        df["all_requirements"].fillna("") + " " +
-        df["description"].fillna("")
-    ).str.replace(r"\s+", " ", regex=True).str.strip()
-
     # Coerce numeric columns (safe)
     if "stipend_per_month" in df.columns:
         df["stipend_per_month"] = (
@@ -74,17 +164,661 @@ def _read_internships(path=CSV_PATH):
 
     return df
 
-# Load once at import time (fast for repeated calls)
-_INTERN = _read_internships(CSV_PATH)
 
-# Build TF-IDF matrix (use 'profile' field)
-_vectorizer = TfidfVectorizer(stop_words="english")
-# replace empty profile with a placeholder so vectorizer won't crash
-_profiles = _INTERN["profile"].replace("", "empty")
-_tfidf_matrix = _vectorizer.fit_transform(_profiles)
+def _profiles(df):
+    """Combined text profile per internship used for TF-IDF."""
+    profile = (
+        df["title"].fillna("") + " " +
+        df["organization"].fillna("") + " " +
+        df["requirements"].fillna("") + " " +
+        df["all_requirements"].fillna("") + " " +
+        df["description"].fillna("")
+    )
+    # Runs of whitespace don't change the TF-IDF tokens, so they are left as they are;
+    # replace empty profile with a placeholder so vectorizer won't crash
+    return profile.where(profile.str.strip() != "", "empty")
+
+
+def _build_indexes(df):
+    """Filter and fuzzy-fallback indexes over the catalog."""
+    return {
+        # Pre-lowercased substring indexes for the location boost and the text filters, one per field
+        "location": SubstringIndex.from_columns(df, ["location"]),
+        **{field: SubstringIndex.from_columns(df, [field]) for field in _TEXT_FIELDS},
+        # Requirement texts (substring index + lengths) used by the fuzzy skills fallback
+        "skills": SkillMatcher.from_frame(df),
+        # Sorted numeric columns for the range filters; normalized facets for the
+        # mode filter and the mode / city counts
+        "stipend": RangeIndex.from_values(df["stipend_per_month"]),
+        "duration": RangeIndex.from_values(df["duration_weeks"]),
+        "mode_facet": FacetIndex.from_values("mode", df["mode"].tolist()),
+        "city_facet": FacetIndex.from_values("city", df["location"].tolist()),
+    }
+
+
+def _extend_indexes(indexes, df):
+    """Indexes with the rows of `df` appended (the given indexes are not modified)."""
+    return {
+        "location": indexes["location"].extended(SubstringIndex.column_texts(df, ["location"])),
+        **{field: indexes[field].extended(SubstringIndex.column_texts(df, [field])) for field in _TEXT_FIELDS},
+        "skills": indexes["skills"].extended(SkillMatcher.frame_texts(df)),
+        "stipend": indexes["stipend"].extended(df["stipend_per_month"]),
+        "duration": indexes["duration"].extended(df["duration_weeks"]),
+        "mode_facet": indexes["mode_facet"].extended(df["mode"].tolist()),
+        "city_facet": indexes["city_facet"].extended(df["location"].tolist()),
+    }
+
+
+def _compact_matrix(matrix):
+    """CSR matrix with MATRIX_DTYPE data and int32 indices (int64 only past 2**31 entries)."""
+    matrix = sp.csr_matrix(matrix, dtype=MATRIX_DTYPE)
+    index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+    return sp.csr_matrix(
+        (matrix.data, matrix.indices.astype(index_dtype, copy=False), matrix.indptr.astype(index_dtype, copy=False)),
+        shape=matrix.shape, copy=False,
+    )
+
+
+def _fit_frames(frames, vectorizer=None, index_parts=None):
+    """
+    Fit TF-IDF and build the indexes over normalized frames given in row order:
+    (catalog, vectorizer, tfidf_matrix, indexes). Each frame is vectorized, encoded
+    and indexed on its own and the pieces are concatenated at the end, so a streamed
+    source is never held as one DataFrame. `vectorizer` overrides VECTORIZER options.
+    When `index_parts` is given, each frame's indexes are handed to it instead of
+    being kept (notebooks.artifact spills them to disk), and indexes is None.
+    """
+    tfidf = StreamingTfidf(**{**VECTORIZER, **(vectorizer or {})})
+    stores, parts = [], []
+    for df in frames:
+        tfidf.add(_profiles(df))
+        stores.append(CatalogStore.from_frame(df))
+        if index_parts is None:
+            parts.append(_build_indexes(df))
+        else:
+            index_parts(_build_indexes(df))
+    # Same vocabulary, idf and weights as TfidfVectorizer.fit_transform over all rows
+    tfidf_matrix = _compact_matrix(tfidf.finish())
+    catalog = stores[0] if len(stores) == 1 else CatalogStore.concat(stores)
+    if index_parts is not None:
+        indexes = None
+    elif len(parts) == 1:
+        indexes = parts[0]
+    else:
+        indexes = {name: type(index).concat([part[name] for part in parts]) for name, index in parts[0].items()}
+    return catalog, tfidf.vectorizer, tfidf_matrix, indexes
+
+
+def _fit_frame(df, vectorizer=None):
+    """Fit TF-IDF on a normalized frame and build its indexes: (catalog, vectorizer, tfidf_matrix, indexes)."""
+    return _fit_frames([df], vectorizer)
+
+
+def _fit_catalog(path=CSV_PATH, chunk_rows=None, vectorizer=None, index_parts=None):
+    """Stream the catalog source, fit TF-IDF and build the indexes: (catalog, vectorizer, tfidf_matrix, indexes)."""
+    frames = ingest.iter_frames(path, chunk_rows or ingest.CHUNK_ROWS)
+    return _fit_frames((_normalize_internships(df) for df in frames), vectorizer, index_parts)
+
+
+def _narrow(keep, mask, name=None):
+    """Apply a filter mask only if it leaves at least one row (filters never drop everything)."""
+    narrowed = keep & mask
+    applied = bool(narrowed.any())
+    if name is not None:
+        metrics.note_filter(name, applied)
+    return narrowed if applied else keep
+
+
+def _candidate_profile(candidate):
+    """Text profile of a candidate used for TF-IDF scoring."""
+    candidate_profile = " ".join([
+        str(candidate.get("education", "") or ""),
+        str(candidate.get("skills", "") or ""),
+        str(candidate.get("interests", "") or "")
+    ]).strip()
+    return candidate_profile or "empty"
+
+
+class RecommendationEngine:
+    """
+    A loaded catalog plus everything needed to rank it: the fitted
+    vectorizer, the TF-IDF matrix and the filter / fuzzy indexes.
+
+    The catalog is kept as an immutable CatalogStore (notebooks.catalog), so
+    requests never copy it; only the winning rows are decoded into dicts. Engines are
+    never modified in place: with_changes() and refit() return new engines,
+    which callers publish by swapping a single reference.
+
+    Every internship has a stable integer id (its CSV row number for the
+    initial load). Updated or deleted rows stay in the arrays as dead rows
+    until the next refit compacts them.
+    """
+
+    def __init__(self, catalog, vectorizer, tfidf_matrix, indexes, ids=None, alive=None, version=1):
+        # A normalized DataFrame is accepted too and encoded into a CatalogStore
+        self.catalog = catalog if isinstance(catalog, CatalogStore) else CatalogStore.from_frame(catalog)
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.indexes = indexes
+        self.n_rows = self.catalog.n_rows
+        self.cols = {c: self.catalog[c] for c in ["title", "organization", "location", "mode", "description", "requirements"]}
+        self.stipend = self.catalog["stipend_per_month"].values()
+        self.duration = self.catalog["duration_weeks"].values()
+        self.location_index = indexes["location"]
+        self.domain_index = UnionIndex([indexes[field] for field in TEXT_FILTER_FIELDS["domain"]])
+        self.education_index = UnionIndex([indexes[field] for field in TEXT_FILTER_FIELDS["education"]])
+        self.skills = indexes["skills"]
+        self.stipend_index = indexes["stipend"]
+        self.duration_index = indexes["duration"]
+        self.mode_facet = indexes["mode_facet"]
+        self.city_facet = indexes["city_facet"]
+        self.ids = np.arange(self.n_rows, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.alive = np.ones(self.n_rows, dtype=bool) if alive is None else alive
+        self.n_live = int(self.alive.sum())
+        # id -> row lookup by binary search over the live ids (no per-row Python objects)
+        live_rows = np.flatnonzero(self.alive)
+        order = np.argsort(self.ids[live_rows], kind="stable")
+        self._sorted_ids = self.ids[live_rows][order]
+        self._sorted_rows = live_rows[order]
+        self.next_id = int(self.ids.max()) + 1 if self.n_rows else 0
+        self.version = version
+        self.sparse = RETRIEVAL == "sparse" or (RETRIEVAL == "auto" and self.n_rows >= SPARSE_MIN_ROWS)
+        self.n_shards = SHARDS if SHARDS > 1 else 0
+        self._retriever = None
+        self._retriever_lock = threading.Lock()
+        # Unique per engine instance (and so per catalog version): part of every cache key
+        self.cache_token = next(_ENGINE_TOKENS)
+
+    @classmethod
+    def load(cls, path=CSV_PATH, artifact_dir=ARTIFACT_DIR, vectorizer=None):
+        """
+        Memory-map the prebuilt artifact when it matches `path` and the vectorizer
+        options (VECTORIZER overridden by `vectorizer`), otherwise fit from the source.
+        With artifact_dir None the source is always fitted.
+        """
+        loaded = None
+        if artifact_dir is not None:
+            try:
+                expected = artifact.vectorizer_config(StreamingTfidf(**{**VECTORIZER, **(vectorizer or {})}).vectorizer)
+                loaded = artifact.load_artifact(artifact_dir, path, vectorizer=expected)
+            except Exception:
+                loaded = None
+        return cls(*(loaded if loaded is not None else _fit_catalog(path, vectorizer=vectorizer)))
+
+    def row_of(self, internship_id):
+        """The row of a live internship id, or None."""
+        internship_id = int(internship_id)
+        pos = int(np.searchsorted(self._sorted_ids, internship_id))
+        if pos < self._sorted_ids.size and self._sorted_ids[pos] == internship_id:
+            return int(self._sorted_rows[pos])
+        return None
+
+    def get_internship(self, internship_id):
+        """The stored fields of one live internship, or None."""
+        row = self.row_of(internship_id)
+        if row is None:
+            return None
+        record = self.catalog.row(row)
+        record["id"] = int(internship_id)
+        return record
+
+    def memory_report(self):
+        """
+        Bytes held per component: catalog columns, TF-IDF arrays, vocabulary,
+        filter / fuzzy indexes, row bookkeeping and the retriever (once built).
+        Memory-mapped buffers are counted too, although they live in the page cache.
+        """
+        matrix = self.tfidf_matrix
+        vocabulary = sum(sys.getsizeof(term) + 28 for term in self.vectorizer.vocabulary_) + sys.getsizeof(self.vectorizer.vocabulary_)
+        report = {
+            "catalog": self.catalog.memory(),
+            "tfidf": {
+                "data": int(matrix.data.nbytes),
+                "indices": int(matrix.indices.nbytes),
+                "indptr": int(matrix.indptr.nbytes),
+                "vocabulary": int(vocabulary + np.asarray(self.vectorizer.idf_).nbytes),
+            },
+            "indexes": {name: int(index.nbytes) for name, index in self.indexes.items()},
+            "rows": {
+                "ids": int(self.ids.nbytes),
+                "alive": int(self.alive.nbytes),
+                # stipend / duration are views of the catalog columns, counted there
+                "id_lookup": int(self._sorted_ids.nbytes + self._sorted_rows.nbytes),
+            },
+        }
+        retriever = self._retriever
+        if isinstance(retriever, ImpactIndex):
+            report["retriever"] = {"impact_index": retriever.nbytes}
+        elif retriever is not None:
+            report["retriever"] = {"shared_memory": retriever.shared_bytes}
+        report["total"] = int(sum(sum(part.values()) for part in report.values()))
+        return report
+
+    def with_changes(self, upserts=(), deletes=()):
+        """
+        A new engine with `upserts` ((id, fields) pairs; new ids are inserted,
+        existing ones replaced) and `deletes` (ids) applied. New rows are
+        vectorized with the existing vocabulary; indexes are extended, not rebuilt.
+        Raises KeyError for an unknown id in `deletes`.
+        """
+        alive = self.alive.copy()
+        for internship_id in deletes:
+            row = self.row_of(internship_id)
+            if row is None:
+                raise KeyError(internship_id)
+            alive[row] = False
+        upserts = list(upserts)
+        if not upserts:
+            return RecommendationEngine(self.catalog, self.vectorizer, self.tfidf_matrix, self.indexes,
+                                        ids=self.ids, alive=alive, version=self.version + 1)
+
+        new_ids = []
+        for internship_id, _ in upserts:
+            row = self.row_of(internship_id)
+            if row is not None:
+                alive[row] = False
+            new_ids.append(int(internship_id))
+        new_df = _normalize_internships(pd.DataFrame([dict(fields) for _, fields in upserts]))
+        new_vecs = _compact_matrix(self.vectorizer.transform(_profiles(new_df)))
+        return RecommendationEngine(
+            self.catalog.extended(new_df),
+            self.vectorizer,
+            _compact_matrix(sp.vstack([self.tfidf_matrix, new_vecs], format="csr")),
+            _extend_indexes(self.indexes, new_df),
+            ids=np.concatenate([self.ids, np.array(new_ids, dtype=np.int64)]),
+            alive=np.concatenate([alive, np.ones(len(new_ids), dtype=bool)]),
+            version=self.version + 1,
+        )
+
+    def refit(self):
+        """A new engine over the live rows only, with the vocabulary refitted and indexes rebuilt."""
+        live = _normalize_internships(self.catalog.to_frame(np.flatnonzero(self.alive)))
+        # Same TF-IDF options as this engine's vectorizer
+        return RecommendationEngine(*_fit_frame(live, self.vectorizer.get_params()), ids=self.ids[self.alive],
+                                    version=self.version + 1)
+
+    @property
+    def uses_retriever(self):
+        """True when requests rank through `retriever` instead of a dense score vector."""
+        return self.sparse or self.n_shards > 1
+
+    @property
+    def retriever(self):
+        """
+        Top-k search over the TF-IDF matrix, built on first use: a ShardPool when
+        sharding is on (each shard sparse or dense like this engine), else an ImpactIndex.
+        """
+        if self._retriever is None:
+            with self._retriever_lock:
+                if self._retriever is None:
+                    if self.n_shards > 1:
+                        pool = ShardPool(self.tfidf_matrix, self.n_shards, sparse=self.sparse)
+                        # Shard processes go away with the engine (e.g. after a catalog swap)
+                        weakref.finalize(self, pool.close)
+                        self._retriever = pool
+                    else:
+                        self._retriever = ImpactIndex(self.tfidf_matrix)
+        return self._retriever
+
+    @property
+    def shard_pool(self):
+        """The ShardPool this engine ranks through, or None (no sharding, or not built yet)."""
+        retriever = self._retriever
+        return retriever if isinstance(retriever, ShardPool) else None
+
+    def build_retriever(self):
+        """
+        Build `retriever` now (and return it) if this engine ranks through one,
+        so the first request does not pay for it. EngineHandle calls this on
+        every engine before publishing it.
+        """
+        if self.uses_retriever:
+            return self.retriever
+        return None
+
+    def score_profiles(self, profiles):
+        """Cosine similarity of each profile against the catalog, as a dense (len(profiles), n_rows) array."""
+        try:
+            with metrics.stage("vectorize"):
+                cand_vecs = self.vectorizer.transform(profiles).astype(self.tfidf_matrix.dtype)
+            # TF-IDF rows are already L2-normalized, so the dot product is the cosine
+            # similarity; this avoids re-normalizing (copying) the catalog matrix per call.
+            with metrics.stage("similarity"):
+                return linear_kernel(cand_vecs, self.tfidf_matrix).astype(float)
+        except Exception:
+            # fallback to zeroes if transform fails
+            return np.zeros((len(profiles), self.n_rows), dtype=float)
+
+    def _filter_mask(self, candidate, skip=()):
+        """Boolean mask of the live rows that pass the candidate's filters (except those named in `skip`)."""
+        # Optional filtering: every filter narrows a single boolean mask over the
+        # catalog, and is skipped if it would leave no rows.
+        keep = self.alive.copy()
+
+        # mode filter (if provided)
+        mode_pref = (candidate.get("mode") or "").strip().lower()
+        if mode_pref and "mode" not in skip:
+            with metrics.stage("filter_mode"):
+                # keep rows of the requested mode, normalized like the mode facet
+                # counts ("on-site" / "Onsite", "WFH" / "Remote")
+                keep = _narrow(keep, self.mode_facet.mask(mode_pref), "mode")
+
+        # stipend filter (min)
+        min_stipend = candidate.get("min_stipend")
+        if min_stipend is not None and min_stipend != "" and "min_stipend" not in skip:
+            try:
+                # filter only rows with stipend >= min_stipend (NaN treated as 0)
+                with metrics.stage("filter_min_stipend"):
+                    keep = _narrow(keep, self.stipend_index.mask(lo=float(min_stipend), missing=0.0), "min_stipend")
+            except Exception:
+                pass
+
+        # duration filter (max)
+        max_duration = candidate.get("max_duration_weeks")
+        if max_duration is not None and max_duration != "" and "max_duration_weeks" not in skip:
+            try:
+                # NaN duration treated as unbounded
+                with metrics.stage("filter_max_duration"):
+                    keep = _narrow(keep, self.duration_index.mask(hi=float(max_duration), missing=np.inf), "max_duration_weeks")
+            except Exception:
+                pass
+
+        # max stipend filter
+        max_stipend = candidate.get("max_stipend")
+        if max_stipend is not None and max_stipend != "" and "max_stipend" not in skip:
+            try:
+                with metrics.stage("filter_max_stipend"):
+                    keep = _narrow(keep, self.stipend_index.mask(hi=float(max_stipend), missing=0.0), "max_stipend")
+            except Exception:
+                pass
+
+        # domain filter (if provided)
+        domain_pref = (candidate.get("domain") or "").strip().lower()
+        if domain_pref and "domain" not in skip:
+            # Check if domain appears in title, organization, or description
+            with metrics.stage("filter_domain"):
+                keep = _narrow(keep, self.domain_index.mask(domain_pref), "domain")
+
+        # education level filter (if provided)
+        education_level = (candidate.get("education_level") or "").strip().lower()
+        if education_level and education_level != "any" and "education_level" not in skip:
+            # Check if education level appears in requirements or description
+            with metrics.stage("filter_education_level"):
+                keep = _narrow(keep, self.education_index.mask(education_level), "education_level")
+
+        return keep
+
+    def facet_counts(self, candidate):
+        """
+        How many live internships pass the candidate's filters in total, per work
+        mode and per city; nothing is scored. Mode counts leave out the
+        candidate's own mode filter, so they show what picking each mode would give.
+        """
+        with metrics.stage("facets"):
+            keep = self._filter_mask(candidate)
+            mode_keep = self._filter_mask(candidate, skip=("mode",)) if (candidate.get("mode") or "").strip() else keep
+            return {
+                "total": int(keep.sum()),
+                "mode": self.mode_facet.counts(mode_keep),
+                "city": self.city_facet.counts(keep),
+            }
+
+    def _location_rows(self, candidate):
+        """Row ids that get the location boost, or None."""
+        pref_loc = (candidate.get("preferred_location") or "").strip().lower()
+        if not pref_loc:
+            return None
+        return self.location_index.lookup(pref_loc)
+
+    def _fuzzy(self, candidate, rows, top_n):
+        """(rows, scores) of the skills fallback over `rows`, or None when no skill matches."""
+        # Parse user skills tokens (split by comma/semicolon)
+        tokens = split_skills(candidate.get("skills"))
+        if not tokens:
+            return None
+        with metrics.stage("fuzzy_fallback"):
+            match_scores = self.skills.score(tokens)
+            matched = rows[match_scores[rows] > 0]
+            winners = _top_k(match_scores, matched, top_n) if matched.size else None
+        if winners is None:
+            return None
+        metrics.set_branch("fuzzy")
+        return winners, match_scores[winners]
+
+    def _materialize(self, rows, scores, fields=RECORD_FIELDS):
+        """Recommendation dicts for `rows`, with only `fields` (see project_fields) read from the catalog."""
+        with metrics.stage("materialize"):
+            # Column by column: a field left out of the projection is never decoded
+            columns = []
+            for field in fields:
+                if field == "score":
+                    columns.append([round(float(score), 2) for score in scores])
+                elif field in ("duration_weeks", "stipend_per_month"):
+                    values = (self.duration if field == "duration_weeks" else self.stipend)[rows]
+                    columns.append([int(v) if not np.isnan(v) else None for v in values.tolist()])
+                else:
+                    columns.append(self.cols[field].take(rows))
+            return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def ranked_rows(self, candidate, scores, top_n):
+        """
+        (rows, scores) of the top `top_n` rows for a catalog score vector, best
+        first, after the candidate's filters, boosts and fallback.
+        """
+        n_rows = self.n_rows
+        keep = self._filter_mask(candidate)
+
+        # Boost score slightly for location match
+        boost_rows = self._location_rows(candidate)
+        if boost_rows is not None:
+            with metrics.stage("location_boost"):
+                boost = np.zeros(n_rows, dtype=float)
+                boost[boost_rows] = LOCATION_BOOST
+                scores = scores + boost
+
+        rows = np.flatnonzero(keep)
+        if rows.size == 0:
+            metrics.set_branch("empty")
+            return rows, scores[rows]
+
+        # If top TF-IDF match is weak, do fuzzy fallback based on skills tokens
+        if scores[rows].max() < 0.20:
+            fallback = self._fuzzy(candidate, rows, top_n)
+            if fallback is not None:
+                return fallback
+
+        # Normal TF-IDF ranking
+        metrics.set_branch("tfidf")
+        with metrics.stage("select"):
+            winners = _top_k(scores, rows, top_n)
+        return winners, scores[winners]
+
+    def rank(self, candidate, scores, top_n, fields=RECORD_FIELDS):
+        """Apply the candidate's filters, boosts and fallback to a catalog score vector."""
+        return self._materialize(*self.ranked_rows(candidate, scores, top_n), fields)
+
+    def ranked_query_rows(self, candidate, query, top_n):
+        """
+        Same result as ranked_rows(candidate, <query scored against every row>, top_n),
+        with the top rows found by `retriever`: only the posting lists of the
+        query's terms are read (notebooks.retrieval), or the shards are searched
+        in parallel and their top rows merged (notebooks.shards).
+        """
+        keep = self._filter_mask(candidate)
+        boost_rows = self._location_rows(candidate)
+        boost_mask = None
+        if boost_rows is not None:
+            boost_mask = np.zeros(self.n_rows, dtype=bool)
+            boost_mask[boost_rows] = True
+        if not keep.any():
+            metrics.set_branch("empty")
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+
+        with metrics.stage("retrieve"):
+            winners, scores = self.retriever.search(query, max(top_n, 1), keep=keep,
+                                                       boost_mask=boost_mask, boost=LOCATION_BOOST)
+        winners, scores = winners[:max(top_n, 0)], scores[:max(top_n, 0)]
+
+        # The best kept row is the first winner: a weak best match triggers the fuzzy fallback
+        if scores.size == 0 or scores[0] < 0.20:
+            fallback = self._fuzzy(candidate, np.flatnonzero(keep), top_n)
+            if fallback is not None:
+                return fallback
+
+        metrics.set_branch("tfidf")
+        return winners, scores
+
+    def rank_query(self, candidate, query, top_n, fields=RECORD_FIELDS):
+        """Same result as rank(candidate, <query scored against every row>, top_n), through `retriever`."""
+        return self._materialize(*self.ranked_query_rows(candidate, query, top_n), fields)
+
+    def query_vectors(self, profiles):
+        """TF-IDF vectors of the profiles as a sparse (len(profiles), n_terms) matrix."""
+        try:
+            with metrics.stage("vectorize"):
+                # Same precision as the catalog matrix, as in score_profiles
+                return self.vectorizer.transform(profiles).astype(self.tfidf_matrix.dtype)
+        except Exception:
+            # no terms at all, i.e. the same zero scores as score_profiles' fallback
+            return sp.csr_matrix((len(profiles), self.tfidf_matrix.shape[1]), dtype=self.tfidf_matrix.dtype)
+
+    def _cached_scores(self, candidate):
+        """Score vector for the candidate's profile, from SCORE_CACHE when possible."""
+        profile = _candidate_profile(candidate)
+        key = (self.cache_token, " ".join(profile.lower().split()))
+        scores = SCORE_CACHE.get(key)
+        if scores is None:
+            scores = self.score_profiles([profile])[0]
+            scores.flags.writeable = False
+            SCORE_CACHE.put(key, scores)
+        return scores
+
+    def recommend_page(self, candidate=None, page_size=5, cursor=None, fields=None):
+        """
+        One page of recommendations: {"recommendations", "next_cursor", "total"}.
+
+        Without a cursor the candidate is ranked down to PAGE_DEPTH rows (or the
+        list ranked for an identical request is reused) and the first page is
+        returned; its first `page_size` rows are exactly recommend(candidate, page_size).
+        With a cursor from a previous page the candidate is ignored and the next
+        page is a slice of the stored list. "total" is the length of that list,
+        and next_cursor is None on its last page. Raises CursorExpired when the
+        list is gone (see RANKINGS) or the catalog changed since the first page,
+        and ValueError for a malformed cursor. `fields` projects each page (see project_fields).
+        """
+        page_size = max(int(page_size), 0)
+        fields = project_fields(fields)
+        if cursor is not None:
+            ranking_id, offset = _parse_cursor(cursor)
+            entry = RANKINGS.get(ranking_id)
+            if entry is None or entry[0] != self.cache_token:
+                raise CursorExpired("cursor expired; request the first page again")
+            metrics.set_branch("page")
+        else:
+            ranking_id, offset = _ranking_id(self.cache_token, candidate), 0
+            entry = RANKINGS.get(ranking_id)
+            if entry is not None:
+                metrics.set_branch("page")
+            else:
+                rows, scores = self._ranked_for(candidate, PAGE_DEPTH)
+                entry = (self.cache_token, np.asarray(rows, dtype=np.int32), np.asarray(scores, dtype=float))
+                RANKINGS.put(ranking_id, entry)
+        _, rows, scores = entry
+        stop = offset + page_size
+        return {
+            "recommendations": self._materialize(rows[offset:stop], scores[offset:stop], fields),
+            "next_cursor": f"{ranking_id}.{stop}" if stop < rows.size else None,
+            "total": int(rows.size),
+        }
+
+    def _ranked_for(self, candidate, top_n):
+        if self.n_live == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+        if self.uses_retriever:
+            return self.ranked_query_rows(candidate, self.query_vectors([_candidate_profile(candidate)]), top_n)
+        return self.ranked_rows(candidate, self._cached_scores(candidate), top_n)
+
+    def recommend(self, candidate, top_n=5, fields=None):
+        """
+        Top `top_n` recommendation dicts for one candidate (see recommend_for_candidate),
+        with only the given `fields` (see project_fields).
+        """
+        fields = project_fields(fields)
+        if self.n_live == 0:
+            return []
+        with metrics.stage("result_cache"):
+            key = (self.cache_token, canonical_request(candidate), top_n, fields)
+            recs = RESULT_CACHE.get(key)
+        if recs is None:
+            recs = self._materialize(*self._ranked_for(candidate, top_n), fields)
+            RESULT_CACHE.put(key, recs)
+        else:
+            metrics.set_branch("cache_hit")
+        # Callers get their own dicts; cached entries are never handed out
+        return [dict(r) for r in recs]
+
+    def _batch_chunk_size(self):
+        if self.uses_retriever:
+            # No dense score block: candidates are only vectorized together
+            return BATCH_MAX_CHUNK
+        # Bound the dense (chunk x catalog) score block to BATCH_SCORE_BYTES
+        return max(1, min(BATCH_MAX_CHUNK, BATCH_SCORE_BYTES // (8 * max(self.n_rows, 1))))
+
+    def iter_recommendations(self, candidates, top_n=5, chunk_size=None, fields=None):
+        """
+        Recommendations for many candidates, yielded one list per candidate in input order.
+
+        Candidates are vectorized and scored a chunk at a time with a single sparse
+        matrix product, so memory stays bounded by `chunk_size` x catalog size.
+        With sparse retrieval or shards the chunk is vectorized together and each
+        candidate is then ranked through the retriever.
+        `top_n` is either one value for all candidates or a sequence with one per candidate,
+        and so is `fields`: one projection (a list of field names, or None) or one per candidate.
+        """
+        candidates = list(candidates)
+        top_ns = [top_n] * len(candidates) if isinstance(top_n, int) else list(top_n)
+        if fields is None or isinstance(fields, str) or all(isinstance(f, str) for f in fields):
+            projections = [project_fields(fields)] * len(candidates)
+        else:
+            projections = [project_fields(f) for f in fields]
+        if self.n_live == 0:
+            for _ in candidates:
+                yield []
+            return
+        chunk_size = chunk_size or self._batch_chunk_size()
+        for start in range(0, len(candidates), chunk_size):
+            chunk = candidates[start:start + chunk_size]
+            with metrics.stage("result_cache"):
+                keys = [(self.cache_token, canonical_request(c), top_ns[start + i], projections[start + i])
+                        for i, c in enumerate(chunk)]
+                results = [RESULT_CACHE.get(key) for key in keys]
+            # Only cache misses are vectorized and scored, still in one matrix product
+            misses = [i for i, recs in enumerate(results) if recs is None]
+            for _ in range(len(chunk) - len(misses)):
+                metrics.set_branch("cache_hit")
+            if misses and self.uses_retriever:
+                query_block = self.query_vectors([_candidate_profile(chunk[i]) for i in misses])
+                for row, i in enumerate(misses):
+                    results[i] = self.rank_query(chunk[i], query_block[row], top_ns[start + i], projections[start + i])
+                    RESULT_CACHE.put(keys[i], results[i])
+            elif misses:
+                score_block = self.score_profiles([_candidate_profile(chunk[i]) for i in misses])
+                for row, i in enumerate(misses):
+                    results[i] = self.rank(chunk[i], score_block[row], top_ns[start + i], projections[start + i])
+                    RESULT_CACHE.put(keys[i], results[i])
+            for recs in results:
+                yield [dict(r) for r in recs]
 
 
-def recommend_for_candidate(candidate: dict, top_n: int = 5):
+# Module-level API, backed by the process-wide engine (built on first use)
+
+def get_engine():
+    """The shared RecommendationEngine, loading it on first use."""
+    from notebooks import service
+    return service.get_engine()
+
+
+def recommend_for_candidate(candidate: dict, top_n: int = 5, fields=None):
     """
     candidate: dict containing keys like:
         - education (str)
@@ -97,163 +831,42 @@ def recommend_for_candidate(candidate: dict, top_n: int = 5):
         - domain (str)            optional domain filter
         - education_level (str)   optional education level filter
         - max_stipend (float)     optional max stipend filter
+    fields: optional list of RECORD_FIELDS to return (default: all of them)
     Returns: list of top_n recommendation dicts.
     """
-    # Build candidate text profile
-    candidate_profile = " ".join([
-        str(candidate.get("education", "") or ""),
-        str(candidate.get("skills", "") or ""),
-        str(candidate.get("interests", "") or "")
-    ]).strip()
-    if candidate_profile == "":
-        candidate_profile = "empty"
-
-    # Compute cosine similarity
-    try:
-        cand_vec = _vectorizer.transform([candidate_profile])
-        scores = cosine_similarity(cand_vec, _tfidf_matrix)[0]
-    except Exception:
-        # fallback to zeroes if transform fails
-        scores = np.zeros(_INTERN.shape[0], dtype=float)
-
-    results = _INTERN.copy()
-    results["score"] = scores.astype(float)
-
-    # Optional filtering
-    # mode filter (if provided)
-    mode_pref = (candidate.get("mode") or "").strip().lower()
-    if mode_pref:
-        # keep those that contain the requested mode (case-insensitive)
-        mask_mode = results["mode"].astype(str).str.lower().str.contains(mode_pref)
-        if mask_mode.any():
-            results = results[mask_mode]
-        # if none match, we keep all (don't drop everything)
-
-    # stipend filter (min)
-    min_stipend = candidate.get("min_stipend")
-    if min_stipend is not None and min_stipend != "":
-        try:
-            min_stipend = float(min_stipend)
-            # filter only rows with stipend >= min_stipend (NaN treated as 0)
-            stipend_vals = results["stipend_per_month"].fillna(0)
-            mask_stipend = stipend_vals >= min_stipend
-            if mask_stipend.any():
-                results = results[mask_stipend]
-        except Exception:
-            pass
+    with metrics.traced("recommend_for_candidate"):
+        return get_engine().recommend(candidate, top_n=top_n, fields=fields)
 
-    # duration filter (max)
-    max_duration = candidate.get("max_duration_weeks")
-    if max_duration is not None and max_duration != "":
-        try:
-            max_duration = float(max_duration)
-            duration_vals = results["duration_weeks"].fillna(np.inf)
-            mask_dur = duration_vals <= max_duration
-            if mask_dur.any():
-                results = results[mask_dur]
-        except Exception:
-            pass
 
-    # max stipend filter
-    max_stipend = candidate.get("max_stipend")
-    if max_stipend is not None and max_stipend != "":
-        try:
-            max_stipend = float(max_stipend)
-            stipend_vals = results["stipend_per_month"].fillna(0)
-            mask_max_stipend = stipend_vals <= max_stipend
-            if mask_max_stipend.any():
-                results = results[mask_max_stipend]
-        except Exception:
-            pass
-
-    # domain filter (if provided)
-    domain_pref = (candidate.get("domain") or "").strip().lower()
-    if domain_pref:
-        # Check if domain appears in title, organization, or description
-        domain_mask = (
-            results["title"].astype(str).str.lower().str.contains(domain_pref) |
-            results["organization"].astype(str).str.lower().str.contains(domain_pref) |
-            results["description"].astype(str).str.lower().str.contains(domain_pref)
-        )
-        if domain_mask.any():
-            results = results[domain_mask]
-
-    # education level filter (if provided)
-    education_level = (candidate.get("education_level") or "").strip().lower()
-    if education_level and education_level != "any":
-        # Check if education level appears in requirements or description
-        edu_mask = (
-            results["requirements"].astype(str).str.lower().str.contains(education_level) |
-            results["description"].astype(str).str.lower().str.contains(education_level) |
-            results["all_requirements"].astype(str).str.lower().str.contains(education_level)
-        )
-        if edu_mask.any():
-            results = results[edu_mask]
+def iter_recommendations(candidates, top_n=5, chunk_size=None, fields=None):
+    """Recommendations for many candidates, one list per candidate in input order (chunked matrix scoring)."""
+    return get_engine().iter_recommendations(candidates, top_n=top_n, chunk_size=chunk_size, fields=fields)
 
-    # Boost score slightly for location match
-    pref_loc = (candidate.get("preferred_location") or "").strip().lower()
-    if pref_loc:
-        results["score"] = results["score"] + results["location"].astype(str).str.lower().apply(lambda loc: 0.1 if pref_loc in loc else 0)
 
-    # If after filters there are no rows, fall back to full dataset
-    if results.shape[0] == 0:
-        results = _INTERN.copy()
-        results["score"] = scores.astype(float)
+def recommend_batch(candidates, top_n=5, chunk_size=None, fields=None):
+    """List form of iter_recommendations: one recommendation list per candidate."""
+    with metrics.traced("recommend_batch"):
+        return list(iter_recommendations(candidates, top_n=top_n, chunk_size=chunk_size, fields=fields))
 
-    # If top TF-IDF match is weak, do fuzzy fallback based on skills tokens
-    if results["score"].max() < 0.20:
-        # Parse user skills tokens (split by comma/semicolon)
-        skills_text = (candidate.get("skills") or "").lower()
-        tokens = [t.strip() for t in re.split(r"[;,]", skills_text) if t.strip()]
-        fallback = []
-        if tokens:
-            for idx, row in results.iterrows():
-                job_text = (" ".join([str(row["requirements"]), str(row.get("all_requirements", ""))])).lower()
-                match_score = 0.0
-                for t in tokens:
-                    if not t:
-                        continue
-                    if t in job_text:
-                        match_score += 1.0
-                    else:
-                        # similarity ratio against job_text (coarse)
-                        ratio = difflib.SequenceMatcher(None, t, job_text).ratio()
-                        if ratio >= 0.45:
-                            match_score += 0.5
-                if match_score > 0:
-                    fallback.append((idx, match_score))
-            if fallback:
-                fallback = sorted(fallback, key=lambda x: x[1], reverse=True)[:top_n]
-                recs = []
-                for idx, ms in fallback:
-                    row = _INTERN.loc[idx]
-                    recs.append({
-                        "title": row["title"],
-                        "organization": row["organization"],
-                        "location": row["location"],
-                        "mode": row.get("mode", ""),
-                        "duration_weeks": int(row["duration_weeks"]) if pd.notna(row["duration_weeks"]) else None,
-                        "stipend_per_month": int(row["stipend_per_month"]) if pd.notna(row["stipend_per_month"]) else None,
-                        "description": row.get("description", ""),
-                        "requirements": row.get("requirements", ""),
-                        "score": round(float(ms), 2)
-                    })
-                return recs
-
-    # Normal TF-IDF ranking
-    top = results.sort_values(by="score", ascending=False).head(top_n)
-    recommendations = []
-    for _, row in top.iterrows():
-        recommendations.append({
-            "title": row["title"],
-            "organization": row["organization"],
-            "location": row["location"],
-            "mode": row.get("mode", ""),
-            "duration_weeks": int(row["duration_weeks"]) if pd.notna(row["duration_weeks"]) else None,
-            "stipend_per_month": int(row["stipend_per_month"]) if pd.notna(row["stipend_per_month"]) else None,
-            "description": row.get("description", ""),
-            "requirements": row.get("requirements", ""),
-            "score": round(float(row["score"]), 2)
-        })
-
-    return recommendations
\ No newline at end of file
+
+def facet_counts(candidate: dict):
+    """Matching internships in total, per mode and per city for the candidate's filters (see RecommendationEngine.facet_counts)."""
+    with metrics.traced("facet_counts"):
+        return get_engine().facet_counts(candidate)
+
+
+def recommend_page(candidate=None, page_size=5, cursor=None, fields=None):
+    """One page of recommendations plus a cursor for the next one (see RecommendationEngine.recommend_page)."""
+    with metrics.traced("recommend_page"):
+        return get_engine().recommend_page(candidate, page_size=page_size, cursor=cursor, fields=fields)
+
+
+def cache_stats():
+    """Hit / miss / eviction counters and sizes of the result, score and pagination caches."""
+    return {"results": RESULT_CACHE.stats(), "scores": SCORE_CACHE.stats(), "rankings": RANKINGS.stats()}
+
+
+def clear_caches():
+    RESULT_CACHE.clear()
+    SCORE_CACHE.clear()
+    RANKINGS.clear()
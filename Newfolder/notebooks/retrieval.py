@@ -0,0 +1,232 @@
+# notebooks/retrieval.py
+"""
+Sparse top-k retrieval over the TF-IDF matrix.
+
+Brute-force scoring multiplies the query with every catalog row, so its
+cost grows with the catalog. ImpactIndex keeps, for every vocabulary term,
+the rows that contain it sorted by their weight for that term (highest
+first). A query walks only the posting lists of its own terms, in blocks,
+always advancing the list whose next weight can still add the most:
+
+    bound = sum over query terms of q_t * (next unread weight of t) [+ boost]
+
+is the best score any row not seen yet can reach. Rows are scored exactly
+the first time they are seen, and the walk stops once the k-th best exact
+score beats the bound (MaxScore / threshold-algorithm pruning).
+
+Results are identical to ranking the dense `query @ matrix.T` vector:
+exact scores are summed in the same order as the sparse product, ties are broken by
+row order, and filters are applied as a bitmap while the lists are walked.
+Per-query state grows with the rows actually read (a sorted array of the rows
+scored so far), never with the catalog size.
+"""
+import threading
+
+import numpy as np
+
+# Postings read from one list per step; doubles each time that list is advanced again
+FIRST_BLOCK = 64
+MAX_BLOCK = 1 << 16
+# Slack on the stopping bound, in units of the weights' machine epsilon per query
+# term, so float rounding in the bound can never cut off a true winner
+_BOUND_SLACK_EPS = 8
+# Rows from which scipy's (compiled) row/column slicing beats gathering entries
+# with numpy; below it scipy's per-call overhead dominates
+_SLICE_ROWS = 512
+
+
+def _absent(sorted_rows, ids):
+    """Mask of the `ids` missing from the sorted array `sorted_rows`."""
+    if sorted_rows.size == 0:
+        return np.ones(ids.size, dtype=bool)
+    return sorted_rows[np.minimum(np.searchsorted(sorted_rows, ids), sorted_rows.size - 1)] != ids
+
+
+def _first_rows(n_rows, k, accept):
+    """Up to k smallest row ids for which accept(ids) holds, scanned in growing windows."""
+    found, lo, width = [], 0, max(k, FIRST_BLOCK)
+    need = k
+    while need > 0 and lo < n_rows:
+        ids = np.arange(lo, min(lo + width, n_rows))
+        ids = ids[accept(ids)][:need]
+        found.append(ids)
+        need -= ids.size
+        lo += width
+        width *= 2
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+def _select(rows, scores, k):
+    """The k best (rows, scores) by score desc, then row asc."""
+    order = np.lexsort((rows, -scores))[:k]
+    return rows[order], scores[order]
+
+
+def _top_k(scores, rows, k):
+    """
+    Return up to k row ids from `rows` ordered by score (desc), ties broken by row order.
+    Uses partial selection, so only the k winners are ever sorted.
+    """
+    if k <= 0 or rows.size == 0:
+        return rows[:0]
+    vals = scores[rows]
+    if k < rows.size:
+        kth = np.partition(vals, rows.size - k)[rows.size - k]
+        above = rows[vals > kth]
+        ties = rows[vals == kth][: k - above.size]
+        rows = np.concatenate([above, ties])
+        vals = scores[rows]
+    order = np.lexsort((rows, -vals))
+    return rows[order]
+
+
+class ImpactIndex:
+    """Impact-ordered posting lists (term -> rows sorted by weight desc) for a CSR document matrix."""
+
+    def __init__(self, matrix):
+        matrix = matrix.tocsr()
+        self.matrix = matrix
+        self.n_rows, self.n_terms = matrix.shape
+        csc = matrix.tocsc()
+        lengths = np.diff(csc.indptr)
+        term_of = np.repeat(np.arange(self.n_terms, dtype=np.int32), lengths)
+        # Within each term: weight desc, then row asc (so equal weights keep row order)
+        order = np.lexsort((csc.indices, -csc.data, term_of))
+        self.offsets = csc.indptr.astype(np.int64)
+        self.rows = csc.indices[order].astype(np.int32)
+        self.weights = csc.data[order]
+        self.max_weight = np.zeros(self.n_terms, dtype=self.weights.dtype)
+        nonempty = lengths > 0
+        self.max_weight[nonempty] = self.weights[self.offsets[:-1][nonempty]]
+        # Per thread: term -> position in the current query (-1 for other terms),
+        # allocated once and reset after each search, so a query costs O(its terms)
+        self._scratch = threading.local()
+
+    @property
+    def nbytes(self):
+        return int(self.offsets.nbytes + self.rows.nbytes + self.weights.nbytes + self.max_weight.nbytes)
+
+    def _query_entries(self, terms, term_pos, rows):
+        """
+        (local row index, query position, weight) of every query term held by
+        each of `rows`, read from the CSR matrix.
+        """
+        if rows.size >= _SLICE_ROWS:
+            sub = self.matrix[rows][:, terms]
+            return np.repeat(np.arange(rows.size), np.diff(sub.indptr)), sub.indices, sub.data
+        indptr = self.matrix.indptr
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+        local = np.repeat(np.arange(rows.size), lengths)
+        flat = np.arange(int(lengths.sum())) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        pos = term_pos[self.matrix.indices[flat]]
+        hit = pos >= 0
+        return local[hit], pos[hit], self.matrix.data[flat[hit]]
+
+    @staticmethod
+    def _exact(qw, n, local, pos, weights):
+        """
+        query . row for `n` rows from their _query_entries().
+
+        Contributions are multiplied and summed per row in the matrix's
+        precision and in the query's term order, which is how the sparse
+        product behind linear_kernel(query, matrix) computes them, so the
+        scores are bit-identical to the dense path.
+        """
+        out = np.zeros(n, dtype=weights.dtype)
+        for p in np.unique(pos):
+            sel = pos == p
+            # A row holds each term at most once, so the fancy += never collides
+            out[local[sel]] += qw[p] * weights[sel]
+        return out.astype(float)
+
+    def _term_positions(self):
+        term_pos = getattr(self._scratch, "term_pos", None)
+        if term_pos is None:
+            term_pos = self._scratch.term_pos = np.full(self.n_terms, -1, dtype=np.int64)
+        return term_pos
+
+    def search(self, query, k, keep=None, boost_mask=None, boost=0.0):
+        """
+        Top `k` rows for a 1 x n_terms query vector as (rows, scores).
+
+        Scores are query . row, plus `boost` for rows set in `boost_mask`.
+        Only rows set in the `keep` bitmap are considered. The result equals
+        taking the k best of the full dense score vector over the kept rows,
+        ordered by score desc then row asc.
+        """
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+        query = query.tocsr()
+        terms = query.indices
+        term_pos = self._term_positions()
+        term_pos[terms] = np.arange(terms.size)
+        try:
+            return self._search(query, terms, term_pos, k, keep, boost_mask, boost)
+        finally:
+            term_pos[terms] = -1
+
+    def _search(self, query, terms, term_pos, k, keep, boost_mask, boost):
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+        qw = np.asarray(query.data, dtype=self.weights.dtype)
+        slack = _BOUND_SLACK_EPS * (terms.size + 1) * float(np.finfo(self.weights.dtype).eps)
+        extra = float(boost) if boost_mask is not None and boost else 0.0
+
+        starts = self.offsets[terms].copy()
+        ends = self.offsets[terms + 1]
+        blocks = np.full(terms.size, FIRST_BLOCK, dtype=np.int64)
+        seen = np.empty(0, dtype=np.int64)
+        top_rows, top_scores = empty
+
+        while True:
+            live = starts < ends
+            frontier = np.zeros(terms.size, dtype=float)
+            frontier[live] = qw[live].astype(float) * self.weights[starts[live]]
+            bound = float(frontier.sum()) + extra
+            if top_rows.size >= k and top_scores[-1] > bound + slack:
+                return top_rows, top_scores
+            if not live.any():
+                break
+            # Advance the list whose next postings can add the most to an unseen row
+            t = int(np.argmax(frontier))
+            stop = min(starts[t] + blocks[t], ends[t])
+            ids = self.rows[starts[t]:stop]
+            starts[t] = stop
+            blocks[t] = min(blocks[t] * 2, MAX_BLOCK)
+            if keep is not None:
+                ids = ids[keep[ids]]
+            # Skip rows already scored from another list; `seen` keeps them sorted
+            ids = np.sort(ids)
+            ids = ids[_absent(seen, ids)]
+            if ids.size == 0:
+                continue
+            seen = np.insert(seen, np.searchsorted(seen, ids), ids)
+            scores = self._exact(qw, ids.size, *self._query_entries(terms, term_pos, ids))
+            if extra:
+                scores = scores + boost * boost_mask[ids]
+            top_rows, top_scores = _select(np.concatenate([top_rows, ids]), np.concatenate([top_scores, scores]), k)
+
+        # Every posting of every query term has been read: the remaining rows
+        # score 0 (+ boost). They matter only when they can still make the top k.
+        if top_rows.size >= k and top_scores[-1] > extra:
+            return top_rows, top_scores
+        # Rows left unseen hold none of the query terms; only the first ones in
+        # row order (boosted ones first) are looked for, until k are found
+        def unseen(ids, boosted=None):
+            ok = _absent(seen, ids)
+            if keep is not None:
+                ok &= keep[ids]
+            if boosted is not None:
+                ok &= boost_mask[ids] == boosted
+            return ok
+
+        if extra:
+            fill = [_first_rows(self.n_rows, k, lambda ids: unseen(ids, True)),
+                    _first_rows(self.n_rows, k, lambda ids: unseen(ids, False))]
+        else:
+            fill = [_first_rows(self.n_rows, k, unseen)]
+        fill_rows = np.concatenate(fill)
+        fill_scores = np.zeros(fill_rows.size, dtype=float)
+        if extra:
+            fill_scores = fill_scores + boost * boost_mask[fill_rows]
+        return _select(np.concatenate([top_rows, fill_rows]), np.concatenate([top_scores, fill_scores]), k)
@@ -0,0 +1,491 @@
+# notebooks/service.py
+"""
+Process-wide recommendation engine, built lazily.
+
+Importing this module is cheap: pandas, scikit-learn and the catalog load
+are deferred until the engine is first needed or warm_up() is called, so a
+web server can answer health checks while the engine is still building.
+
+Catalog changes build a new engine next to the current one and publish it
+by swapping a single reference, so in-flight requests keep ranking against
+the engine they started with and never see a half-built state.
+
+Several catalogs can be served side by side: CatalogRegistry keeps one
+EngineHandle per catalog id (configured in the JSON file named by
+RECOMMENDER_CATALOGS), loads each on first use and unloads the least
+recently used ones when the loaded engines exceed RECOMMENDER_CATALOG_BYTES.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from notebooks import metrics
+
+DEFAULT_CATALOG = "default"
+# JSON file: {"<catalog id>": {"path": ..., "artifact_dir": ..., "vectorizer": {...}}, ...}
+CATALOGS_FILE = os.environ.get("RECOMMENDER_CATALOGS")
+# Memory budget for loaded engines (bytes, as RecommendationEngine.memory_report counts them); 0 = no limit
+CATALOG_BYTES = int(os.environ.get("RECOMMENDER_CATALOG_BYTES", str(1024 * 1024 * 1024)))
+# Seconds a replaced engine's shard processes keep serving requests that still
+# hold it (above the default request timeout); 0 stops them right away
+RETIRE_SECONDS = float(os.environ.get("RECOMMENDER_RETIRE_SECONDS", "60"))
+_SPEC_KEYS = ("path", "artifact_dir", "vectorizer")
+
+
+class EngineHandle:
+    """Holds one lazily built engine behind a readiness flag, and publishes catalog changes."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._engine = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.error = None
+        self.load_seconds = None
+        # Serializes writers (changes, refits, reloads); readers never take it
+        self._write_lock = threading.Lock()
+        self._refit_lock = threading.Lock()
+        # Changes applied while a refit is running, replayed onto its result
+        self._journal = None
+        self._scheduler = None
+        self.dirty = False
+        # Admin changes applied since the engine was loaded from its source; they
+        # live only in memory, so such an engine is never unloaded
+        self.modified = False
+        self.last_refit = None
+        # Loads done, and calls that waited on another thread's load instead of loading again
+        self.loads = 0
+        self.merged_loads = 0
+
+    @property
+    def ready(self):
+        return self._engine is not None
+
+    def get(self):
+        """Return the engine, building it (or waiting for a warm-up in progress) if needed."""
+        engine = self._engine
+        if engine is not None:
+            return engine
+        with self._lock:
+            if self._engine is None:
+                started = time.perf_counter()
+                try:
+                    engine = self._factory()
+                    engine.build_retriever()
+                    self._engine = engine
+                    self.error = None
+                    self.loads += 1
+                except Exception as e:
+                    self.error = e
+                    raise
+                finally:
+                    self.load_seconds = time.perf_counter() - started
+            else:
+                self.merged_loads += 1
+            return self._engine
+
+    def unload(self):
+        """
+        Drop the engine (in-flight requests keep the one they hold); the next get()
+        loads it again from its source. Returns False, leaving the engine loaded,
+        while a refit or reload is running or when it holds admin changes since
+        its load (they are not in the source and would be lost).
+        """
+        if not self._refit_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._write_lock:
+                if self.modified:
+                    return False
+                self._retire(self._engine)
+                self._engine = None
+                self._journal = None
+                self.dirty = False
+            return True
+        finally:
+            self._refit_lock.release()
+
+    def warm_up(self):
+        """Start building the engine on a background thread (no-op if built or already warming)."""
+        if self._engine is not None or (self._thread is not None and self._thread.is_alive()):
+            return
+
+        def _build():
+            try:
+                self.get()
+            except Exception:
+                pass  # recorded in self.error; the next get() retries
+
+        self._thread = threading.Thread(target=_build, name="engine-warmup", daemon=True)
+        self._thread.start()
+
+    # -- catalog changes -------------------------------------------------
+
+    def _publish(self, engine):
+        # The retriever is built here, never inside the first request that uses it
+        engine.build_retriever()
+        # A single reference assignment: readers see the old or the new engine, never a mix
+        old, self._engine = self._engine, engine
+        if old is not engine:
+            self._retire(old)
+
+    @staticmethod
+    def _retire(engine):
+        # Stop a replaced engine's shard processes once requests still holding it are done
+        pool = engine.shard_pool if engine is not None else None
+        if pool is None:
+            return
+        if RETIRE_SECONDS <= 0:
+            pool.close()
+            return
+        timer = threading.Timer(RETIRE_SECONDS, pool.close)
+        timer.daemon = True
+        timer.start()
+
+    def apply_changes(self, upserts=(), deletes=(), updates=()):
+        """
+        Apply upserts ((id or None, fields) pairs), updates ((id, fields) pairs
+        merged onto the current row, so fields left out keep their value) and
+        deletes (ids), and publish the result. Updates are merged under the
+        write lock, so concurrent partial updates of one row never drop each
+        other's fields. Returns (engine, ids) where ids are the upserted, then
+        updated ids in order; rows given with id None get fresh ids. Raises
+        KeyError for unknown ids.
+        """
+        with self._write_lock:
+            engine = self.get()
+            next_id = engine.next_id
+            resolved = []
+            for internship_id, fields in upserts:
+                if internship_id is None:
+                    internship_id, next_id = next_id, next_id + 1
+                resolved.append((int(internship_id), fields))
+            for internship_id, fields in updates:
+                current = engine.get_internship(internship_id)
+                if current is None:
+                    raise KeyError(internship_id)
+                current.pop("id")
+                current.pop("all_requirements", None)
+                current.update(fields)
+                resolved.append((int(internship_id), current))
+            deletes = [int(i) for i in deletes]
+            new_engine = engine.with_changes(resolved, deletes)
+            if self._journal is not None:
+                self._journal.append((resolved, deletes))
+            self.dirty = True
+            self.modified = True
+            self._publish(new_engine)
+            return new_engine, [i for i, _ in resolved]
+
+    def refit(self):
+        """
+        Refit the vocabulary and rebuild indexes over the live rows, off the
+        request path. Changes made meanwhile are replayed before publishing.
+        """
+        with self._refit_lock:
+            with self._write_lock:
+                snapshot = self.get()
+                self._journal = []
+                self.dirty = False
+            try:
+                fresh = snapshot.refit()
+                fresh.build_retriever()
+            except Exception:
+                with self._write_lock:
+                    self._journal = None
+                    self.dirty = True
+                raise
+            with self._write_lock:
+                for upserts, deletes in self._journal:
+                    fresh = fresh.with_changes(upserts, deletes)
+                self._journal = None
+                fresh.version = self._engine.version + 1
+                self._publish(fresh)
+                self.last_refit = time.time()
+            return fresh
+
+    def reload(self):
+        """Rebuild the engine from its source (e.g. an updated CSV) and publish it."""
+        with self._refit_lock:
+            fresh = self._factory()
+            fresh.build_retriever()
+            with self._write_lock:
+                if self._engine is not None:
+                    fresh.version = self._engine.version + 1
+                self._journal = None
+                self.dirty = False
+                self.modified = False
+                self._publish(fresh)
+            return fresh
+
+    def start_refit_scheduler(self, interval):
+        """Refit in the background every `interval` seconds when there are unrefitted changes."""
+        if interval <= 0 or (self._scheduler is not None and self._scheduler.is_alive()):
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                if self.dirty and self._engine is not None:
+                    try:
+                        self.refit()
+                    except Exception:
+                        pass  # keep serving the current engine; retried next interval
+
+        self._scheduler = threading.Thread(target=_loop, name="engine-refit", daemon=True)
+        self._scheduler.start()
+
+    def status(self):
+        if self._engine is not None:
+            state = "ready"
+        elif self._lock.locked():
+            state = "loading"
+        elif self.error is not None:
+            state = "error"
+        else:
+            state = "idle"
+        out = {"state": state, "load_seconds": round(self.load_seconds, 3) if self.load_seconds else None}
+        if self._engine is not None:
+            out.update({
+                "version": self._engine.version,
+                "rows": self._engine.n_live,
+                "pending_refit": self.dirty,
+                "changed_since_load": self.modified,
+                "last_refit": self.last_refit,
+                "shards": self._engine.n_shards,
+            })
+        if state == "error":
+            out["error"] = str(self.error)
+        return out
+
+
+def _engine_bytes(engine):
+    return engine.memory_report()["total"]
+
+
+class CatalogRegistry:
+    """
+    One EngineHandle per catalog id, loaded on first use and evicted least
+    recently used first while the loaded engines add up to more than `max_bytes`.
+    Engines holding admin changes since their load are never evicted (see
+    EngineHandle.unload), so those can keep the total above the budget.
+
+    `catalogs` maps ids to RecommendationEngine.load() arguments (path,
+    artifact_dir, vectorizer). Concurrent first requests for a catalog share a
+    single load (EngineHandle.get), and the catalog just used is never evicted.
+    """
+
+    def __init__(self, catalogs, max_bytes=CATALOG_BYTES, default=DEFAULT_CATALOG):
+        self.specs = dict(catalogs)
+        self.max_bytes = max_bytes
+        self.default = default
+        self._handles = OrderedDict((cid, EngineHandle(self._factory(spec))) for cid, spec in self.specs.items())
+        self._lock = threading.Lock()  # guards the LRU order and counters
+        self._evict_lock = threading.Lock()
+        self.hits = {cid: 0 for cid in self.specs}
+        self.evictions = {cid: 0 for cid in self.specs}
+        self.last_used = {cid: None for cid in self.specs}
+
+    @staticmethod
+    def _factory(spec):
+        def load():
+            from notebooks.recommend import RecommendationEngine
+            return RecommendationEngine.load(**spec)
+        return load
+
+    def __contains__(self, catalog_id):
+        return (catalog_id or self.default) in self._handles
+
+    def handle(self, catalog_id=None):
+        """The EngineHandle of a catalog (the default one for None); KeyError for an unknown id."""
+        catalog_id = catalog_id or self.default
+        try:
+            return self._handles[catalog_id]
+        except KeyError:
+            raise KeyError(f"unknown catalog {catalog_id!r}") from None
+
+    def get(self, catalog_id=None):
+        """The catalog's engine, loading it (and evicting others over the budget) if needed."""
+        catalog_id = catalog_id or self.default
+        handle = self.handle(catalog_id)
+        with self._lock:
+            self._handles.move_to_end(catalog_id)
+            self.last_used[catalog_id] = time.time()
+            if handle.ready:
+                self.hits[catalog_id] += 1
+        loads = handle.loads
+        engine = handle.get()
+        if handle.loads != loads:
+            self.enforce_budget(keep=catalog_id)
+        return engine
+
+    def enforce_budget(self, keep=None):
+        """
+        Unload least recently used engines (never `keep`, nor engines with admin
+        changes since their load) until the loaded ones fit in max_bytes.
+        """
+        if self.max_bytes <= 0:
+            return
+        with self._evict_lock:
+            with self._lock:
+                loaded = [(cid, h) for cid, h in self._handles.items() if h.ready]
+            sizes = {cid: _engine_bytes(h._engine) for cid, h in loaded if h._engine is not None}
+            total = sum(sizes.values())
+            for cid, h in loaded:
+                if total <= self.max_bytes:
+                    break
+                if cid == keep or cid not in sizes or not h.unload():
+                    continue
+                total -= sizes[cid]
+                with self._lock:
+                    self.evictions[cid] += 1
+
+    def start_refit_scheduler(self, interval):
+        """Periodic refits (EngineHandle.start_refit_scheduler) for every catalog."""
+        for handle in self._handles.values():
+            handle.start_refit_scheduler(interval)
+
+    def stats(self):
+        """Budget, bytes loaded and per-catalog state with load / hit / eviction counters."""
+        catalogs = {}
+        for cid, handle in list(self._handles.items()):
+            engine = handle._engine
+            catalogs[cid] = {
+                "state": handle.status()["state"],
+                "bytes": _engine_bytes(engine) if engine is not None else 0,
+                "loads": handle.loads,
+                "merged_loads": handle.merged_loads,
+                "hits": self.hits[cid],
+                "evictions": self.evictions[cid],
+                "changed_since_load": handle.modified,
+                "last_used": self.last_used[cid],
+                "load_seconds": round(handle.load_seconds, 3) if handle.load_seconds else None,
+            }
+        return {
+            "default": self.default,
+            "max_bytes": self.max_bytes,
+            "bytes": sum(c["bytes"] for c in catalogs.values()),
+            "loaded": sum(c["state"] == "ready" for c in catalogs.values()),
+            "catalogs": catalogs,
+        }
+
+
+def load_catalog_specs(path=CATALOGS_FILE):
+    """
+    {catalog id: load() arguments}: the default catalog (data/internships.csv and
+    its artifact) plus the catalogs in the JSON file at `path`, whose relative
+    paths are resolved against the file's directory. A catalog without an
+    artifact_dir is always fitted from its source.
+    """
+    specs = {DEFAULT_CATALOG: {}}
+    if not path:
+        return specs
+    with open(path, encoding="utf-8") as fh:
+        configured = json.load(fh)
+    base = os.path.dirname(os.path.abspath(path))
+    for catalog_id, spec in configured.items():
+        unknown = sorted(set(spec) - set(_SPEC_KEYS))
+        if unknown or "path" not in spec and catalog_id != DEFAULT_CATALOG:
+            raise ValueError(f"catalog {catalog_id!r}: needs a path and only {', '.join(_SPEC_KEYS)}")
+        spec = dict(spec)
+        for key in ("path", "artifact_dir"):
+            if spec.get(key):
+                spec[key] = os.path.join(base, spec[key])
+        if catalog_id != DEFAULT_CATALOG:
+            spec.setdefault("artifact_dir", None)
+        specs[catalog_id] = spec
+    return specs
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide CatalogRegistry (reads RECOMMENDER_CATALOGS on first use)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CatalogRegistry(load_catalog_specs())
+    return _registry
+
+
+def get_engine(catalog=None):
+    """The shared RecommendationEngine of a catalog (blocks until it is loaded)."""
+    return get_registry().get(catalog)
+
+
+def warm_up(catalog=None):
+    """Load a catalog's shared engine in the background."""
+    get_registry().handle(catalog).warm_up()
+
+
+def get_handle(catalog=None):
+    """The EngineHandle behind a catalog's shared engine (catalog changes, refits, reloads)."""
+    return get_registry().handle(catalog)
+
+
+def has_catalog(catalog):
+    return catalog in get_registry()
+
+
+def catalog_stats():
+    """Registry budget and per-catalog load / hit / eviction statistics."""
+    return get_registry().stats()
+
+
+def is_ready():
+    return get_registry().handle().ready
+
+
+def engine_status(catalog=None):
+    """{"state": "idle" | "loading" | "ready" | "error", "load_seconds": ...}"""
+    return get_registry().handle(catalog).status()
+
+
+# -- worker pool tasks -----------------------------------------------------
+# Module-level so a process pool can pickle them; each worker process
+# builds its own copy of the shared engine.
+
+def init_worker():
+    """Pool initializer: load the default engine up front (errors surface on the first task)."""
+    try:
+        get_engine()
+    except Exception:
+        pass
+
+
+def _engine_for_task(catalog=None):
+    registry = get_registry()
+    if registry.handle(catalog).ready:
+        return registry.get(catalog)
+    with metrics.stage("engine_load"):
+        return registry.get(catalog)
+
+
+def recommend_task(candidate, top_n, profile=False, fields=None, catalog=None):
+    """(recommendations, trace dict or None); the caller records the trace."""
+    with metrics.traced(observe=False, profile=profile) as trace:
+        recs = _engine_for_task(catalog).recommend(candidate, top_n=top_n, fields=fields)
+    return recs, trace.as_dict() if trace is not None else None
+
+
+def batch_task(candidates, top_ns, profile=False, fields=None, catalog=None):
+    with metrics.traced(observe=False, profile=profile) as trace:
+        results = list(_engine_for_task(catalog).iter_recommendations(candidates, top_n=top_ns, fields=fields))
+    return results, trace.as_dict() if trace is not None else None
+
+
+def page_task(candidate, page_size, cursor=None, profile=False, fields=None, catalog=None):
+    with metrics.traced(observe=False, profile=profile) as trace:
+        page = _engine_for_task(catalog).recommend_page(candidate, page_size=page_size, cursor=cursor, fields=fields)
+    return page, trace.as_dict() if trace is not None else None
+
+
+def facets_task(candidate, profile=False, catalog=None):
+    with metrics.traced(observe=False, profile=profile) as trace:
+        counts = _engine_for_task(catalog).facet_counts(candidate)
+    return counts, trace.as_dict() if trace is not None else None
@@ -0,0 +1,253 @@
+# notebooks/shards.py
+"""
+Scatter-gather scoring over a catalog split into row shards.
+
+The TF-IDF matrix is copied once into a shared-memory block; each shard is
+a worker process that maps its own row range of that block read-only (no
+per-worker copy of the catalog). For a query the coordinator sends the
+candidate's term vector, plus the shard's slice of the filter and boost
+bitmaps, to every shard at once. Each shard returns its local top-k and
+the coordinator merges them.
+
+A row's score only depends on its own matrix row, and the merge orders by
+(score desc, row asc) like the single-process path, so the merged top-k is
+identical to ranking the whole catalog in one process.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+import scipy.sparse as sp
+
+from notebooks.retrieval import ImpactIndex, _select, _top_k
+
+# Worker start method; "spawn" keeps workers free of the parent's threads and locks
+START_METHOD = os.environ.get("RECOMMENDER_SHARD_START", "spawn")
+
+
+class ShardError(RuntimeError):
+    """A shard worker failed or went away."""
+
+
+def _bounds(n_rows, n_shards):
+    """Row boundaries splitting n_rows into n_shards contiguous, near-equal ranges."""
+    return np.linspace(0, n_rows, n_shards + 1).astype(np.int64)
+
+
+def _attach(name, layout):
+    """Arrays laid out in the shared block `name`: (block, {key: array view})."""
+    block = shared_memory.SharedMemory(name=name)
+    arrays = {}
+    for key, (dtype, offset, length) in layout.items():
+        arrays[key] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+    return block, arrays
+
+
+def _shard_worker(conn, name, layout, shape, start, stop, sparse):
+    """Worker loop: score queries against rows [start, stop) of the shared matrix."""
+    block, arrays = _attach(name, layout)
+    indptr = arrays["indptr"]
+    lo, hi = int(indptr[start]), int(indptr[stop])
+    matrix = sp.csr_matrix(
+        (arrays["data"][lo:hi], arrays["indices"][lo:hi], indptr[start:stop + 1] - lo),
+        shape=(stop - start, shape[1]), copy=False,
+    )
+    n_rows = stop - start
+    impact = ImpactIndex(matrix) if sparse else None
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            req_id, terms, weights, k, keep_bits, boost_bits, boost = message
+            try:
+                query = sp.csr_matrix((weights, terms, [0, terms.size]), shape=(1, shape[1]))
+                keep = None if keep_bits is None else np.unpackbits(keep_bits, count=n_rows).view(bool)
+                boost_mask = None if boost_bits is None else np.unpackbits(boost_bits, count=n_rows).view(bool)
+                if impact is not None:
+                    rows, scores = impact.search(query, k, keep=keep, boost_mask=boost_mask, boost=boost)
+                else:
+                    rows, scores = _dense_top_k(matrix, query, k, keep, boost_mask, boost)
+                conn.send((req_id, (rows + start, scores)))
+            except Exception as e:
+                conn.send((req_id, ShardError(f"shard [{start}, {stop}): {e!r}")))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del matrix, impact, arrays, indptr
+        block.close()
+
+
+def _dense_top_k(matrix, query, k, keep, boost_mask, boost):
+    """Brute-force top-k of one shard: every row scored, then partial selection."""
+    # query @ matrix.T is the product linear_kernel computes (without importing scikit-learn here)
+    scores = (query @ matrix.T).toarray().astype(float)[0]
+    if boost_mask is not None and boost:
+        extra = np.zeros(scores.size, dtype=float)
+        extra[boost_mask] = boost
+        scores = scores + extra
+    rows = np.flatnonzero(keep) if keep is not None else np.arange(scores.size)
+    winners = _top_k(scores, rows, k)
+    return winners.astype(np.int64), scores[winners]
+
+
+class _Shard:
+    """Coordinator side of one worker: a pipe, a send lock and a reader thread resolving futures."""
+
+    def __init__(self, ctx, name, layout, shape, start, stop, sparse):
+        self.start, self.stop = int(start), int(stop)
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_shard_worker, args=(child, name, layout, shape, self.start, self.stop, sparse),
+                                   name=f"shard-{start}-{stop}", daemon=True)
+        self.process.start()
+        child.close()
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name=f"shard-reader-{start}", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            try:
+                req_id, result = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                future = self._pending.pop(req_id, None)
+            if future is None:
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        # The worker is gone: fail everything still waiting on it
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ShardError(f"shard [{self.start}, {self.stop}) exited"))
+
+    def submit(self, req_id, message):
+        future = Future()
+        with self._pending_lock:
+            self._pending[req_id] = future
+        try:
+            with self._send_lock:
+                self.conn.send(message)
+        except (OSError, ValueError) as e:
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+            raise ShardError(f"shard [{self.start}, {self.stop}) is not running") from e
+        return future
+
+    def close(self):
+        try:
+            with self._send_lock:
+                self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class ShardPool:
+    """
+    Worker processes each owning a contiguous row range of a CSR matrix.
+
+    search() has the same contract as ImpactIndex.search: the k best
+    (rows, scores) over the rows set in `keep`, with `boost` added to rows
+    set in `boost_mask`, ordered by score desc then row asc. It is safe to
+    call from many threads; each shard answers its queries in order.
+    close() lets searches already running finish before it stops the workers.
+    """
+
+    def __init__(self, matrix, n_shards, sparse=False, start_method=START_METHOD):
+        matrix = sp.csr_matrix(matrix)
+        self.n_rows, self.n_terms = matrix.shape
+        self.n_shards = max(1, min(int(n_shards), max(self.n_rows, 1)))
+        self.bounds = _bounds(self.n_rows, self.n_shards)
+        parts = {"data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr}
+        layout, offset = {}, 0
+        for key, arr in parts.items():
+            offset = -(-offset // 8) * 8  # keep every array 8-byte aligned
+            layout[key] = (arr.dtype.str, offset, int(arr.size))
+            offset += arr.nbytes
+        self._block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for key, arr in parts.items():
+            dtype, start, length = layout[key]
+            np.ndarray((length,), dtype=np.dtype(dtype), buffer=self._block.buf, offset=start)[:] = arr
+        ctx = multiprocessing.get_context(start_method)
+        self._shards = [
+            _Shard(ctx, self._block.name, layout, matrix.shape, self.bounds[i], self.bounds[i + 1], sparse)
+            for i in range(self.n_shards)
+        ]
+        self._ids = itertools.count()
+        self._closed = False
+        # Searches in progress; close() waits for them to drain
+        self._active = 0
+        self._idle = threading.Condition()
+
+    @property
+    def shared_bytes(self):
+        return self._block.size
+
+    def search(self, query, k, keep=None, boost_mask=None, boost=0.0):
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+        query = sp.csr_matrix(query)
+        terms = query.indices.astype(np.int32)
+        weights = query.data  # in the matrix's precision, as the single-process path scores it
+        if keep is not None and keep.all():
+            keep = None
+        if boost_mask is None or not boost:
+            boost_mask, boost = None, 0.0
+        with self._idle:
+            if self._closed:
+                raise ShardError("shard pool is closed")
+            self._active += 1
+        try:
+            return self._search(terms, weights, k, keep, boost_mask, boost)
+        finally:
+            with self._idle:
+                self._active -= 1
+                if not self._active:
+                    self._idle.notify_all()
+
+    def _search(self, terms, weights, k, keep, boost_mask, boost):
+        req_id = next(self._ids)
+        futures = []
+        for shard in self._shards:
+            part = slice(shard.start, shard.stop)
+            keep_bits = None if keep is None else np.packbits(keep[part])
+            boost_bits = None if boost_mask is None else np.packbits(boost_mask[part])
+            futures.append(shard.submit(req_id, (req_id, terms, weights, k, keep_bits, boost_bits, float(boost))))
+        results = [future.result() for future in futures]
+        rows = np.concatenate([r for r, _ in results])
+        scores = np.concatenate([s for _, s in results])
+        return _select(rows, scores, k)
+
+    def close(self, timeout=None):
+        """Stop the workers once running searches are done (or `timeout` seconds passed); new searches fail."""
+        with self._idle:
+            if self._closed:
+                return
+            self._closed = True
+            self._idle.wait_for(lambda: not self._active, timeout)
+        for shard in self._shards:
+            shard.close()
+        self._block.close()
+        self._block.unlink()
+
+    def stats(self):
+        return {
+            "shards": self.n_shards,
+            "rows_per_shard": np.diff(self.bounds).tolist(),
+            "alive": [shard.process.is_alive() for shard in self._shards],
+            "shared_bytes": self.shared_bytes,
+        }
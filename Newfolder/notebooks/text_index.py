@@ -0,0 +1,362 @@
+# notebooks/text_index.py
+import numpy as np
+
+from notebooks.columns import StringColumn, decode_strings, encode_strings, pack_postings, unpack_postings
+
+# Separator placed between fields of a multi-column index. Queries are
+# stripped text, so they can never contain it and never match across fields.
+_FIELD_SEP = "\x1f"
+# Code points fit in 21 bits, so an n-gram of up to 3 characters packs into one int64
+_CP_BITS = 21
+# Characters gathered per step while building posting lists (bounds the temporary arrays)
+_BUILD_BATCH_CHARS = 1 << 20
+
+
+def _encode_codepoints(text):
+    return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+
+def _gram_keys(grams, n):
+    """int64 key of each n-character gram: its code points packed high to low."""
+    cps = _encode_codepoints("".join(grams)).reshape(len(grams), n).astype(np.int64)
+    keys = np.zeros(len(grams), dtype=np.int64)
+    for j in range(n):
+        keys = (keys << _CP_BITS) | cps[:, j]
+    return keys
+
+
+def _key_grams(keys, n):
+    """Inverse of _gram_keys."""
+    cps = np.empty((keys.size, n), dtype=np.uint32)
+    for j in range(n):
+        cps[:, n - 1 - j] = (keys >> (_CP_BITS * j)) & ((1 << _CP_BITS) - 1)
+    text = cps.tobytes().decode("utf-32-le", "surrogatepass")
+    return [text[i * n:(i + 1) * n] for i in range(keys.size)]
+
+
+def _batch_pairs(texts, n, base):
+    """Distinct (gram key, row) pairs of `texts` (rows base, base + 1, ...), sorted by key then row."""
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    counts = np.maximum(lengths - n + 1, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    cps = _encode_codepoints("".join(texts))
+    # Rank the code points that occur, so a gram is a small integer and
+    # (gram, row) a single int64 that one sort orders and deduplicates
+    seen = np.bincount(cps) > 0
+    present = np.flatnonzero(seen)
+    dense = (np.cumsum(seen) - 1)[cps]
+    a = present.size
+    starts = np.cumsum(lengths) - lengths
+    pos = np.arange(total, dtype=np.int64) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), counts)
+    gram = dense[pos]
+    for j in range(1, n):
+        gram = gram * a + dense[pos + j]
+    n_rows = len(texts)
+    if a ** n * n_rows < 2 ** 63:
+        gram, rows = np.divmod(np.unique(gram * n_rows + rows), n_rows)
+    else:
+        order = np.argsort(gram, kind="stable")
+        gram, rows = gram[order], rows[order]
+        distinct = np.ones(gram.size, dtype=bool)
+        distinct[1:] = (gram[1:] != gram[:-1]) | (rows[1:] != rows[:-1])
+        gram, rows = gram[distinct], rows[distinct]
+    # Back to code points, so keys from different batches compare; grams are
+    # sorted here, so only each distinct gram is decoded
+    starts = np.flatnonzero(np.concatenate([[True], gram[1:] != gram[:-1]]))
+    distinct = gram[starts]
+    keys = np.zeros(distinct.size, dtype=np.int64)
+    for j in range(n):
+        keys = (keys << _CP_BITS) | present[(distinct // a ** (n - 1 - j)) % a]
+    return np.repeat(keys, np.diff(np.append(starts, gram.size))), (rows + base).astype(np.int32)
+
+
+def _group_postings(keys, rows, n):
+    """{gram: sorted row ids} from (key, row) pairs sorted by key then row."""
+    if keys.size == 0:
+        return {}
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    bounds = np.append(starts, keys.size).tolist()
+    grams = _key_grams(keys[starts], n)
+    return {g: rows[bounds[i]:bounds[i + 1]] for i, g in enumerate(grams)}
+
+
+def _merge_pairs(key_parts, row_parts):
+    """Concatenate (key, row) runs given in row order and sort them by key, keeping row order within a key."""
+    keys = np.concatenate(key_parts) if key_parts else np.empty(0, dtype=np.int64)
+    rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int32)
+    if len(key_parts) > 1:
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+    return keys, rows
+
+
+def _build_postings(texts, n):
+    """{gram: sorted row ids containing it} for every character n-gram of `texts`."""
+    if n * _CP_BITS > 63:
+        postings = {}
+        for i, text in enumerate(texts):
+            for gram in {text[j:j + n] for j in range(len(text) - n + 1)}:
+                postings.setdefault(gram, []).append(i)
+        return {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+    # Vectorized over batches of rows; each batch's pairs come out sorted and are merged at the end
+    ends = np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)))
+    key_parts, row_parts = [], []
+    start = 0
+    while start < len(texts):
+        done = ends[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(ends, done + _BUILD_BATCH_CHARS, side="right")))
+        keys, rows = _batch_pairs(texts[start:stop], n, start)
+        key_parts.append(keys)
+        row_parts.append(rows)
+        start = stop
+    return _group_postings(*_merge_pairs(key_parts, row_parts), n)
+
+
+def _concat_postings(indexes):
+    """Posting lists of consecutive row ranges merged gram by gram (rows of each index offset by those before it)."""
+    lists, base = {}, 0
+    for index in indexes:
+        for gram, ids in index.postings.items():
+            lists.setdefault(gram, []).append(np.asarray(ids) + base)
+        base += len(index)
+    return {g: np.concatenate(parts).astype(np.int32) for g, parts in lists.items()}
+
+
+def concat_states(parts, save, open_array):
+    """
+    Write the state() of SubstringIndex.concat over indexes saved with state(),
+    without holding them all: `parts` are callables returning each index's
+    state in row order (arrays may be memory-mapped), save(key, array) stores
+    a small array and open_array(key, dtype, length) returns a writer with
+    write(values, at) / close() for a large one. One part is read at a time,
+    so memory is bounded by the largest part plus the gram table. Returns the
+    state keys written.
+    """
+    # Pass 1: distinct grams in order of first appearance (as concat() orders
+    # them) with their total posting counts, and the merged sizes
+    counts, n, n_rows, n_bytes, n_short = {}, 3, 0, 0, 0
+    for load in parts:
+        state = load()
+        n = int(state["n"])
+        grams = decode_strings(state["grams_offsets"], state["grams_data"]).tolist()
+        for gram, count in zip(grams, np.diff(np.asarray(state["postings_offsets"])).tolist()):
+            counts[gram] = counts.get(gram, 0) + count
+        n_rows += len(state["texts_offsets"]) - 1
+        n_bytes += int(state["texts_offsets"][-1])
+        n_short += len(state["short_rows"])
+    grams = list(counts)
+    gram_offsets, gram_data = encode_strings(grams)
+    post_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([counts[g] for g in grams], out=post_offsets[1:])
+    save("n", np.array(n))
+    save("grams_offsets", gram_offsets)
+    save("grams_data", gram_data)
+    save("postings_offsets", post_offsets)
+
+    # Pass 2: each part's texts appended, and each of its posting lists written
+    # after the lists of the same gram from earlier parts
+    slot = {g: i for i, g in enumerate(grams)}
+    cursor = post_offsets[:-1].tolist()
+    files = {
+        "texts_offsets": open_array("texts_offsets", np.int64, n_rows + 1),
+        "texts_data": open_array("texts_data", np.uint8, n_bytes),
+        "postings_ids": open_array("postings_ids", np.int32, int(post_offsets[-1])),
+        "short_rows": open_array("short_rows", np.int32, n_short),
+    }
+    try:
+        files["texts_offsets"].write(np.zeros(1, dtype=np.int64), 0)
+        base = byte_base = short_base = 0
+        for load in parts:
+            state = load()
+            text_offsets = np.asarray(state["texts_offsets"], dtype=np.int64)
+            files["texts_offsets"].write(text_offsets[1:] + byte_base, base + 1)
+            files["texts_data"].write(state["texts_data"], byte_base)
+            short = np.asarray(state["short_rows"], dtype=np.int32) + base
+            files["short_rows"].write(short, short_base)
+            ids = np.asarray(state["postings_ids"], dtype=np.int32) + base
+            bounds = np.asarray(state["postings_offsets"]).tolist()
+            for i, gram in enumerate(decode_strings(state["grams_offsets"], state["grams_data"]).tolist()):
+                j = slot[gram]
+                files["postings_ids"].write(ids[bounds[i]:bounds[i + 1]], cursor[j])
+                cursor[j] += bounds[i + 1] - bounds[i]
+            base += len(text_offsets) - 1
+            byte_base += int(text_offsets[-1])
+            short_base += short.size
+    finally:
+        for f in files.values():
+            f.close()
+    return sorted(["n", "grams_offsets", "grams_data", "postings_offsets", *files])
+
+
+class SubstringIndex:
+    """
+    Case-insensitive substring index over one or more text columns.
+
+    Texts are lowercased once at build time and every character n-gram is
+    mapped to the sorted row ids that contain it. A query intersects the
+    posting lists of its own n-grams and only verifies the surviving rows,
+    so a lookup costs roughly O(matches) instead of a scan over the catalog.
+    The lowercased texts are kept once, as one UTF-8 buffer with row offsets.
+    """
+
+    def __init__(self, texts, n=3):
+        self.n = n
+        texts = [str(t).lower() for t in texts]
+        self.texts = StringColumn.from_values(texts)
+        self.postings = _build_postings(texts, n)
+        # Rows too short to produce an n-gram are verified directly
+        self.short_rows = np.array([i for i, text in enumerate(texts) if len(text) < n], dtype=np.int32)
+
+    @staticmethod
+    def column_texts(df, columns):
+        """One searchable text per row from the given DataFrame columns."""
+        texts = df[columns[0]].fillna("").astype(str)
+        for c in columns[1:]:
+            texts = texts + _FIELD_SEP + df[c].fillna("").astype(str)
+        return texts.tolist()
+
+    @classmethod
+    def from_columns(cls, df, columns, n=3):
+        """Index the given DataFrame columns as one searchable text per row."""
+        return cls(cls.column_texts(df, columns), n=n)
+
+    def extended(self, texts):
+        """
+        A new index with `texts` appended as rows len(self), len(self) + 1, ...
+        Only posting lists touched by the new rows are copied; this index is left unchanged.
+        """
+        base = len(self.texts)
+        added = SubstringIndex(texts, n=self.n)
+        index = SubstringIndex.__new__(SubstringIndex)
+        index.n = self.n
+        index.texts = StringColumn(
+            np.concatenate([self.texts.offsets, added.texts.offsets[1:] + self.texts.offsets[-1]]),
+            np.concatenate([np.asarray(self.texts.data), added.texts.data]),
+        )
+        postings = dict(self.postings)
+        for gram, ids in added.postings.items():
+            ids = (ids + base).astype(np.int32)
+            old = postings.get(gram)
+            postings[gram] = ids if old is None else np.concatenate([old, ids])
+        index.postings = postings
+        index.short_rows = np.concatenate([self.short_rows, (added.short_rows + base).astype(np.int32)])
+        return index
+
+    @classmethod
+    def concat(cls, indexes):
+        """One index over the rows of `indexes`, in order (the rows of each follow those of the previous one)."""
+        merged = cls.__new__(cls)
+        merged.n = indexes[0].n
+        merged.texts = StringColumn.concat([index.texts for index in indexes])
+        merged.postings = _concat_postings(indexes)
+        bases = np.cumsum([0] + [len(index) for index in indexes[:-1]])
+        merged.short_rows = np.concatenate([(np.asarray(index.short_rows) + base).astype(np.int32)
+                                            for index, base in zip(indexes, bases)])
+        return merged
+
+    # Streamed concat() for artifact builds
+    concat_states = staticmethod(concat_states)
+
+    def state(self):
+        """Flat dict of arrays describing the index (see notebooks.artifact)."""
+        grams = list(self.postings)
+        text_offsets, text_data = self.texts.offsets, self.texts.data
+        gram_offsets, gram_data = encode_strings(grams)
+        post_offsets, post_ids = pack_postings([self.postings[g] for g in grams])
+        return {
+            "n": np.array(self.n),
+            "texts_offsets": text_offsets, "texts_data": text_data,
+            "grams_offsets": gram_offsets, "grams_data": gram_data,
+            "postings_offsets": post_offsets, "postings_ids": post_ids,
+            "short_rows": self.short_rows,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an index from state(); posting lists stay views into the stored arrays."""
+        index = cls.__new__(cls)
+        index.n = int(state["n"])
+        index.texts = StringColumn(state["texts_offsets"], state["texts_data"])
+        grams = decode_strings(state["grams_offsets"], state["grams_data"])
+        index.postings = dict(zip(grams, unpack_postings(state["postings_offsets"], state["postings_ids"])))
+        index.short_rows = np.asarray(state["short_rows"])
+        return index
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held: texts, posting lists and the gram keys."""
+        postings = sum(ids.nbytes + 112 for ids in self.postings.values())
+        keys = sum(len(g) + 50 for g in self.postings)
+        return int(self.texts.nbytes + postings + keys + self.short_rows.nbytes)
+
+    def _verify(self, needle, rows):
+        if rows.size == 0:
+            return rows
+        # Search the rows' bytes: UTF-8 needles only match on character boundaries
+        return rows[self.texts.contains(needle.encode("utf-8"), rows)]
+
+    def lookup(self, needle):
+        """Sorted row ids whose text contains `needle` (case-insensitive, literal)."""
+        needle = str(needle).lower()
+        if needle == "":
+            return np.arange(len(self.texts), dtype=np.int32)
+        n = self.n
+        if len(needle) < n:
+            # Any occurrence of a short needle lies inside some n-gram
+            lists = [ids for g, ids in self.postings.items() if needle in g]
+            rows = np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int32)
+            short = self._verify(needle, self.short_rows)
+            return np.union1d(rows, short).astype(np.int32) if short.size else rows
+
+        grams = {needle[j:j + n] for j in range(len(needle) - n + 1)}
+        lists = []
+        for g in grams:
+            ids = self.postings.get(g)
+            if ids is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(ids)
+        lists.sort(key=len)
+        rows = lists[0]
+        for ids in lists[1:]:
+            if rows.size == 0:
+                break
+            rows = np.intersect1d(rows, ids, assume_unique=True)
+        return self._verify(needle, rows)
+
+    def mask(self, needle):
+        """Boolean bitmap over all rows for `needle`."""
+        out = np.zeros(len(self.texts), dtype=bool)
+        out[self.lookup(needle)] = True
+        return out
+
+
+class UnionIndex:
+    """
+    Substring lookups across several SubstringIndexes over the same rows, one
+    per field: a row matches when any of its fields contains the needle. The
+    field indexes are shared, so a column searched by several filters is
+    lowercased and indexed once.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = list(indexes)
+
+    def __len__(self):
+        return len(self.indexes[0])
+
+    def lookup(self, needle):
+        """Sorted row ids where some field contains `needle` (case-insensitive, literal)."""
+        return np.unique(np.concatenate([index.lookup(needle) for index in self.indexes])).astype(np.int32)
+
+    def mask(self, needle):
+        """Boolean bitmap over all rows for `needle`."""
+        out = np.zeros(len(self), dtype=bool)
+        for index in self.indexes:
+            out[index.lookup(needle)] = True
+        return out
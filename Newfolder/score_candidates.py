@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scorer for candidate profiles.
+Streams a candidates CSV in chunks, scores each chunk against the internship
+catalog on a process pool and writes the top matches per candidate to
+data/results.csv / results.json (and optionally Parquet) as it goes.
+
+Runs are resumable: progress is checkpointed after every chunk, and
+`--resume` truncates the outputs back to the last checkpoint and continues.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+# Add the current directory to Python path
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+RESULT_COLUMNS = ["candidate_id", "candidate_name", "title", "organization", "location", "score"]
+CANDIDATE_FIELDS = [
+    "education", "skills", "interests", "preferred_location", "mode",
+    "min_stipend", "max_duration_weeks", "domain", "education_level", "max_stipend",
+]
+CHECKPOINT_NAME = ".results.checkpoint.json"
+
+
+# --- worker side -----------------------------------------------------------
+
+def _init_worker():
+    """Load the catalog and TF-IDF model once per worker process."""
+    from notebooks.recommend import get_engine
+    get_engine()
+
+
+def _candidate_id(value):
+    # Keep numeric ids numeric in the JSON output
+    return int(value) if str(value).isdigit() else value
+
+
+def _score_chunk(records, top_n):
+    """Score one chunk of candidate records; returns flat result rows in input order."""
+    from notebooks.recommend import recommend_batch
+
+    candidates = [{k: r[k] for k in CANDIDATE_FIELDS if r.get(k) is not None} for r in records]
+    rows = []
+    for record, recs in zip(records, recommend_batch(candidates, top_n=top_n)):
+        for rec in recs:
+            rows.append({
+                "candidate_id": _candidate_id(record.get("id")),
+                "candidate_name": record.get("name"),
+                "title": rec["title"],
+                "organization": rec["organization"],
+                "location": rec["location"],
+                "score": rec["score"],
+            })
+    return rows
+
+
+# --- output writers ----------------------------------------------------------
+
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.fh = None
+
+    def open(self, offset):
+        new = offset is None
+        self.fh = open(self.path, "w" if new else "r+", newline="", encoding="utf-8")
+        if new:
+            csv.writer(self.fh).writerow(RESULT_COLUMNS)
+        else:
+            self.fh.seek(offset)
+            self.fh.truncate()
+
+    def write(self, rows):
+        writer = csv.DictWriter(self.fh, fieldnames=RESULT_COLUMNS)
+        writer.writerows(rows)
+
+    def offset(self):
+        self.fh.flush()
+        return self.fh.tell()
+
+    def close(self, finished):
+        self.fh.close()
+
+
+class JsonWriter:
+    """Writes a JSON array incrementally (same layout as data/results.json)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fh = None
+        self.count = 0
+
+    def open(self, offset, count=0):
+        new = offset is None
+        self.fh = open(self.path, "w" if new else "r+", encoding="utf-8")
+        self.count = count
+        if new:
+            self.fh.write("[")
+        else:
+            self.fh.seek(offset)
+            self.fh.truncate()
+
+    def write(self, rows):
+        for row in rows:
+            body = json.dumps(row, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+            self.fh.write(("," if self.count else "") + "\n    " + body)
+            self.count += 1
+
+    def offset(self):
+        self.fh.flush()
+        return self.fh.tell()
+
+    def close(self, finished):
+        if finished:
+            self.fh.write("\n]\n")
+        self.fh.close()
+
+
+class ParquetWriter:
+    """Writes one Parquet part file per chunk into a results.parquet/ directory."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.part = 0
+
+    def open(self, offset):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.part = offset or 0
+        # Drop parts written after the checkpoint
+        for stale in self.path.glob("part-*.parquet"):
+            if int(stale.stem.split("-")[1]) >= self.part:
+                stale.unlink()
+
+    def write(self, rows):
+        pd.DataFrame(rows, columns=RESULT_COLUMNS).to_parquet(self.path / f"part-{self.part:05d}.parquet", index=False)
+        self.part += 1
+
+    def offset(self):
+        return self.part
+
+    def close(self, finished):
+        pass
+
+
+WRITERS = {"csv": ("results.csv", CsvWriter), "json": ("results.json", JsonWriter), "parquet": ("results.parquet", ParquetWriter)}
+
+
+# --- driver --------------------------------------------------------------------
+
+def _load_checkpoint(path, settings):
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as fh:
+        checkpoint = json.load(fh)
+    if checkpoint.get("settings") != settings:
+        print("⚠️  Checkpoint was written with different settings, starting over")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(checkpoint, fh)
+    os.replace(tmp, path)
+
+
+def _read_chunks(path, chunk_size, skip_chunks):
+    reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    with reader:
+        # Chunks scored before the checkpoint are parsed and dropped. skiprows would count
+        # physical lines (a quoted field can span several) and build a set of them all
+        for chunk in itertools.islice(reader, skip_chunks, None):
+            yield chunk.to_dict("records")
+
+
+def run(candidates_path, out_dir, formats, top_n=6, chunk_size=1000, workers=None, resume=False):
+    """Score every candidate in `candidates_path`, writing results to `out_dir`."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = out_dir / CHECKPOINT_NAME
+    settings = {
+        "candidates": str(Path(candidates_path).resolve()),
+        "formats": sorted(formats),
+        "top_n": top_n,
+        "chunk_size": chunk_size,
+    }
+    checkpoint = _load_checkpoint(checkpoint_path, settings) if resume else None
+    if checkpoint is None:
+        checkpoint = {"settings": settings, "chunks_done": 0, "candidates_done": 0, "offsets": {}, "json_count": 0}
+    else:
+        print(f"↩️  Resuming after {checkpoint['chunks_done']} chunks ({checkpoint['candidates_done']} candidates)")
+
+    writers = {}
+    for fmt in formats:
+        filename, cls = WRITERS[fmt]
+        writer = cls(out_dir / filename)
+        offset = checkpoint["offsets"].get(fmt)
+        if fmt == "json":
+            writer.open(offset, checkpoint["json_count"])
+        else:
+            writer.open(offset)
+        writers[fmt] = writer
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    finished = False
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        # Keep a bounded window of chunks in flight and write them back in order
+        pending = deque()
+        chunks = _read_chunks(candidates_path, chunk_size, checkpoint["chunks_done"])
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                try:
+                    records = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((len(records), pool.submit(_score_chunk, records, top_n)))
+            if not pending:
+                break
+            n_records, future = pending.popleft()
+            rows = future.result()
+            for writer in writers.values():
+                writer.write(rows)
+            checkpoint["chunks_done"] += 1
+            checkpoint["candidates_done"] += n_records
+            checkpoint["offsets"] = {fmt: w.offset() for fmt, w in writers.items()}
+            if "json" in writers:
+                checkpoint["json_count"] = writers["json"].count
+            _save_checkpoint(checkpoint_path, checkpoint)
+            elapsed = time.perf_counter() - started
+            print(f"✅ {checkpoint['candidates_done']} candidates scored ({elapsed:.1f}s)")
+        finished = True
+    finally:
+        # On interrupt, drop queued chunks instead of waiting for them
+        pool.shutdown(wait=finished, cancel_futures=not finished)
+        for writer in writers.values():
+            writer.close(finished)
+    checkpoint_path.unlink(missing_ok=True)
+    return checkpoint["candidates_done"]
+
+
+def main():
+    """Parse arguments and run the bulk scorer"""
+    parser = argparse.ArgumentParser(description="Bulk-score candidates against the internship catalog")
+    parser.add_argument("--candidates", default=str(current_dir / "data" / "candidates.csv"), help="candidates CSV (id, name, education, skills, interests, preferred_location, ...)")
+    parser.add_argument("--out-dir", default=str(current_dir / "data"), help="directory for results.* outputs")
+    parser.add_argument("--formats", default="csv,json", help="comma separated: csv, json, parquet")
+    parser.add_argument("--top-n", type=int, default=6, help="matches kept per candidate")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="candidates per work unit")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint in --out-dir")
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown:
+        print(f"❌ Unknown output format(s): {', '.join(unknown)}")
+        sys.exit(1)
+    if "parquet" in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ Parquet output needs pyarrow: pip install pyarrow")
+            sys.exit(1)
+    if not Path(args.candidates).exists():
+        print(f"❌ Error: Candidates file not found at {args.candidates}")
+        sys.exit(1)
+
+    print(f"🚀 Scoring {args.candidates} -> {args.out_dir} ({', '.join(formats)})")
+    total = run(args.candidates, args.out_dir, formats, top_n=args.top_n, chunk_size=args.chunk_size,
+                workers=args.workers, resume=args.resume)
+    print(f"🏁 Done: {total} candidates scored")
+
+
+if __name__ == "__main__":
+    main()
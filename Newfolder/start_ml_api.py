@@ -13,6 +13,21 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
+def build_artifact():
+    """Build the model artifact (data/model/) unless it is up to date, so the server memory-maps it."""
+    print("🧱 Checking the model artifact...")
+    try:
+        from notebooks.artifact import build_artifact as build
+        manifest = build()
+    except Exception as e:
+        # The engine still starts, by fitting from the CSV
+        print(f"⚠️ Could not build the model artifact: {e}")
+        return
+    if manifest is None:
+        print("✅ Model artifact is up to date")
+    else:
+        print(f"✅ Built model artifact for {manifest['n_rows']} internships")
+
 def main():
     """Start the ML API server"""
     print("🚀 Starting ML Recommendation API...")
@@ -26,6 +41,7 @@ def main():
         sys.exit(1)
     
     print(f"✅ Data file found: {data_file}")
+    build_artifact()
     print("🤖 Initializing recommendation engine...")
     
     try:
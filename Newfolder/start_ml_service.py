@@ -39,6 +39,21 @@ def check_data_files():
     
     return True
 
+def build_artifact():
+    """Build the model artifact (data/model/) unless it is up to date, so the service memory-maps it."""
+    sys.path.insert(0, str(Path(__file__).parent))
+    try:
+        from notebooks.artifact import build_artifact as build
+        manifest = build()
+    except Exception as e:
+        # The service still starts, by fitting from the CSV
+        print(f"⚠️ Could not build the model artifact: {e}")
+        return
+    if manifest is None:
+        print("✅ Model artifact is up to date")
+    else:
+        print(f"✅ Built model artifact for {manifest['n_rows']} internships")
+
 def start_ml_service(port=8000, host="0.0.0.0"):
     """Start the ML recommendation service."""
     print(f"🚀 Starting ML Recommendation Service on {host}:{port}")
@@ -97,6 +112,9 @@ def main():
     # Check data files
     if not check_data_files():
         sys.exit(1)
+
+    # Prebuild the model artifact so startup memory-maps it instead of refitting
+    build_artifact()
     
     # Get port from environment or use default
     port = int(os.environ.get("ML_SERVICE_PORT", 8000))
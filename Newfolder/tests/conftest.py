@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add the project directory to Python path
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+CSV_PATH = PROJECT_DIR / "data" / "internships.csv"
+
+# One batch of candidates per filter, plus misspelled skills for the fuzzy fallback
+SCENARIOS = [{}, {"typos": True}, {"mode": True}, {"location": True}, {"min_stipend": True},
+             {"max_duration_weeks": True}, {"domain": True}, {"education_level": True}, {"max_stipend": True},
+             {"mode": True, "location": True}]
+
+
+def write_catalog(path, start, stop):
+    """Rows start..stop of data/internships.csv, as a catalog source at `path`."""
+    df = pd.read_csv(CSV_PATH, sep=None, engine="python", dtype=str, keep_default_na=False)
+    df.iloc[start:stop].to_csv(path, sep="\t", index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """An engine fitted on data/internships.csv (no artifact)."""
+    from notebooks.recommend import RecommendationEngine, _fit_catalog
+    return RecommendationEngine(*_fit_catalog(str(CSV_PATH)))
+
+
+@pytest.fixture(scope="session")
+def candidates():
+    """Synthetic candidates drawn from the catalog's vocabulary, 8 per SCENARIOS entry."""
+    from benchmarks.synthetic import load_source, make_candidates
+    source = load_source(CSV_PATH)
+    return [c for i, filters in enumerate(SCENARIOS) for c in make_candidates(8, seed=i, source=source, **filters)]
+
+
+@pytest.fixture(scope="session")
+def artifact_dir(engine, tmp_path_factory):
+    """A model artifact for data/internships.csv, saved from `engine`."""
+    from notebooks.artifact import save_artifact
+    path = tmp_path_factory.mktemp("artifact") / "model"
+    save_artifact(str(path), str(CSV_PATH), engine.catalog, engine.vectorizer, engine.tfidf_matrix, engine.indexes)
+    return str(path)
+
+
+@pytest.fixture
+def small_catalogs(tmp_path):
+    """Two small catalog sources: {"a": path, "b": path}."""
+    return {"a": write_catalog(tmp_path / "a.tsv", 0, 200), "b": write_catalog(tmp_path / "b.tsv", 200, 400)}
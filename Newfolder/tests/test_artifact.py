@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from conftest import CSV_PATH, write_catalog
+from notebooks import ingest, recommend
+from notebooks.artifact import build_artifact, load_artifact, save_artifact, vectorizer_config
+from notebooks.recommend import RecommendationEngine
+
+
+def is_mapped(arr):
+    """True when `arr` is a view of a memory-mapped file."""
+    while arr is not None and not isinstance(arr, np.memmap):
+        arr = arr.base
+    return arr is not None
+
+
+def test_loaded_artifact_matches_fit(engine, artifact_dir):
+    catalog, vectorizer, matrix, indexes = load_artifact(artifact_dir, str(CSV_PATH))
+    # Buffers are memory-mapped, not read into memory
+    assert is_mapped(matrix.data) and not matrix.data.flags.writeable
+    assert vectorizer.vocabulary_ == engine.vectorizer.vocabulary_
+    assert np.array_equal(vectorizer.idf_, engine.vectorizer.idf_)
+    for key in ("data", "indices", "indptr"):
+        assert np.array_equal(getattr(matrix, key), getattr(engine.tfidf_matrix, key))
+    assert catalog.n_rows == engine.n_rows
+    assert sorted(indexes) == sorted(engine.indexes)
+
+
+def test_loaded_engine_recommends_like_fitted_engine(engine, artifact_dir, candidates):
+    loaded = RecommendationEngine.load(str(CSV_PATH), artifact_dir=artifact_dir)
+    assert is_mapped(loaded.tfidf_matrix.data)
+    for candidate in candidates:
+        assert loaded.recommend(candidate, top_n=10) == engine.recommend(candidate, top_n=10)
+    assert loaded.facet_counts(candidates[0]) == engine.facet_counts(candidates[0])
+
+
+def test_stale_artifact_is_ignored(tmp_path):
+    source = write_catalog(tmp_path / "catalog.tsv", 0, 300)
+    fitted = RecommendationEngine.load(source, artifact_dir=None)
+    save_artifact(str(tmp_path / "model"), source, fitted.catalog, fitted.vectorizer, fitted.tfidf_matrix,
+                  fitted.indexes)
+    assert load_artifact(str(tmp_path / "model"), source) is not None
+    # Another vectorizer configuration, or a changed source, needs a new fit
+    assert load_artifact(str(tmp_path / "model"), source, vectorizer=vectorizer_config(TfidfVectorizer())) is None
+    write_catalog(tmp_path / "catalog.tsv", 0, 301)
+    assert load_artifact(str(tmp_path / "model"), source) is None
+    assert RecommendationEngine.load(source, artifact_dir=str(tmp_path / "model")).n_rows == 301
+
+
+def test_build_artifact_only_when_stale(tmp_path):
+    source = write_catalog(tmp_path / "catalog.tsv", 0, 200)
+    out = str(tmp_path / "model")
+    assert build_artifact(source, out)["n_rows"] == 200
+    assert build_artifact(source, out) is None
+    assert build_artifact(source, out, force=True) is not None
+    write_catalog(tmp_path / "catalog.tsv", 0, 250)
+    assert build_artifact(source, out)["n_rows"] == 250
+
+
+def test_spilled_indexes_match_in_memory_build(tmp_path, monkeypatch):
+    # build_artifact merges per-chunk indexes from disk; the files match concatenating them in memory
+    source = write_catalog(tmp_path / "catalog.tsv", 0, 900)
+    monkeypatch.setattr(ingest, "CHUNK_ROWS", 250)
+    save_artifact(str(tmp_path / "memory"), source, *recommend._fit_catalog(source))
+    build_artifact(source, str(tmp_path / "spilled"))
+    names = sorted(f for f in os.listdir(tmp_path / "memory") if f.endswith(".npy"))
+    assert names == sorted(f for f in os.listdir(tmp_path / "spilled") if f.endswith(".npy"))
+    for name in names:
+        expected, got = np.load(tmp_path / "memory" / name), np.load(tmp_path / "spilled" / name)
+        assert got.dtype == expected.dtype and np.array_equal(got, expected), name
+    assert sorted(os.listdir(tmp_path)) == ["catalog.tsv", "memory", "spilled"]
@@ -0,0 +1,31 @@
+import pytest
+
+from notebooks.cache import canonical_request
+from notebooks.recommend import RecommendationEngine
+
+
+def test_skills_whitespace_inside_a_skill_is_part_of_the_key():
+    assert canonical_request({"skills": "a c++"}) != canonical_request({"skills": "a  c++"})
+    # Case, and runs of whitespace between skills, change neither scorer
+    assert canonical_request({"skills": "Python, SQL"}) == canonical_request({"skills": " python,   sql "})
+    assert canonical_request({"education": "B.Tech  CSE"}) == canonical_request({"education": "b.tech cse"})
+
+
+@pytest.mark.parametrize("skills", [("a c++", "a  c++"), ("excel", "exc el")])
+def test_cached_results_match_fresh_ranking(engine, skills):
+    engine = RecommendationEngine(engine.catalog, engine.vectorizer, engine.tfidf_matrix, engine.indexes)
+    first, second = ({"skills": s} for s in skills)
+    expected = [engine.ranked_rows(c, engine.score_profiles([c["skills"]])[0], 3)[1].round(2).tolist()
+                for c in (first, second)]
+    assert expected[0] != expected[1]
+    # The first request is cached; the second must not be served its results
+    assert [r["score"] for r in engine.recommend(first, top_n=3)] == expected[0]
+    assert [r["score"] for r in engine.recommend(second, top_n=3)] == expected[1]
+
+
+
+def test_mode_spellings_share_a_key():
+    # The mode filter matches the normalized mode, so these requests rank identically
+    assert canonical_request({"mode": "on-site"}) == canonical_request({"mode": "Onsite "})
+    assert canonical_request({"mode": "WFH"}) == canonical_request({"mode": "remote"})
+    assert canonical_request({"mode": "remote"}) != canonical_request({"mode": "hybrid"})
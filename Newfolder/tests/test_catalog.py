@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH
+from notebooks.artifact import load_artifact
+from notebooks.catalog import DERIVED, CatalogStore
+from notebooks.recommend import TEXT_FILTER_FIELDS, _normalize_internships, _read_internships
+
+
+@pytest.fixture(scope="module")
+def frame():
+    """The normalized catalog as pandas holds it, without the derived columns."""
+    df = _normalize_internships(_read_internships(str(CSV_PATH)))
+    return df[[c for c in df.columns if c not in DERIVED]]
+
+
+@pytest.fixture(scope="module")
+def stores(frame, artifact_dir):
+    return {"encoded": CatalogStore.from_frame(frame), "mmap": load_artifact(artifact_dir, str(CSV_PATH))[0]}
+
+
+@pytest.mark.parametrize("kind", ["encoded", "mmap"])
+def test_store_matches_pandas(stores, frame, kind):
+    store = stores[kind]
+    assert store.n_rows == len(frame)
+    assert list(store.columns) == list(frame.columns)
+    pd.testing.assert_frame_equal(store.to_frame(), frame, check_dtype=False)
+    rows = np.array([5, 0, 2499, 17, 17])
+    pd.testing.assert_frame_equal(store.to_frame(rows), frame.iloc[rows].reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("kind", ["encoded", "mmap"])
+def test_store_rows_and_takes_match_pandas(stores, frame, kind):
+    store = stores[kind]
+    rows = np.array([3, 1000, 42, 3])
+    for name in frame.columns:
+        expected = [None if pd.isna(v) else v for v in frame[name].iloc[rows]]
+        if name in ("duration_weeks", "stipend_per_month"):
+            got = [None if np.isnan(v) else v for v in store[name].values()[rows]]
+        else:
+            got = store[name].take(rows)
+        assert got == expected, name
+    for i in rows:
+        assert store.row(i) == {k: (None if pd.isna(v) else v) for k, v in frame.iloc[i].items()}
+
+
+def test_extended_and_concat_match_pandas(frame):
+    head, tail = frame.iloc[:1200], frame.iloc[1200:]
+    extended = CatalogStore.from_frame(head).extended(tail)
+    concat = CatalogStore.concat([CatalogStore.from_frame(head), CatalogStore.from_frame(tail)])
+    for store in (extended, concat):
+        pd.testing.assert_frame_equal(store.to_frame(), frame, check_dtype=False)
+
+
+@pytest.mark.parametrize("kind", ["encoded", "mmap"])
+def test_string_column_contains(stores, frame, kind):
+    column = stores[kind]["description"]
+    rows = np.arange(0, len(frame), 7)
+    for needle in ("data", "é", "python developer", "zzz"):
+        expected = [needle in text for text in frame["description"].iloc[rows]]
+        assert column.contains(needle.encode("utf-8"), rows).tolist() == expected
+
+
+def test_text_filters_search_each_field(engine):
+    df = _normalize_internships(_read_internships(str(CSV_PATH)))
+    indexes = {"domain": engine.domain_index, "education": engine.education_index}
+    for name, fields in TEXT_FILTER_FIELDS.items():
+        texts = df[list(fields)].fillna("").astype(str).apply(lambda col: col.str.lower())
+        for needle in ("Engineering", "b.tech", "an", "e", "data science", "zzz"):
+            expected = np.zeros(len(df), dtype=bool)
+            for field in fields:
+                expected |= texts[field].str.contains(needle.lower(), regex=False).to_numpy()
+            assert np.array_equal(indexes[name].mask(needle), expected), (name, needle)
+    # Description serves both filters from one index
+    assert engine.domain_index.indexes[2] is engine.education_index.indexes[1]
+
+
+def test_memory_report_counts_each_buffer_once(engine):
+    report = engine.memory_report()
+    # The stipend / duration arrays the filters read are the catalog columns themselves
+    assert np.shares_memory(engine.stipend, engine.catalog["stipend_per_month"].array)
+    assert "stipend" not in report["rows"] and "stipend_per_month" in report["catalog"]
+    assert report["total"] == sum(sum(part.values()) for name, part in report.items() if name != "total")
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from notebooks.facets import FacetIndex, RangeIndex, normalize_city, normalize_mode
+from notebooks.recommend import RecommendationEngine, _fit_frame, _normalize_internships
+
+
+@pytest.mark.parametrize("value, label", [
+    ("Onsite", "Onsite"),
+    ("  onsite ", "Onsite"),
+    ("On-site", "Onsite"),
+    ("on site", "Onsite"),
+    ("In office", "Onsite"),
+    ("Remote", "Remote"),
+    ("Work From Home", "Remote"),
+    ("WFH", "Remote"),
+    ("virtual", "Remote"),
+    ("Hybrid", "Hybrid"),
+    ("Hybrid (remote + on-site)", "Hybrid"),
+    ("flexible  hours", "Flexible Hours"),
+    ("", None),
+    (None, None),
+    (float("nan"), None),
+])
+def test_mode_aliases(value, label):
+    assert normalize_mode(value) == label
+
+
+@pytest.mark.parametrize("value, label", [
+    ("Bengaluru", "Bangalore"),
+    ("bangalore, Karnataka", "Bangalore"),
+    ("Bombay", "Mumbai"),
+    ("Calcutta", "Kolkata"),
+    ("Gurugram", "Gurgaon"),
+    ("Madras", "Chennai"),
+    ("New  Delhi", "Delhi"),
+    ("Trivandrum", "Thiruvananthapuram"),
+    ("pune", "Pune"),
+    ("", None),
+    (None, None),
+])
+def test_city_aliases(value, label):
+    assert normalize_city(value) == label
+
+
+def test_facet_counts_group_aliases():
+    index = FacetIndex.from_values("mode", ["Onsite", "on-site", "Remote", "work from home", "Hybrid", None])
+    keep = np.ones(6, dtype=bool)
+    assert index.counts(keep) == {"Onsite": 2, "Remote": 2, "Hybrid": 1}
+    keep[1] = False
+    assert index.counts(keep)["Onsite"] == 1
+    grown = index.extended(["In Office"])
+    assert grown.counts(np.ones(7, dtype=bool))["Onsite"] == 3
+
+
+def test_range_index_matches_comparison():
+    values = pd.Series([10000, None, 15000, 12000, None, 15000])
+    index = RangeIndex.from_values(values)
+    filled = values.fillna(0).to_numpy()
+    np.testing.assert_array_equal(index.mask(lo=12000, missing=0.0), filled >= 12000)
+    np.testing.assert_array_equal(index.mask(hi=12000, missing=0.0), filled <= 12000)
+    np.testing.assert_array_equal(index.mask(hi=12000, missing=np.inf), values.fillna(np.inf).to_numpy() <= 12000)
+
+
+def test_mode_filter_matches_facet_counts():
+    raw = pd.DataFrame({
+        "title": ["Data Intern"] * 5,
+        "organization": ["A", "B", "C", "D", "E"],
+        "location": ["Pune"] * 5,
+        "mode": ["Onsite", "on-site", "Remote (WFH)", "work from home", "Hybrid (remote + on-site)"],
+        "duration_weeks": ["8"] * 5,
+        "stipend_per_month": ["10000"] * 5,
+        "description": ["Data analysis"] * 5,
+        "requirements": ["Python"] * 5,
+    })
+    engine = RecommendationEngine(*_fit_frame(_normalize_internships(raw)))
+    organizations = lambda mode: sorted(r["organization"] for r in engine.recommend({"skills": "python", "mode": mode}, 10))
+    counts = engine.facet_counts({"skills": "python", "mode": "remote"})
+    assert counts["mode"] == {"Onsite": 2, "Remote": 2, "Hybrid": 1}
+    # Picking a mode, in any spelling, leaves exactly the rows its count promised
+    assert organizations("onsite") == organizations("On-site ") == ["A", "B"]
+    assert organizations("remote") == organizations("WFH") == ["C", "D"]
+    assert organizations("hybrid") == ["E"]
+    for label, count in counts["mode"].items():
+        assert engine.facet_counts({"skills": "python", "mode": label})["total"] == count
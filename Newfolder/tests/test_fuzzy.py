@@ -0,0 +1,62 @@
+import difflib
+import re
+
+import numpy as np
+import pytest
+
+from notebooks.fuzzy import SkillMatcher, split_skills
+from notebooks.recommend import _normalize_internships
+
+# Vague or misspelled skills, i.e. the candidates that reach the fallback
+SKILLS = [
+    "Python, SQL",
+    "pythn, sqll",
+    "Communcation; Reporting",
+    "Legal Research, Documentation",
+    "Arduino, IoT, Sensors",
+    "excel",
+    "excell",
+    "MS  Excel; power bi",
+    "ml",
+]
+
+
+def legacy_scores(job_texts, skills):
+    """The original fallback loop: difflib against the whole requirements text of every row."""
+    tokens = [t.strip() for t in re.split(r"[;,]", skills.lower()) if t.strip()]
+    out = np.zeros(len(job_texts))
+    for i, job_text in enumerate(job_texts):
+        for t in tokens:
+            if t in job_text:
+                out[i] += 1.0
+            elif difflib.SequenceMatcher(None, t, job_text).ratio() >= 0.45:
+                out[i] += 0.5
+    return out
+
+
+@pytest.fixture(scope="module")
+def job_texts(engine):
+    df = _normalize_internships(engine.catalog.to_frame())
+    return [text.lower() for text in SkillMatcher.frame_texts(df)]
+
+
+@pytest.mark.parametrize("skills", SKILLS)
+def test_scores_match_legacy_loop(engine, job_texts, skills):
+    np.testing.assert_array_equal(engine.skills.score(split_skills(skills)), legacy_scores(job_texts, skills))
+
+
+def test_close_match_on_short_texts():
+    matcher = SkillMatcher(["Python", "Excel; SQL", "Stakeholder management and reporting"])
+    # "pythn" is close to the whole text "python"; the long text is out of reach for short tokens
+    np.testing.assert_array_equal(matcher.score(["pythn"]), [0.5, 0.0, 0.0])
+    np.testing.assert_array_equal(matcher.score(["excel", "sql"]), [0.0, 2.0, 0.0])
+
+
+def test_extended_and_concat_match_a_fresh_build():
+    texts = ["Python", "Excel; SQL", "Stakeholder reporting", "pythons", "sql server"]
+    fresh = SkillMatcher(texts)
+    grown = SkillMatcher(texts[:2]).extended(texts[2:])
+    merged = SkillMatcher.concat([SkillMatcher(texts[:3]), SkillMatcher(texts[3:])])
+    for tokens in (["pythn"], ["sql"], ["excel", "reportin"]):
+        np.testing.assert_array_equal(grown.score(tokens), fresh.score(tokens))
+        np.testing.assert_array_equal(merged.score(tokens), fresh.score(tokens))
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from conftest import CSV_PATH
+from notebooks import ingest
+from notebooks.ingest import StreamingTfidf
+from notebooks.recommend import _profiles, _read_internships
+
+CONFIGS = [
+    {"stop_words": "english"},
+    {},
+    {"ngram_range": (1, 2), "sublinear_tf": True},
+    {"analyzer": "char_wb", "ngram_range": (2, 4)},
+    {"min_df": 3, "max_df": 0.5, "norm": "l1"},
+    {"min_df": 0.01, "max_df": 200, "smooth_idf": False},
+    {"binary": True, "lowercase": False, "norm": None},
+]
+
+
+@pytest.fixture(scope="module")
+def docs():
+    return _profiles(_read_internships(str(CSV_PATH))).tolist()
+
+
+@pytest.mark.parametrize("params", CONFIGS)
+@pytest.mark.parametrize("chunk", [2500, 333])
+def test_streaming_fit_matches_tfidf_vectorizer(docs, params, chunk):
+    expected = TfidfVectorizer(**params)
+    want = expected.fit_transform(docs).tocsr()
+    fitted = StreamingTfidf(**params)
+    for start in range(0, len(docs), chunk):
+        fitted.add(docs[start:start + chunk])
+    got = fitted.finish()
+
+    assert fitted.vectorizer.vocabulary_ == expected.vocabulary_
+    assert np.array_equal(fitted.vectorizer.idf_, expected.idf_)
+    # Same layout and bit-identical weights, not just the same values
+    assert got.shape == want.shape
+    assert np.array_equal(got.indptr, want.indptr)
+    assert np.array_equal(got.indices, want.indices)
+    assert np.array_equal(got.data, want.data)
+
+
+def test_unstreamable_options_are_rejected():
+    with pytest.raises(ValueError, match="max_features"):
+        StreamingTfidf(max_features=100)
+
+
+def test_chunked_frames_read_the_whole_source():
+    whole = pd.read_csv(CSV_PATH, sep=None, engine="python", dtype=str)
+    frames = list(ingest.iter_frames(str(CSV_PATH), chunk_rows=700))
+    assert [len(f) for f in frames] == [700, 700, 700, len(whole) - 2100]
+    pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), whole)
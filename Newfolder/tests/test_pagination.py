@@ -0,0 +1,42 @@
+import pytest
+
+from notebooks.cache import CursorExpired
+from notebooks.recommend import RecommendationEngine
+
+
+def all_pages(engine, candidate, page_size, fields=None):
+    page = engine.recommend_page(candidate, page_size=page_size, fields=fields)
+    pages = [page]
+    while page["next_cursor"] is not None:
+        page = engine.recommend_page(page_size=page_size, cursor=page["next_cursor"], fields=fields)
+        pages.append(page)
+    return pages
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_pages_concatenate_to_recommend(engine, candidates, sparse):
+    engine = RecommendationEngine(engine.catalog, engine.vectorizer, engine.tfidf_matrix, engine.indexes)
+    engine.sparse = sparse
+    for candidate in candidates[::4]:
+        pages = all_pages(engine, candidate, 37)
+        total = pages[0]["total"]
+        assert all(page["total"] == total for page in pages)
+        assert all(len(page["recommendations"]) == 37 for page in pages[:-1])
+        assert pages[0]["recommendations"] == engine.recommend(candidate, top_n=37)
+        assert [r for page in pages for r in page["recommendations"]] == engine.recommend(candidate, top_n=total)
+
+
+def test_pages_project_fields(engine, candidates):
+    fields = ["title", "score"]
+    pages = all_pages(engine, candidates[0], 50, fields=fields)
+    assert [r for page in pages for r in page["recommendations"]] == \
+        engine.recommend(candidates[0], top_n=pages[0]["total"], fields=fields)
+
+
+def test_cursor_expires_with_the_catalog(engine, candidates):
+    cursor = engine.recommend_page(candidates[1], page_size=5)["next_cursor"]
+    changed = engine.with_changes(deletes=[0])
+    with pytest.raises(CursorExpired):
+        changed.recommend_page(page_size=5, cursor=cursor)
+    with pytest.raises(ValueError):
+        engine.recommend_page(page_size=5, cursor="not-a-cursor")
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CSV_PATH, PROJECT_DIR
+from notebooks.recommend import RecommendationEngine, _candidate_profile, _fit_frame, _normalize_internships
+from notebooks.retrieval import ImpactIndex, _top_k
+from notebooks.shards import _dense_top_k
+
+
+@pytest.fixture(scope="module")
+def queries(engine):
+    candidates = pd.read_csv(PROJECT_DIR / "data" / "candidates.csv", dtype=str, keep_default_na=False)
+    profiles = [_candidate_profile(c) for c in candidates.to_dict("records")]
+    # A single rare term (few rows hold it), so the walk runs out of postings
+    profiles += ["python", "arduino", "zzzz-unknown-term"]
+    return engine.query_vectors(profiles)
+
+
+@pytest.fixture(scope="module")
+def index(engine):
+    return ImpactIndex(engine.tfidf_matrix)
+
+
+def masks(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    return rng.random(n_rows) < 0.3, rng.random(n_rows) < 0.05
+
+
+def assert_same(got, expected):
+    np.testing.assert_array_equal(got[0], expected[0])
+    np.testing.assert_array_equal(got[1], expected[1])
+
+
+@pytest.mark.parametrize("k", [1, 10, 50])
+def test_search_matches_dense_ranking(engine, index, queries, k):
+    for i in range(queries.shape[0]):
+        query = queries[i]
+        assert_same(index.search(query, k), _dense_top_k(engine.tfidf_matrix, query, k, None, None, 0.0))
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_search_with_keep_and_boost(engine, index, queries, seed):
+    keep, boost_mask = masks(engine.n_rows, seed)
+    for i in range(queries.shape[0]):
+        query = queries[i]
+        for kwargs in ({"keep": keep}, {"keep": keep, "boost_mask": boost_mask, "boost": 0.1},
+                       {"boost_mask": boost_mask, "boost": 0.1}):
+            expected = _dense_top_k(engine.tfidf_matrix, query, 10, kwargs.get("keep"), kwargs.get("boost_mask"),
+                                    kwargs.get("boost", 0.0))
+            assert_same(index.search(query, 10, **kwargs), expected)
+
+
+def test_exhausted_lists_fill_with_first_unseen_rows(engine, index, queries):
+    # More winners than rows holding the query terms: the rest are zero-score rows in row order
+    keep, boost_mask = masks(engine.n_rows, 2)
+    k = engine.n_rows // 2
+    for query in (queries[-3], queries[-1]):
+        for kwargs in ({}, {"keep": keep}, {"keep": keep, "boost_mask": boost_mask, "boost": 0.1}):
+            expected = _dense_top_k(engine.tfidf_matrix, query, k, kwargs.get("keep"), kwargs.get("boost_mask"),
+                                    kwargs.get("boost", 0.0))
+            assert_same(index.search(query, k, **kwargs), expected)
+
+
+def test_k_beyond_catalog(engine, index, queries):
+    rows, scores = index.search(queries[0], engine.n_rows + 5)
+    assert rows.size == engine.n_rows
+    assert np.array_equal(np.sort(rows), np.arange(engine.n_rows))
+
+
+def variant(engine, sparse=False, n_shards=0):
+    """An engine over the same arrays that ranks densely, sparsely and/or over shard processes."""
+    other = RecommendationEngine(engine.catalog, engine.vectorizer, engine.tfidf_matrix, engine.indexes)
+    other.sparse, other.n_shards = sparse, n_shards
+    return other
+
+
+def test_dense_and_sparse_rankings_agree(engine, candidates):
+    dense, sparse = variant(engine), variant(engine, sparse=True)
+    assert not dense.uses_retriever and sparse.uses_retriever
+    for candidate in candidates:
+        assert sparse.recommend(candidate, top_n=10) == dense.recommend(candidate, top_n=10)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_sharded_ranking_agrees(engine, candidates, sparse):
+    sharded = variant(engine, sparse=sparse, n_shards=3)
+    try:
+        dense = variant(engine)
+        for candidate in candidates:
+            assert sharded.recommend(candidate, top_n=10) == dense.recommend(candidate, top_n=10)
+    finally:
+        sharded.retriever.close()
+
+
+def test_ties_come_in_row_order():
+    scores = np.repeat([0.5, 0.2, 0.5, 0.0, 0.2], 40)
+    rows = np.arange(scores.size)
+    for k in (1, 7, 40, 85, scores.size):
+        # A stable sort on the score keeps tied rows in catalog order
+        assert np.array_equal(_top_k(scores, rows, k), np.argsort(-scores, kind="stable")[:k])
+
+
+def test_duplicate_rows_rank_in_catalog_order():
+    df = pd.read_csv(CSV_PATH, sep=None, engine="python", dtype=str, keep_default_na=False).head(30)
+    engine = RecommendationEngine(*_fit_frame(_normalize_internships(pd.concat([df, df, df], ignore_index=True))))
+    candidate = {"skills": df.loc[0, "requirements"], "interests": df.loc[0, "title"]}
+    scores = engine.score_profiles([_candidate_profile(candidate)])[0]
+    rows, top = engine.ranked_rows(candidate, scores, 9)
+    # Each score is held by three rows (i, i + 30, i + 60), which come in that order
+    assert np.array_equal(top[::3], top[1::3]) and np.array_equal(top[::3], top[2::3])
+    assert np.array_equal(rows, np.argsort(-scores, kind="stable")[:9])
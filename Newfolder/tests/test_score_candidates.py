@@ -0,0 +1,21 @@
+import pandas as pd
+
+from score_candidates import _read_chunks
+
+
+def test_resume_skips_whole_chunks(tmp_path):
+    # Quoted multi-line fields: one record spans several physical lines
+    path = tmp_path / "candidates.csv"
+    pd.DataFrame({
+        "id": [str(i) for i in range(1, 8)],
+        "name": [f"Candidate {i}" for i in range(1, 8)],
+        "skills": ["Python,\nSQL", "Excel", "Go\nRust\nC", "SEO", "Java", "R", "Figma"],
+    }).to_csv(path, index=False)
+
+    full = [record for chunk in _read_chunks(path, 2, 0) for record in chunk]
+    assert [r["id"] for r in full] == [str(i) for i in range(1, 8)]
+    assert full[2]["skills"] == "Go\nRust\nC"
+
+    resumed = list(_read_chunks(path, 2, 2))
+    assert [[r["id"] for r in chunk] for chunk in resumed] == [["5", "6"], ["7"]]
+    assert list(_read_chunks(path, 2, 4)) == []
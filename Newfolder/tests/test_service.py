@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from notebooks import recommend, service
+from notebooks.recommend import RecommendationEngine
+from notebooks.service import CatalogRegistry, EngineHandle
+from notebooks.shards import ShardError
+
+
+def _registry(small_catalogs):
+    # A budget of one byte: every load evicts whatever else can be evicted
+    return CatalogRegistry({cid: {"path": path, "artifact_dir": None} for cid, path in small_catalogs.items()},
+                           max_bytes=1, default="a")
+
+
+def test_lru_eviction(small_catalogs):
+    registry = _registry(small_catalogs)
+    registry.get("a")
+    registry.get("b")
+    stats = registry.stats()["catalogs"]
+    assert stats["a"]["state"] == "idle" and stats["a"]["evictions"] == 1
+    assert stats["b"]["state"] == "ready"
+
+
+def test_changed_catalog_is_not_evicted(small_catalogs):
+    registry = _registry(small_catalogs)
+    registry.get("a")
+    handle = registry.handle("a")
+    _, (new_id,) = handle.apply_changes(upserts=[(None, {"title": "Robotics Intern", "organization": "Acme"})])
+
+    registry.get("b")
+    assert handle.ready and registry.stats()["catalogs"]["a"]["evictions"] == 0
+    assert registry.get("a").get_internship(new_id)["title"] == "Robotics Intern"
+
+    # A refit keeps the changes in memory only, so the catalog stays pinned
+    handle.refit()
+    registry.get("b")
+    assert registry.get("a").get_internship(new_id) is not None
+
+    # After a reload from the source it is evictable again
+    handle.reload()
+    registry.enforce_budget(keep="b")
+    assert not handle.ready and registry.stats()["catalogs"]["a"]["evictions"] == 1
+
+
+def test_concurrent_partial_updates_keep_every_field(small_catalogs):
+    handle = EngineHandle(lambda: RecommendationEngine.load(small_catalogs["a"], artifact_dir=None))
+    changes = {"title": "Robotics Intern", "organization": "Acme", "location": "Pune", "mode": "Remote",
+               "description": "Build robots", "requirements": "ROS; C++"}
+    threads = [threading.Thread(target=handle.apply_changes, kwargs={"updates": [(5, {field: value})]})
+               for field, value in changes.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    record = handle.get().get_internship(5)
+    assert {field: record[field] for field in changes} == changes
+    assert handle.get().version == 1 + len(changes)
+
+
+def test_update_of_unknown_id_raises(small_catalogs):
+    handle = EngineHandle(lambda: RecommendationEngine.load(small_catalogs["a"], artifact_dir=None))
+    with pytest.raises(KeyError):
+        handle.apply_changes(updates=[(10_000, {"title": "x"})])
+
+
+def test_retriever_is_built_before_publishing(small_catalogs, monkeypatch):
+    monkeypatch.setattr(recommend, "RETRIEVAL", "sparse")
+    handle = EngineHandle(lambda: RecommendationEngine.load(small_catalogs["a"], artifact_dir=None))
+    published = [handle.get(), handle.apply_changes(deletes=[3])[0], handle.refit(), handle.reload()]
+    # No request pays for building the posting lists
+    assert all(engine.sparse and engine._retriever is not None for engine in published)
+
+
+def test_replaced_shard_pool_is_closed(small_catalogs, monkeypatch):
+    monkeypatch.setattr(recommend, "SHARDS", 2)
+    monkeypatch.setattr(service, "RETIRE_SECONDS", 0)
+    handle = EngineHandle(lambda: RecommendationEngine.load(small_catalogs["a"], artifact_dir=None))
+    old = handle.get()
+    query = old.query_vectors(["python"])
+    new = handle.apply_changes(deletes=[3])[0]
+    # The new engine's shards were started before it was published; the old ones are stopped
+    assert all(new.shard_pool.stats()["alive"])
+    assert new.shard_pool.search(query, 5)[0].size == 5
+    with pytest.raises(ShardError):
+        old.shard_pool.search(query, 5)
+    reloaded = handle.reload()
+    with pytest.raises(ShardError):
+        new.shard_pool.search(query, 5)
+    assert handle.unload()
+    with pytest.raises(ShardError):
+        reloaded.shard_pool.search(query, 5)